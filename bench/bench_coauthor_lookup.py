@@ -0,0 +1,87 @@
+"""Single-author co-author lookup latency as the dataset grows.
+
+Builds synthetic databases of increasing size in which one probe author
+always has the same 20 publications, then times get_coauthor_details for
+that author. With the author -> publication index the latency should stay
+flat. The baseline column runs the lookup this index replaced, a Python
+loop over every publication testing whether the author is among its
+authors; the array scan column finds the same publications with one
+vectorised NumPy scan of all author slots.
+
+Run from the repository root:
+
+    PYTHONPATH=src python bench/bench_coauthor_lookup.py
+"""
+import argparse
+import random
+import timeit
+
+import numpy as np
+
+from comp62521.database import database
+
+PROBE = "Probe Author"
+
+
+def build(npubs, seed=0):
+    rng = random.Random(seed)
+    db = database.Database()
+    nauthors = max(npubs // 2, 10)
+    probe_every = max(npubs // 20, 1)
+    for i in range(npubs):
+        k = rng.randint(1, 5)
+        authors = [f"Author {rng.randrange(nauthors)}" for _ in range(k)]
+        if i % probe_every == 0:
+            authors[0] = PROBE
+        db.add_publication(rng.randrange(4), f"Title {i}", None, 1990 + rng.randrange(30),
+                           list(dict.fromkeys(authors)), None, None, None, None, None, None, None, None, None)
+    return db
+
+
+def baseline_scan(db, publications, name):
+    """get_coauthor_details as the baseline did it, publications being the
+    Publication objects it kept in a list."""
+    author_id = db.author_idx[name]
+    data = {}
+    for p in publications:
+        if author_id in p.authors:
+            for a in p.authors:
+                try:
+                    data[a] += 1
+                except KeyError:
+                    data[a] = 1
+    return [(db.authors[key].name, data[key]) for key in data]
+
+
+def array_scan(db, author_id):
+    store = db.publications
+    return store.slots(store.publications_of(author_id))
+
+
+def best_of(fn, repeat):
+    return min(timeit.repeat(fn, number=1, repeat=repeat)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10**3, 10**4, 10**5, 10**6])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--baseline-repeat", type=int, default=3,
+                        help="repeats of the baseline loop, which takes seconds at a million publications")
+    args = parser.parse_args()
+
+    print(f"{'publications':>12} {'probe pubs':>10} {'indexed (us)':>13} {'baseline (us)':>14} "
+          f"{'array scan (us)':>16}")
+    for n in args.sizes:
+        db = build(n)
+        author_id = db.author_idx[PROBE]
+        publications = list(db.publications)
+        assert baseline_scan(db, publications, PROBE) == db.get_coauthor_details(PROBE)
+        indexed = best_of(lambda: db.get_coauthor_details(PROBE), args.repeat)
+        baseline = best_of(lambda: baseline_scan(db, publications, PROBE), args.baseline_repeat)
+        scan = best_of(lambda: array_scan(db, author_id), args.repeat)
+        print(f"{n:>12} {db.author_pubs.count(author_id):>10} {indexed:>13.1f} {baseline:>14.1f} {scan:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""Time and peak memory of Database.read and every Database.get_* method.
+
+For each --records size a synthetic DBLP file is written with
+synthetic.write_dblp (or --data is used), and a fresh interpreter reads it
+and calls every get_* method with representative arguments. Each call is
+timed three ways:
+
+    first    the first call in a fixed order, including any index or
+             aggregate it is the first to need
+    cold     with the result cache emptied, best of --repeat
+    warm     straight after a cold call, best of --repeat
+
+and its peak traced allocation (tracemalloc, which NumPy reports to) is
+taken from one more cold call. Database.read reports its time and the
+peak resident set size of the process.
+
+Results are written as JSON to --output, together with the commit and
+environment they were measured in. --compare OLD NEW prints the ratio of
+every time and peak between two such files and exits with status 1 if any
+of at least a millisecond or a MiB got worse by more than --threshold.
+
+Run from the repository root:
+
+    PYTHONPATH=src python bench/bench_database.py --records 10000 100000 --output bench.json
+    PYTHONPATH=src python bench/bench_database.py --compare before.json after.json
+"""
+import argparse
+import contextlib
+import datetime
+import inspect
+import io
+import json
+import os
+import platform
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import synthetic
+
+METRICS = ["first_s", "cold_s", "warm_s", "peak_mb"]
+# smallest time (s) and memory (MiB) --compare reports as worse
+FLOOR = {"s": 1e-3, "seconds": 1e-3, "mb": 1.0}
+
+
+def arguments(db):
+    """Argument tuples to call each get_* method with, by method name.
+
+    Methods taking only self need no entry. The probe author is the most
+    prolific one, and the probe year the median publication year.
+    """
+    from comp62521.database.database import Stat
+    store = db.publications
+    author = db.authors[int(np.bincount(store.author_ids).argmax())].name
+    year = int(np.median(store.year))
+    surname = author.split()[-1].lower()
+    ranges = [(db.min_year, db.max_year, 4), (year - 5, year, 1)]
+    args = {
+        "get_all_authors_stat_by_year": [(year,), (year, 0, 100)],
+        "get_all_publications": [(), (0, 100, 2)],
+        "get_author_details": ranges + [(db.min_year, db.max_year, 4, 0, 100, 1, True)],
+        "get_author_stat": [(author.lower(),)],
+        "get_author_stats_by_click": [(author,)],
+        "get_coauthor_data": ranges + [(db.min_year, db.max_year, 4, 0, 100, 1, True)],
+        "get_coauthor_details": [(author,)],
+        "get_coauthor_details_lowerCase": [(author.lower(),)],
+        "get_coauthor_graph": [(), ranges[1]],
+        "get_partial_match": [(surname,)],
+        "get_publications_by_author": [(), (0, 100, 5, True)],
+        "get_publications_for_year": [(year,)],
+    }
+    for name, _ in inspect.getmembers(type(db), inspect.isfunction):
+        if name.startswith("get_average_") or name == "get_publication_summary_average":
+            args[name] = [(av,) for av in (Stat.MEAN, Stat.MEDIAN, Stat.MODE)]
+    return args
+
+
+def methods(db, pattern):
+    """(label, method name, args) of every call to make, in a fixed order."""
+    args = arguments(db)
+    calls = []
+    for name, function in inspect.getmembers(type(db), inspect.isfunction):
+        if not name.startswith("get_") or not re.search(pattern, name):
+            continue
+        required = [p for p in list(inspect.signature(function).parameters.values())[1:]
+                    if p.default is p.empty]
+        for a in args.get(name, [()] if not required else [None]):
+            calls.append((f"{name}{a!r}" if a else name, name, a))
+    return calls
+
+
+def measure(db, name, args, repeat):
+    method = getattr(db, name)
+    # output of the methods, e.g. progress messages, is not part of the result
+    quiet = contextlib.redirect_stdout(io.StringIO())
+
+    def timed():
+        start = time.perf_counter()
+        with quiet:
+            method(*args)
+        return time.perf_counter() - start
+
+    result = {"first_s": timed()}
+    cold, warm = [], []
+    for _ in range(repeat):
+        db.cache.clear()
+        cold.append(timed())
+        warm.append(timed())
+    db.cache.clear()
+    tracemalloc.start()
+    with quiet:
+        method(*args)
+    result["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    result["cold_s"] = min(cold)
+    result["warm_s"] = min(warm)
+    return result
+
+
+def worker(filename, pattern, repeat):
+    from comp62521.database import database
+    db = database.Database()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        valid = db.read(filename)
+    run = {"file_mb": os.path.getsize(filename) / 2 ** 20, "valid": valid,
+           "publications": len(db.publications), "authors": len(db.authors),
+           "read": {"seconds": time.perf_counter() - start,
+                    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024},
+           "methods": {}}
+    for label, name, args in methods(db, pattern):
+        if args is None:
+            run["methods"][label] = {"error": "no arguments known; add them to arguments()"}
+            continue
+        try:
+            run["methods"][label] = measure(db, name, args, repeat)
+        except Exception as e:
+            run["methods"][label] = {"error": f"{type(e).__name__}: {e}"}
+    print(json.dumps(run))
+
+
+def environment():
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], check=True, capture_output=True, text=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+            "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(), "numpy": np.__version__,
+            "platform": platform.platform(), "cpus": os.cpu_count()}
+
+
+def compare(old_file, new_file, threshold):
+    with open(old_file) as f:
+        old = json.load(f)
+    with open(new_file) as f:
+        new = json.load(f)
+    print(f"old {old['environment']['commit']}  new {new['environment']['commit']}")
+    print(f"{'records':>9} {'measurement':<60} {'metric':>12} {'old':>10} {'new':>10} {'ratio':>7}")
+    worse = 0
+    for size, run in new["runs"].items():
+        before = old["runs"].get(size)
+        if before is None:
+            continue
+        rows = [("Database.read", "seconds", before["read"]["seconds"], run["read"]["seconds"]),
+                ("Database.read", "peak_rss_mb", before["read"]["peak_rss_mb"], run["read"]["peak_rss_mb"])]
+        for label, result in run["methods"].items():
+            previous = before["methods"].get(label, {})
+            rows += [(label, m, previous[m], result[m]) for m in METRICS if m in result and m in previous]
+        for label, metric, a, b in rows:
+            ratio = b / a if a else float("inf") if b else 1.0
+            flag = ""
+            # below the floor, differences are timer and allocator noise
+            if ratio > threshold and max(a, b) >= FLOOR[metric.rsplit("_", 1)[-1]]:
+                worse += 1
+                flag = "  worse"
+            print(f"{size:>9} {label[:60]:<60} {metric:>12} {a:>10.4g} {b:>10.4g} {ratio:>7.2f}{flag}")
+    print(f"{worse} measurements worse by more than {threshold:.2f}x")
+    return 1 if worse else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", help="XML file to read instead of synthetic ones")
+    parser.add_argument("--records", type=int, nargs="+", default=[10000, 100000],
+                        help="sizes of the synthetic files")
+    parser.add_argument("--methods", default="", help="regular expression selecting the get_* methods")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="JSON file to write the results to (default: stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="ratio above which --compare reports a measurement as worse")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.compare:
+        sys.exit(compare(*args.compare, args.threshold))
+    if args.worker:
+        worker(args.worker, args.methods, args.repeat)
+        return
+
+    results = {"environment": environment(), "runs": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {}
+        if args.data:
+            files["data"] = args.data
+        else:
+            for records in args.records:
+                files[str(records)] = os.path.join(tmp, f"synthetic-{records}.xml")
+                synthetic.write_dblp(files[str(records)], records)
+        for size, filename in files.items():
+            out = subprocess.run([sys.executable, __file__, "--worker", filename, "--methods", args.methods,
+                                  "--repeat", str(args.repeat)],
+                                 check=True, capture_output=True, text=True).stdout
+            run = results["runs"][size] = json.loads(out.splitlines()[-1])
+            print(f"{size}: {run['publications']} publications, read in {run['read']['seconds']:.2f} s, "
+                  f"peak RSS {run['read']['peak_rss_mb']:.0f} MiB", file=sys.stderr)
+    text = json.dumps(results, indent=1, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""Throughput and latency of the web pages under concurrent requests.
+
+A server process serves the app with werkzeug's threaded server, on a
+Database read from a synthetic DBLP file of --records records (or --data),
+or on a MockDatabase(size=--mock), whose generated results time the page
+rendering apart from the queries. --url targets a server that is already
+running instead.
+
+--concurrency client threads then send requests back to back for
+--duration seconds, each drawn from a weighted mix of all the routes with
+the arguments real visitors use: names of authors found through /api, in
+full, lower-cased, as a surname or as the first letters of one, year
+ranges, pub_type values, table pages, sort orders and name filters. A
+share --unpaged of the table pages asks for whole tables. Requests started
+in the first --warmup seconds are not counted.
+
+For every route the number of requests and errors, the requests per
+second and the 50th, 95th and 99th percentile latency are printed, and
+with --output written as JSON together with the environment. The clients
+share the machine with the server, so keep --concurrency near the number
+of cores the server is meant to use.
+
+--workers N serves from the prefork server of comp62521.prefork instead,
+and the RSS, PSS and private memory of the server and each worker, read
+from smaps_rollup once the load is over, are reported too.
+
+Run from the repository root:
+
+    PYTHONPATH=src python bench/bench_http.py --records 100000 --concurrency 4 --duration 30
+    PYTHONPATH=src python bench/bench_http.py --mock 100000 --routes coauthors --output mock.json
+    PYTHONPATH=src python bench/bench_http.py --records 100000 --workers 4 --concurrency 8
+"""
+import argparse
+import contextlib
+import http.client
+import json
+import logging
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+import synthetic
+from bench_database import environment
+
+PERCENTILES = [50, 95, 99]
+PAGE_SIZES = [25, 100]
+# pub_type 4 is all types, which the pages start with
+PUB_TYPES = [0, 1, 2, 3, 4, 4, 4, 4]
+SAMPLE_AUTHORS = 500
+
+
+def year_range(rng, sample):
+    """start_year, end_year and pub_type arguments, sometimes left out."""
+    if rng.random() < 0.2:
+        return {}
+    first, last = sample["years"]
+    start = rng.randint(first, last)
+    end = min(last, start + int(rng.expovariate(1 / 5)))
+    return {"start_year": start, "end_year": end, "pub_type": rng.choice(PUB_TYPES)}
+
+
+def page(rng, sample, columns, filter_names=True):
+    """offset, limit, sort and name arguments of a table page."""
+    if rng.random() < sample["unpaged"]:
+        args = {}
+    else:
+        limit = rng.choice(PAGE_SIZES)
+        # most visitors stay on the first few pages
+        args = {"offset": limit * min(int(rng.expovariate(1 / 2)), 50), "limit": limit}
+    if rng.random() < 0.3:
+        args.update(sort=rng.randrange(columns), order=rng.choice(["asc", "desc"]))
+    if filter_names and rng.random() < 0.1:
+        args["name"] = surname(rng, sample)[:rng.randint(3, 6)]
+    return args
+
+
+def name(rng, sample):
+    """An author name as typed into the search box."""
+    author = rng.choice(sample["authors"])
+    kind = rng.random()
+    if kind < 0.4:
+        return author
+    if kind < 0.6:
+        return author.lower()
+    if kind < 0.8:
+        return author.split()[-1]
+    return author.split()[-1][:rng.randint(2, 5)].lower()
+
+
+def surname(rng, sample):
+    return rng.choice(sample["authors"]).split()[-1].lower()
+
+
+def query(path, args):
+    return path + ("?" + urllib.parse.urlencode(args) if args else "")
+
+
+# route label, weight and the function drawing a request path for it
+ROUTES = [
+    ("/", 2, lambda rng, s: "/"),
+    ("/averages", 2, lambda rng, s: "/averages"),
+    ("/coauthors", 4, lambda rng, s: query("/coauthors", {**year_range(rng, s), **page(rng, s, 2)})),
+    ("/statisticsdetails/publication_summary", 1, lambda rng, s: "/statisticsdetails/publication_summary"),
+    ("/statisticsdetails/publication_author", 3,
+     lambda rng, s: query("/statisticsdetails/publication_author", page(rng, s, 6))),
+    ("/statisticsdetails/publication_year", 1, lambda rng, s: "/statisticsdetails/publication_year"),
+    ("/statisticsdetails/author_year", 1, lambda rng, s: "/statisticsdetails/author_year"),
+    ("/search_author", 4, lambda rng, s: query("/search_author", {"authorName": name(rng, s)})),
+    ("/autocomplete", 8, lambda rng, s: query("/autocomplete", {"q": surname(rng, s)[:rng.randint(1, 6)]})),
+    ("/author_stats", 2, lambda rng, s: query("/author_stats", {"authorName": rng.choice(s["authors"])})),
+    ("/authorfirstlastsole", 3,
+     lambda rng, s: query("/authorfirstlastsole", {**year_range(rng, s), **page(rng, s, 4)})),
+    ("/authorstatsbyclick", 3, lambda rng, s: query("/authorstatsbyclick", {"author": rng.choice(s["authors"])})),
+    ("/department_VS_authors", 2,
+     lambda rng, s: query("/department_VS_authors", {"search_year": rng.randint(*s["years"]),
+                                                     **page(rng, s, 6, filter_names=False)})),
+    ("/publication_link", 2, lambda rng, s: query("/publication_link", page(rng, s, 12, filter_names=False))),
+    ("/api/coauthors", 1, lambda rng, s: query("/api/coauthors", {**year_range(rng, s), **page(rng, s, 2)})),
+    ("/api/authorstatsbyclick", 1,
+     lambda rng, s: query("/api/authorstatsbyclick", {"author": rng.choice(s["authors"])})),
+]
+
+
+def serve(source, size, workers):
+    """Serve the app on the data described by source, printing the port."""
+    from werkzeug.serving import make_server
+    from comp62521 import app
+    from comp62521.database import database, mock_database
+    from comp62521.prefork import PreforkServer
+    if source == "mock":
+        db = mock_database.MockDatabase(size)
+    else:
+        db = database.Database()
+        with contextlib.redirect_stdout(sys.stderr):
+            if not db.read(source):
+                sys.exit(1)
+    app.config['DATASET'] = os.path.basename(source)
+    app.config['DATABASE'] = db
+    # one log line per request would cost more than some of the pages
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    if workers:
+        server = PreforkServer(app, "127.0.0.1", 0, workers)
+        print(server.port, flush=True)
+    else:
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        print(server.server_port, flush=True)
+    server.serve_forever()
+
+
+@contextlib.contextmanager
+def server(args, tmp):
+    """Address of the server to load, --url or a new server process, and
+    the process id of the latter."""
+    if args.url:
+        yield urllib.parse.urlsplit(args.url).netloc, None
+        return
+    if args.mock is not None:
+        command = ["--serve", "mock", "--size", str(args.mock)]
+    else:
+        data = args.data
+        if data is None:
+            data = os.path.join(tmp, f"synthetic-{args.records}.xml")
+            synthetic.write_dblp(data, args.records)
+        command = ["--serve", data]
+    command += ["--workers", str(args.workers)]
+    process = subprocess.Popen([sys.executable, __file__] + command, stdout=subprocess.PIPE, text=True)
+    try:
+        port = process.stdout.readline().strip()
+        if not port:
+            sys.exit("the server did not start")
+        yield f"127.0.0.1:{port}", process.pid
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def get(address, path, timeout=60):
+    connection = http.client.HTTPConnection(address, timeout=timeout)
+    try:
+        connection.request("GET", path)
+        response = connection.getresponse()
+        body = response.read()
+        if response.status != 200:
+            raise RuntimeError(f"GET {path}: {response.status}")
+        return body
+    finally:
+        connection.close()
+
+
+def discover(address, unpaged):
+    """Author names and the range of years to draw arguments from."""
+    top = json.loads(get(address, "/api/statisticsdetails/publication_author?"
+                                  f"sort=5&order=desc&limit={SAMPLE_AUTHORS}"))["data"]
+    first = json.loads(get(address, f"/api/statisticsdetails/publication_author?limit={SAMPLE_AUTHORS}"))["data"]
+    years = [row[0] for row in json.loads(get(address, "/api/statisticsdetails/publication_year"))["data"]]
+    # the most prolific authors, whose pages are the largest, and as many others
+    authors = sorted({row[0] for row in top + first})
+    return {"authors": authors, "years": (min(years), max(years)), "unpaged": unpaged}
+
+
+def client(address, routes, sample, seed, start, warmup, stop, results, timeout):
+    rng = random.Random(seed)
+    labels = [label for label, _, _ in routes]
+    weights = [weight for _, weight, _ in routes]
+    connection = http.client.HTTPConnection(address, timeout=timeout)
+    while True:
+        k = rng.choices(range(len(routes)), weights)[0]
+        path = routes[k][2](rng, sample)
+        sent = time.perf_counter()
+        if sent >= stop:
+            break
+        try:
+            connection.request("GET", path)
+            response = connection.getresponse()
+            response.read()
+            ok = response.status < 400
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            ok = False
+        if sent - start >= warmup:
+            results.append((labels[k], time.perf_counter() - sent, ok))
+    connection.close()
+
+
+def server_memory(pid):
+    """smaps_rollup memory of the server process pid and of each of its
+    workers, by process id."""
+    from comp62521.prefork import memory_usage
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            workers = [int(child) for child in f.read().split()]
+    except OSError:
+        workers = []
+    return {str(p): memory_usage(p) for p in [pid] + workers if memory_usage(p) is not None}
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of a sorted list."""
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def summarize(results, seconds):
+    by_route = {}
+    for label, latency, ok in results:
+        route = by_route.setdefault(label, {"latencies": [], "errors": 0})
+        if ok:
+            route["latencies"].append(latency)
+        else:
+            route["errors"] += 1
+    summary = {}
+    for label in sorted(by_route):
+        latencies = sorted(by_route[label]["latencies"])
+        row = summary[label] = {"requests": len(latencies) + by_route[label]["errors"],
+                                "errors": by_route[label]["errors"]}
+        row["per_s"] = row["requests"] / seconds
+        for p in PERCENTILES:
+            row[f"p{p}_ms"] = percentile(latencies, p) * 1000 if latencies else None
+    return summary
+
+
+def report(summary, total):
+    print(f"{'route':<42} {'requests':>8} {'errors':>6} {'req/s':>8}" +
+          "".join(f" {f'p{p} ms':>9}" for p in PERCENTILES))
+    for label, row in list(summary.items()) + [("all", total)]:
+        print(f"{label[:42]:<42} {row['requests']:>8} {row['errors']:>6} {row['per_s']:>8.1f}" +
+              "".join(f" {row[f'p{p}_ms']:>9.1f}" if row[f"p{p}_ms"] is not None else f" {'-':>9}"
+                      for p in PERCENTILES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", help="XML file to serve instead of a synthetic one")
+    parser.add_argument("--records", type=int, default=100000, help="size of the synthetic file")
+    parser.add_argument("--mock", type=int, metavar="SIZE", help="serve a MockDatabase of SIZE rows")
+    parser.add_argument("--url", help="load a server already running at this address")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="serve from this many prefork workers rather than threads")
+    parser.add_argument("--routes", default="", help="regular expression selecting the routes")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=30, help="seconds to send requests for")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds of requests not counted")
+    parser.add_argument("--unpaged", type=float, default=0.02, help="share of table pages asking for whole tables")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON file to write the results to")
+    parser.add_argument("--serve", help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve, args.size, args.workers)
+        return
+
+    routes = [route for route in ROUTES if re.search(args.routes, route[0])]
+    if not routes:
+        sys.exit(f"no route matches {args.routes!r}")
+    with tempfile.TemporaryDirectory() as tmp, server(args, tmp) as (address, pid):
+        sample = discover(address, args.unpaged)
+        results = []
+        start = time.perf_counter()
+        stop = start + args.warmup + args.duration
+        threads = [threading.Thread(target=client, args=(address, routes, sample, args.seed + k, start,
+                                                         args.warmup, stop, results, args.timeout))
+                   for k in range(args.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # the last requests may run past the stop time
+        seconds = max(args.duration, time.perf_counter() - start - args.warmup)
+        memory = server_memory(pid) if pid is not None else {}
+
+    summary = summarize(results, seconds)
+    total = summarize([("all", latency, ok) for _, latency, ok in results], seconds)["all"] \
+        if results else {"requests": 0, "errors": 0, "per_s": 0, **{f"p{p}_ms": None for p in PERCENTILES}}
+    report(summary, total)
+    for k, (p, usage) in enumerate(memory.items()):
+        print(f"{'server' if k == 0 else 'worker'} {p}: RSS {usage['Rss'] / 2 ** 20:.1f} MiB, "
+              f"PSS {usage['Pss'] / 2 ** 20:.1f} MiB, private {usage['Private'] / 2 ** 20:.1f} MiB")
+    if args.output:
+        options = {k: getattr(args, k) for k in ("data", "records", "mock", "url", "routes", "concurrency",
+                                                 "duration", "warmup", "unpaged", "seed", "workers")}
+        with open(args.output, "w") as f:
+            json.dump({"environment": environment(), "options": options, "seconds": seconds,
+                       "routes": summary, "all": total, "memory": memory}, f, indent=1, sort_keys=True)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
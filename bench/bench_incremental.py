@@ -0,0 +1,121 @@
+"""Cost of catching the indexes and aggregates up with a few added
+publications, against building them from scratch.
+
+A synthetic DBLP file of --records records, written by
+synthetic.write_dblp (or --data), is read once. For every --deltas size d
+each index is built over all but the last d publications (and the names
+of their authors), then timed while it syncs with the rest, best of
+--repeat. The co-author graph is timed merging the graph of the d
+publications into that of the others, as Database.read_incremental does.
+The last row is the time of building each from scratch.
+
+Run from the repository root:
+
+    PYTHONPATH=src python bench/bench_incremental.py --records 100000 --deltas 10,100,1000,10000
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import synthetic
+from comp62521.database import database
+from comp62521.database.aggregate import AuthorYearTensor, CoauthorYearTensor, YearTypeCube
+from comp62521.database.graph import CoauthorGraph
+from comp62521.database.index import NgramIndex, PostingIndex, TokenPrefixIndex, YearIndex
+from comp62521.database.store import PublicationStore
+
+STORE_INDEXES = {
+    "postings": PostingIndex, "years": YearIndex, "year cube": YearTypeCube,
+    "author tensor": AuthorYearTensor, "co-author tensor": CoauthorYearTensor}
+NAME_INDEXES = {"trigrams": NgramIndex, "tokens": TokenPrefixIndex}
+
+
+def prefix(store, n):
+    """The first n publications of store, sharing its arrays."""
+    return PublicationStore.from_arrays(store.year[:n], store.pub_type[:n], store.author_offsets[:n + 1],
+                                        store.author_ids[:store.author_offsets[n]], store.columns,
+                                        store.link_valid[:n])
+
+
+def best(repeat, setup, timed):
+    """Least time of timed(setup()) over repeat runs."""
+    times = []
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        timed(state)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def delta_times(db, d, repeat):
+    """Seconds to catch every index up with the last d publications."""
+    store = db.publications
+    names = list(db.author_names.names_lower)
+    n = len(store) - d
+    base = prefix(store, n)
+    nauthors = int(store.author_ids[:store.author_offsets[n]].max()) + 1 if n else 0
+    times = {}
+    for name, index in STORE_INDEXES.items():
+        def setup(index=index):
+            built = index()
+            built.sync(base)
+            return built
+        times[name] = best(repeat, setup, lambda built: built.sync(store))
+    for name, index in NAME_INDEXES.items():
+        def setup(index=index):
+            built = index()
+            built.sync(names[:nauthors])
+            return built
+        times[name] = best(repeat, setup, lambda built: built.sync(names))
+    mask = np.zeros(len(store), dtype=bool)
+    mask[n:] = True
+    graph = CoauthorGraph.build(store, len(names), ~mask)
+    times["co-author graph"] = best(repeat, lambda: None, lambda _: graph.merged(
+        CoauthorGraph.build(store, len(names), mask)))
+    return times
+
+
+def build_times(db, repeat):
+    """Seconds to build every index from scratch."""
+    store = db.publications
+    names = list(db.author_names.names_lower)
+    times = {name: best(repeat, index, lambda built: built.sync(store)) for name, index in STORE_INDEXES.items()}
+    times.update({name: best(repeat, index, lambda built: built.sync(names)) for name, index in NAME_INDEXES.items()})
+    times["co-author graph"] = best(repeat, lambda: None, lambda _: CoauthorGraph.build(store, len(names)))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", help="XML file to read instead of a synthetic one")
+    parser.add_argument("--records", type=int, default=100000, help="size of the synthetic file")
+    parser.add_argument("--deltas", default="10,100,1000,10000",
+                        help="comma-separated numbers of publications to add")
+    parser.add_argument("--repeat", type=int, default=3, help="runs to take the best of")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = args.data
+        if filename is None:
+            filename = os.path.join(tmp, "synthetic.xml")
+            synthetic.write_dblp(filename, args.records)
+        db = database.Database()
+        with contextlib.redirect_stdout(io.StringIO()):
+            db.read(filename)
+    print(f"{len(db.publications)} publications, {len(db.authors)} authors; milliseconds")
+    rows = [(f"+{d}", delta_times(db, int(d), args.repeat)) for d in args.deltas.split(",") if d]
+    rows.append(("build", build_times(db, args.repeat)))
+    columns = list(rows[0][1])
+    print(f"{'':>8}" + "".join(f"{name:>17}" for name in columns))
+    for label, times in rows:
+        print(f"{label:>8}" + "".join(f"{times[name] * 1000:>17.1f}" for name in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""XML ingestion: the expat RecordReader and ParallelReader against the SAX
+DocumentHandler.
+
+Each reader reads the same file in a fresh interpreter, which reports the
+parse time, records per second, peak resident set size (of the process
+plus its largest worker) and a digest of the resulting Database, so the
+readers can be checked to build the same contents.
+Without --data a synthetic DBLP file of --records records, written by
+synthetic.write_dblp, is used.
+--workers lists the process counts to time the parallel reader with. It
+is run directly, as Database.read never forks more workers than there are
+CPUs. For each count the time the parent spent merging the chunks and the
+CPU time of the workers are reported too, and from them the time the read
+would take given a CPU per worker, which is what Database.read asks for.
+
+Run from the repository root:
+
+    PYTHONPATH=src python bench/bench_ingest.py --records 200000 --workers 2,4
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import synthetic
+from comp62521.database import database
+
+def digest(db):
+    h = hashlib.sha256()
+    for p in db.publications:
+        h.update(repr(sorted(vars(p).items())).encode("utf-8"))
+    h.update(repr([a.name for a in db.authors]).encode("utf-8"))
+    return h.hexdigest()
+
+
+def worker(parser, workers, filename):
+    db = database.Database()
+    merge = 0.0
+    if workers > 1:
+        def timed_merge(reader, chunks, merge_chunks=database.ParallelReader._merge):
+            nonlocal merge
+            start = time.perf_counter()
+            output = merge_chunks(reader, chunks)
+            merge = time.perf_counter() - start
+            return output
+        database.ParallelReader._merge = timed_merge
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if workers > 1:
+            database.ParallelReader(db, workers).read(filename)
+        else:
+            db.read(filename, parser=parser)
+    seconds = time.perf_counter() - start
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    print(json.dumps({
+        "parser": parser,
+        "workers": workers,
+        "records": len(db.publications),
+        "seconds": seconds,
+        "merge_seconds": merge,
+        "worker_cpu_seconds": children.ru_utime + children.ru_stime,
+        "records_per_sec": len(db.publications) / seconds,
+        "peak_rss_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                        + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / 1024,
+        "digest": digest(db)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", help="XML file to read instead of a synthetic one")
+    parser.add_argument("--records", type=int, default=100000,
+                        help="size of the synthetic file")
+    parser.add_argument("--workers", default="",
+                        help="comma-separated process counts for the parallel reader")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        name, workers = args.worker.split(":")
+        worker(name, int(workers), args.data)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = args.data
+        if filename is None:
+            filename = os.path.join(tmp, "synthetic.xml")
+            synthetic.write_dblp(filename, args.records)
+        print(f"{filename}: {os.path.getsize(filename) / 2 ** 20:.1f} MiB, "
+              f"{database.ParallelReader.available_cpus()} CPUs")
+        print(f"{'parser':>7} {'workers':>7} {'records':>9} {'seconds':>8} {'records/s':>10} "
+              f"{'peak RSS (MiB)':>15} {'merge':>6} {'worker CPU':>10} {'a CPU each':>10}")
+        runs = [("sax", 1), ("expat", 1)]
+        runs += [("expat", int(n)) for n in args.workers.split(",") if n]
+        digests = set()
+        for name, workers in runs:
+            out = subprocess.run([sys.executable, __file__, "--worker", f"{name}:{workers}", "--data", filename],
+                                 check=True, capture_output=True, text=True).stdout
+            r = json.loads(out.splitlines()[-1])
+            digests.add(r["digest"])
+            line = (f"{name:>7} {workers:>7} {r['records']:>9} {r['seconds']:>8.2f} "
+                    f"{r['records_per_sec']:>10.0f} {r['peak_rss_mb']:>15.1f}")
+            if workers > 1:
+                # the workers' share, if they ran side by side, then the merge
+                line += (f" {r['merge_seconds']:>6.2f} {r['worker_cpu_seconds']:>10.2f} "
+                         f"{r['worker_cpu_seconds'] / workers + r['merge_seconds']:>10.2f}")
+            print(line)
+        print("same contents:", len(digests) == 1)
+
+
+if __name__ == "__main__":
+    main()
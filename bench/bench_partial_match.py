@@ -0,0 +1,68 @@
+"""Fuzzy author search: trigram-shortlisted scoring against a linear scan.
+
+For each author set and query, checks that Database.get_partial_match
+returns exactly the names the original linear fuzzywuzzy scan returns,
+and reports the latency of both.
+
+Run from the repository root:
+
+    PYTHONPATH=src python bench/bench_partial_match.py
+"""
+import argparse
+import io
+import contextlib
+import random
+import time
+
+from comp62521.database import database
+
+FIRST = ["andrew", "maria", "wei", "john", "anna", "carlo", "peter", "li", "sam",
+         "samuel", "alice", "brian", "yuki", "fatima", "jose", "olga", "ravi", "chen"]
+LAST = ["brown", "batini", "smith", "zhang", "wang", "jones", "garcia", "doan",
+        "halevy", "sampaio", "esam", "sammer", "cornell", "goble", "li", "kim"]
+QUERIES = ["andrew", "cornell", "sam", "li", "carlo batini", "zhang", "an", "mike", "xyzzy"]
+
+
+def synthetic_authors(count, seed=0):
+    rng = random.Random(seed)
+    db = database.Database()
+    for i in range(count):
+        name = f"{rng.choice(FIRST)} {chr(97 + rng.randrange(26))}. {rng.choice(LAST)}{i}"
+        db.add_publication(0, f"Title {i}", None, 2000, [name.title()],
+                           None, None, None, None, None, None, None, None, None)
+    return db
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1e3
+
+
+def compare(label, db, queries):
+    names = db.get_all_author_names_lower()
+    db.get_partial_match("warm up")
+    print(f"\n{label}: {len(names)} authors")
+    print(f"{'query':>14} {'matches':>8} {'scan (ms)':>10} {'indexed (ms)':>13} {'same':>5}")
+    for q in queries:
+        expected, scan_ms = timed(lambda: db._scan_partial_match(q, names))
+        got, index_ms = timed(lambda: db.get_partial_match(q))
+        print(f"{q!r:>14} {expected[0]:>8} {scan_ms:>10.2f} {index_ms:>13.3f} {str(got == expected):>5}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default="data/dblp_curated_sample.xml")
+    parser.add_argument("--authors", type=int, default=50000,
+                        help="size of the synthetic author set")
+    args = parser.parse_args()
+
+    db = database.Database()
+    with contextlib.redirect_stdout(io.StringIO()):
+        db.read(args.data)
+    compare(args.data, db, QUERIES)
+    compare("synthetic", synthetic_authors(args.authors), QUERIES)
+
+
+if __name__ == "__main__":
+    main()
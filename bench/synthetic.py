@@ -0,0 +1,199 @@
+"""Synthetic DBLP XML following data/dblp.dtd, from a thousand to tens of
+millions of records.
+
+The shape follows the real DBLP dump rather than a uniform draw:
+
+- record types are mostly conference papers and journal articles, with a
+  few book chapters, books, proceedings volumes (editors, no authors) and
+  www homepage records, the last two being skipped by the readers;
+- the number of publications per year grows by about 8% a year;
+- the number of authors per publication peaks at two or three, with a
+  long tail of large collaborations;
+- authors appear over time and a few of them write a large share of the
+  papers, so publication counts per author are heavy-tailed;
+- names repeat, and homonyms get DBLP's four-digit suffix ("Wei Wang 0003");
+- titles contain the sub/sup/i markup of the DTD, and about one record in
+  ten has no electronic edition (ee) link.
+
+The file is written in chunks, so memory stays flat at any size. Run from
+the repository root:
+
+    python bench/synthetic.py --records 1000000 /tmp/dblp-1m.xml
+"""
+import argparse
+
+import numpy as np
+
+FIRST_YEAR = 1970
+LAST_YEAR = 2020
+YEARLY_GROWTH = 1.08
+# record type and its share of the records
+TYPES = [("inproceedings", 0.55), ("article", 0.375), ("incollection", 0.045),
+         ("book", 0.01), ("proceedings", 0.01), ("www", 0.01)]
+# share of publications with 1, 2, ... 10 authors; the rest have more
+AUTHOR_COUNTS = [0.14, 0.25, 0.23, 0.15, 0.09, 0.05, 0.03, 0.02, 0.015, 0.01]
+# authors per record, and the exponent that makes early authors prolific
+AUTHORS_PER_RECORD = 0.5
+POPULARITY = 1.6
+CHUNK = 10000
+
+FIRST = ["Wei", "Li", "Yang", "Jun", "Hui", "Lei", "Yu", "Xin", "Jing", "Ming", "Hao", "Ying",
+         "Andrew", "David", "Michael", "John", "Robert", "James", "Peter", "Thomas", "Daniel",
+         "Maria", "Anna", "Laura", "Sarah", "Elena", "Julia", "Sofia", "Claudia", "Monica",
+         "Carlo", "Stefano", "Marco", "Paolo", "Luca", "Giovanni", "Francesco", "Alessandro",
+         "Hans", "Klaus", "Jürgen", "Stefan", "Wolfgang", "Andreas", "Markus", "Matthias",
+         "Pierre", "Jean", "François", "Philippe", "Nicolas", "Olivier", "Stéphane",
+         "José", "Carlos", "Juan", "Jorge", "Pedro", "Luis", "Javier", "Miguel",
+         "Hiroshi", "Takashi", "Kenji", "Yuki", "Satoshi", "Akira", "Sanjay", "Rajesh",
+         "Amit", "Anil", "Ravi", "Priya", "Fatima", "Mohammed", "Ahmed", "Ali", "Omar",
+         "Olga", "Ivan", "Sergey", "Dmitry", "Natalia", "Anders", "Lars", "Erik", "Ingrid"]
+LAST = ["Wang", "Li", "Zhang", "Liu", "Chen", "Yang", "Huang", "Zhao", "Wu", "Zhou", "Xu",
+        "Sun", "Ma", "Zhu", "Hu", "Guo", "Lin", "He", "Gao", "Luo", "Kim", "Lee", "Park",
+        "Smith", "Johnson", "Williams", "Brown", "Jones", "Miller", "Davis", "Wilson",
+        "Taylor", "Anderson", "Thomas", "Moore", "Martin", "Jackson", "White", "Harris",
+        "Rossi", "Russo", "Ferrari", "Esposito", "Bianchi", "Romano", "Colombo", "Ricci",
+        "Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner", "Becker",
+        "Dubois", "Durand", "Lefebvre", "Moreau", "Laurent", "García", "Martínez",
+        "López", "Sánchez", "Pérez", "Gómez", "Tanaka", "Suzuki", "Takahashi",
+        "Watanabe", "Sato", "Kumar", "Singh", "Sharma", "Gupta", "Patel", "Reddy", "Khan",
+        "Hassan", "Ivanov", "Petrov", "Smirnov", "Nielsen", "Hansen", "Andersson", "Johansson"]
+INITIALS = "ABCDEFGHJKLMNPRST"
+WORDS = ["data", "query", "web", "semantic", "graph", "schema", "integration", "streams",
+         "ontology", "mining", "privacy", "workflow", "index", "cloud", "learning", "neural",
+         "distributed", "efficient", "scalable", "adaptive", "processing", "optimization",
+         "networks", "systems", "analysis", "model", "approach", "framework", "evaluation",
+         "XML", "SQL", "transactions", "caching", "peer-to-peer", "mobile", "sensor"]
+
+
+def author_name(a):
+    """Name of author id a. Ids sharing a name get DBLP homonym suffixes."""
+    combos = len(FIRST) * len(LAST) * (len(INITIALS) + 1)
+    # a prime multiplier spreads consecutive ids over all the names
+    k, homonym = a * 1000003 % combos, a // combos
+    first, rest = FIRST[k % len(FIRST)], k // len(FIRST)
+    last, initial = LAST[rest % len(LAST)], rest // len(LAST)
+    name = f"{first} {INITIALS[initial - 1]}. {last}" if initial else f"{first} {last}"
+    return f"{name} {homonym:04d}" if homonym else name
+
+
+def title(rng):
+    words = [WORDS[w] for w in rng.integers(0, len(WORDS), rng.integers(3, 12))]
+    words[0] = words[0][0].upper() + words[0][1:]
+    markup = rng.random()
+    if markup < 0.03:
+        words[-1] += f"<sub>{rng.integers(1, 9)}</sub>"
+    elif markup < 0.05:
+        words[-1] += f"<sup>{rng.integers(2, 4)}</sup>"
+    elif markup < 0.1:
+        words[-1] = f"<i>{words[-1]}</i>"
+    elif markup < 0.12:
+        words.insert(len(words) // 2, "&amp;")
+    return " ".join(words) + "."
+
+
+def year_weights():
+    years = np.arange(FIRST_YEAR, LAST_YEAR + 1)
+    weights = YEARLY_GROWTH ** (years - FIRST_YEAR)
+    return years, weights / weights.sum()
+
+
+def author_counts(rng, n):
+    """Number of authors of each of n publications."""
+    p = np.array(AUTHOR_COUNTS + [1 - sum(AUTHOR_COUNTS)])
+    counts = rng.choice(np.arange(1, len(p) + 1), size=n, p=p)
+    tail = counts == len(p)
+    # large collaborations: 11 authors and up, a few in the hundreds
+    counts[tail] = 10 + np.minimum(np.ceil(rng.pareto(1.5, tail.sum()) * 3), 300).astype(int)
+    return counts
+
+
+def write_dblp(filename, records, seed=0):
+    """Write a synthetic DBLP file of records records to filename."""
+    rng = np.random.default_rng(seed)
+    nauthors = max(10, int(records * AUTHORS_PER_RECORD))
+    years, share = year_weights()
+    # authors appear in id order: by year y, those born up to the share of
+    # the records published before y
+    born = np.maximum(10, (np.cumsum(share) * nauthors).astype(np.int64))
+    tags = [tag for tag, _ in TYPES]
+    type_share = np.array([p for _, p in TYPES])
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE dblp SYSTEM "dblp.dtd">\n<dblp>\n')
+        for start in range(0, records, CHUNK):
+            n = min(CHUNK, records - start)
+            kinds = rng.choice(len(tags), size=n, p=type_share)
+            y = rng.choice(len(years), size=n, p=share)
+            counts = author_counts(rng, n)
+            out = []
+            for i in range(n):
+                out.append(record(rng, start + i, tags[kinds[i]], int(years[y[i]]), int(counts[i]),
+                                  int(born[y[i]])))
+            f.write("".join(out))
+        f.write("</dblp>\n")
+
+
+def record(rng, i, tag, year, count, born):
+    # draw distinct authors, favouring the earliest born
+    ids = np.unique((born * rng.random(count) ** POPULARITY).astype(np.int64))
+    rng.shuffle(ids)
+    names = [author_name(a) for a in ids.tolist()]
+    if tag == "www":
+        return f'<www mdate="2020-01-01" key="homepages/{i}">\n<author>{names[0]}</author>\n' \
+               f"<title>Home Page</title>\n<url>https://example.org/~{i}</url>\n</www>\n"
+    venue = int(born * rng.random() ** 2) % 3000
+    lines = [f'<{tag} mdate="{year + 1}-0{1 + i % 9}-1{i % 10}" key="{key(tag, venue, i)}">']
+    role = "editor" if tag == "proceedings" else "author"
+    lines += [f"<{role}>{name}</{role}>" for name in names]
+    lines.append(f"<title>{title(rng)}</title>")
+    first_page = int(rng.integers(1, 900))
+    if tag != "proceedings" and tag != "book":
+        lines.append(f"<pages>{first_page}-{first_page + int(rng.integers(4, 30))}</pages>")
+    lines.append(f"<year>{year}</year>")
+    if tag == "article":
+        lines.append(f"<volume>{max(1, year - 1960 - venue % 20)}</volume>")
+        lines.append(f"<journal>{journal(venue)}</journal>")
+        lines.append(f"<number>{1 + i % 12}</number>")
+    elif tag in ("inproceedings", "incollection"):
+        lines.append(f"<booktitle>{conference(venue)}</booktitle>")
+    if tag in ("book", "proceedings"):
+        lines.append(f"<publisher>{['Springer', 'ACM', 'IEEE Computer Society', 'Morgan Kaufmann'][venue % 4]}"
+                     "</publisher>")
+        if venue % 3 == 0:
+            lines.append(f"<series>Lecture Notes in Computer Science</series>\n<volume>{1000 + i % 9000}</volume>")
+        lines.append(f"<isbn>978-3-{i % 1000:03d}-{venue:05d}-{i % 10}</isbn>")
+    if rng.random() >= 0.1:
+        lines.append(f"<ee>https://doi.org/10.{1000 + venue}/{tag[:4]}.{year}.{i}</ee>")
+    if tag in ("inproceedings", "incollection"):
+        lines.append(f"<crossref>{key('proceedings', venue, year)}</crossref>")
+    lines.append(f"<url>db/{key(tag, venue, i).rsplit('/', 1)[0]}.html#{i}</url>")
+    lines.append(f"</{tag}>\n")
+    return "\n".join(lines)
+
+
+def key(tag, venue, i):
+    if tag == "article":
+        return f"journals/j{venue}/{i}"
+    if tag in ("book", "incollection"):
+        return f"books/b{venue}/{i}"
+    return f"conf/c{venue}/{i}"
+
+
+def journal(venue):
+    return f"{WORDS[venue % len(WORDS)].capitalize()} Journal {venue}"
+
+
+def conference(venue):
+    return f"{WORDS[venue % len(WORDS)].upper()[:4]}-{venue}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output", help="XML file to write")
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_dblp(args.output, args.records, args.seed)
+
+
+if __name__ == "__main__":
+    main()
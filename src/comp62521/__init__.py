@@ -3,3 +3,6 @@ from flask import Flask
 app = Flask(__name__)
 
 from comp62521 import views
+from comp62521 import api
+from comp62521 import metrics
+from comp62521 import profiling
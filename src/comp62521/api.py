@@ -0,0 +1,162 @@
+"""JSON counterparts of the statistics pages, under /api.
+
+Each route returns what the Database call behind its page returns, taking
+the same query arguments. Responses carry a strong ETag derived from the
+Database fingerprint and the request, are answered with 304 Not Modified
+when the client already holds that ETag, and are compressed with gzip or
+deflate when the client accepts it.
+"""
+import functools
+import gzip
+import hashlib
+import json
+import zlib
+
+from flask import Response, abort, request
+
+from comp62521 import app
+from comp62521.database import database
+from comp62521.views import table_options, year_range
+
+# bodies shorter than this are not worth compressing
+MIN_COMPRESS = 1024
+# level 1 compresses large tables several times faster than the default,
+# for somewhat larger output
+COMPRESS_LEVEL = 1
+# HTTP's deflate is the zlib format; gzip gets a fixed mtime so that the
+# same content always compresses to the same bytes, as a strong ETag needs
+ENCODERS = {
+    "gzip": lambda body: gzip.compress(body, COMPRESS_LEVEL, mtime=0),
+    "deflate": lambda body: zlib.compress(body, COMPRESS_LEVEL),
+}
+
+
+def json_route(rule):
+    """Register view as /api + rule. view returns the object to send as
+    JSON, and is only called when the client's copy is out of date."""
+    def register(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            db = app.config['DATABASE']
+            encoding = request.accept_encodings.best_match(list(ENCODERS))
+            key = (request.path, sorted(request.args.items(multi=True)))
+            etag = hashlib.sha1(repr((db.fingerprint(), key)).encode("utf-8")).hexdigest()
+            if encoding is not None:
+                etag += "-" + encoding
+            if request.if_none_match.contains_weak(etag):
+                return not_modified(etag)
+            cache = getattr(db, "cache", None)
+            found, body = cache.get(("api", etag)) if cache is not None else (False, None)
+            if not found:
+                try:
+                    payload = view(db, **kwargs)
+                except ValueError as e:
+                    abort(400, str(e))
+                body = json.dumps(payload, separators=(",", ":"), default=_plain).encode("utf-8")
+                if encoding is not None and len(body) >= MIN_COMPRESS:
+                    body = (encoding, ENCODERS[encoding](body))
+                else:
+                    body = (None, body)
+                if cache is not None:
+                    cache.sync(db.version)
+                    cache.put(("api", etag), body)
+            response = Response(body[1], mimetype="application/json")
+            if body[0] is not None:
+                response.headers["Content-Encoding"] = body[0]
+            return with_validators(response, etag)
+        return app.route("/api" + rule, endpoint="api_" + view.__name__)(wrapper)
+    return register
+
+
+def not_modified(etag):
+    return with_validators(Response(status=304), etag)
+
+
+def with_validators(response, etag):
+    response.set_etag(etag)
+    response.headers["Vary"] = "Accept-Encoding"
+    # clients may keep responses but must revalidate them before use
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def _plain(value):
+    """NumPy scalars and tuples-as-arrays, as json.dumps understands them."""
+    if hasattr(value, "item"):
+        return value.item()
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def table(result):
+    header, data = result
+    return {"header": list(header), "data": data}
+
+
+@json_route("/averages")
+def averages(db):
+    titles = ["Average Authors per Publication", "Average Publications per Author",
+              "Average Publications in a Year", "Average Authors in a Year"]
+    header, stats = db.get_averages()
+    averages = [database.Stat.MEAN, database.Stat.MEDIAN, database.Stat.MODE]
+    return {"header": ["Average"] + list(header),
+            "tables": [{"title": title, "rows": [[database.Stat.STR[av]] + list(rows[av]) for av in averages]}
+                       for title, rows in zip(titles, stats)]}
+
+
+@json_route("/coauthors")
+def coauthors(db):
+    return table(db.get_coauthor_data(*year_range(db), **table_options({}, database.Database.COAUTHOR_HEADER)))
+
+
+@json_route("/statisticsdetails/<status>")
+def statistics_details(db, status):
+    if status == "publication_summary":
+        return table(db.get_publication_summary())
+    if status == "publication_author":
+        return table(db.get_publications_by_author(
+            **table_options({}, database.Database.PUBLICATIONS_BY_AUTHOR_HEADER)))
+    if status == "publication_year":
+        return table(db.get_publications_by_year())
+    if status == "author_year":
+        return table(db.get_author_totals_by_year())
+    abort(404)
+
+
+@json_route("/author_stats")
+def author_stats(db):
+    return table(db.get_author_stat(request.args.get("authorName", "").lower()))
+
+
+@json_route("/authorfirstlastsole")
+def author_first_last_sole(db):
+    return table(db.get_author_details(*year_range(db),
+                                       **table_options({}, database.Database.AUTHOR_DETAILS_HEADER)))
+
+
+@json_route("/authorstatsbyclick")
+def author_stats_by_click(db):
+    (found, publications, first, last, sole, coauthors, author_type, external, nexternal,
+     name) = db.get_author_stats_by_click(request.args.get("author", ""))
+    return {"found": found, "author": name, "type": author_type,
+            "header": ["All Publications", "Conference Paper", "Journal", "Book", "Book Chapter"],
+            "publications": publications, "first": first, "last": last, "sole": sole,
+            "coauthors": coauthors,
+            "external_coauthors": external.split(", ") if external else [],
+            "external_coauthor_count": nexternal}
+
+
+@json_route("/department_VS_authors")
+def department_vs_authors(db):
+    search_year = int(request.args.get("search_year", db.min_year))
+    options = table_options({})
+    header, data = db.get_all_authors_stat_by_year(search_year, options["offset"], options["limit"])
+    return {"header": list(header), "data": data, "department": table(db.get_publications_for_year(search_year))}
+
+
+@json_route("/publication_link")
+def publication_link(db):
+    options = table_options({}, db.PUBLICATION_LINK_HEADER)
+    return table(db.get_all_publications(options["offset"], options["limit"], options["sort"],
+                                         options["descending"]))
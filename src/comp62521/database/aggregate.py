@@ -0,0 +1,388 @@
+"""Publication counts over year ranges, answered without rescanning the
+publications.
+
+YearTypeCube counts publications by year and type, with running totals so
+that a range is the difference of two rows. RangeTable holds sparse counts
+keyed by a group and a year, sorted by group then year with running totals
+alongside, so that the totals of a group over a year range are the
+difference of two rows of the running totals, and those of all groups the
+sums of the rows in range, found through a year ordered permutation of
+the rows so that only those are read. AuthorYearTensor and
+CoauthorYearTensor use one to count, by year and type, the publications
+and author positions of every author and the shared publications of every
+pair of co-authors.
+
+All of them are caught up with a PublicationStore by sync, which only
+looks at the publications added since the previous call.
+"""
+import numpy as np
+
+from comp62521.database.graph import PAIR_BLOCK, CoauthorGraph
+
+# years are stored as offsets from YEAR_BASE, missing years being -1
+YEAR_BASE = -1
+YEAR_SPAN = 1 << 15
+# no position in the store is this large
+NOWHERE = np.iinfo(np.int64).max
+
+
+class YearTypeCube:
+    """Dense (year x publication type) publication counts with running
+    totals along the years."""
+
+    def __init__(self):
+        self.size = 0
+        self.years = np.zeros(0, dtype=np.int64)
+        self.first = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros((0, 4), dtype=np.int64)
+        self.cum = np.zeros((1, 4), dtype=np.int64)
+
+    def sync(self, store):
+        """Count every publication of store added since the last call."""
+        start = self.size
+        if start >= len(store):
+            return
+        years, first, inverse = np.unique(store.year[start:], return_index=True, return_inverse=True)
+        counts = np.bincount(inverse.ravel() * 4 + store.pub_type[start:],
+                             minlength=len(years) * 4).reshape(len(years), 4)
+        pos = np.searchsorted(self.years, years)
+        known = _found(self.years, years, pos)
+        self.counts[pos[known]] += counts[known]
+        self.years = np.insert(self.years, pos[~known], years[~known])
+        self.first = np.insert(self.first, pos[~known], start + first[~known])
+        self.counts = np.insert(self.counts, pos[~known], counts[~known], axis=0)
+        self.cum = np.zeros((len(self.years) + 1, 4), dtype=np.int64)
+        np.cumsum(self.counts, axis=0, out=self.cum[1:])
+        self.size = len(store)
+
+    def years_in_order(self):
+        """Distinct publication years, in the order they were first read."""
+        return self.years[np.argsort(self.first)].tolist()
+
+    def range_counts(self, start_year=None, end_year=None):
+        """Publications by type published from start_year to end_year."""
+        lo = 0 if start_year is None else np.searchsorted(self.years, start_year, "left")
+        hi = len(self.years) if end_year is None else np.searchsorted(self.years, end_year, "right")
+        return self.cum[max(hi, lo)] - self.cum[lo]
+
+    def __getitem__(self, year):
+        """Publications by type published in year."""
+        return self.range_counts(year, year)
+
+
+class RangeTable:
+    """Sparse counts keyed by (group, year), for groups below 2 ** 48.
+
+    Each key has a row of summed values and, optionally, a smallest
+    position (NOWHERE if there is none). Keys are kept sorted, so those of
+    one group form a run ordered by year; groups and years hold the two
+    halves of every key, starts the first row of every group's run, cum
+    the running totals of the values over all rows, and by_year the rows
+    ordered by year, whose years are sorted_years.
+    """
+
+    def __init__(self, nvalues):
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.values = np.zeros((0, nvalues), dtype=np.int64)
+        self.first = np.zeros(0, dtype=np.int64)
+        self.groups = np.zeros(0, dtype=np.int64)
+        self.years = np.zeros(0, dtype=np.int16)
+        self.by_year = np.zeros(0, dtype=np.int64)
+        self.sorted_years = np.zeros(0, dtype=np.int16)
+        self.starts = np.zeros(1, dtype=np.int64)
+        self.cum = np.zeros((1, nvalues), dtype=np.int64)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, groups, years, values, first=None):
+        """Add one row of values, and optionally a position, per entry of
+        the groups and years arrays.
+
+        The keys new to the table are merged into the sorted arrays, so
+        besides sorting the entries added the cost is a copy of the table:
+        the year order is merged rather than sorted again, and the running
+        totals are only recomputed from the first row that changed.
+        """
+        keys = groups.astype(np.int64) * YEAR_SPAN + (years.astype(np.int64) - YEAR_BASE)
+        keys, inverse = np.unique(keys, return_inverse=True)
+        if not len(keys):
+            return
+        inverse = inverse.ravel()
+        summed = np.stack([np.bincount(inverse, weights=v, minlength=len(keys))
+                           for v in values.T], axis=1).astype(np.int64)
+        smallest = np.full(len(keys), NOWHERE, dtype=np.int64)
+        if first is not None:
+            np.minimum.at(smallest, inverse, first)
+
+        pos = np.searchsorted(self.keys, keys)
+        known = _found(self.keys, keys, pos)
+        self.values[pos[known]] += summed[known]
+        self.first[pos[known]] = np.minimum(self.first[pos[known]], smallest[known])
+        at = pos[~known]
+        added = keys[~known]
+        added_groups = added // YEAR_SPAN
+        added_years = (added % YEAR_SPAN + YEAR_BASE).astype(np.int16)
+        self.keys = np.insert(self.keys, at, added)
+        self.values = np.insert(self.values, at, summed[~known], axis=0)
+        self.first = np.insert(self.first, at, smallest[~known])
+        self.groups = np.insert(self.groups, at, added_groups)
+        self.years = np.insert(self.years, at, added_years)
+
+        # the old rows move up by the rows inserted before them; the new
+        # rows, where np.insert put them, are merged into the year order,
+        # which orders the rows of a year by row, by searching the run of
+        # rows of their year
+        rows = at + np.arange(len(at))
+        moved = self.by_year
+        if len(at) and at[0] < len(moved):
+            moved = moved + np.searchsorted(at, moved, "right")
+        order = np.lexsort((rows, added_years))
+        rows = rows[order]
+        added_years = added_years[order]
+        where = np.empty(len(rows), dtype=np.int64)
+        runs = np.flatnonzero(np.diff(added_years, prepend=YEAR_BASE - 1, append=YEAR_BASE - 1))
+        for lo, hi in zip(runs[:-1].tolist(), runs[1:].tolist()):
+            first_row = np.searchsorted(self.sorted_years, added_years[lo], "left")
+            last_row = np.searchsorted(self.sorted_years, added_years[lo], "right")
+            where[lo:hi] = first_row + np.searchsorted(moved[first_row:last_row], rows[lo:hi])
+        self.by_year = np.insert(moved, where, rows)
+        self.sorted_years = np.insert(self.sorted_years, where, added_years)
+
+        if len(added):
+            # only the groups after the first one with new rows start later
+            g = int(added_groups[0])
+            ngroups = max(len(self.starts) - 1, int(added_groups[-1]) + 1)
+            starts = np.empty(ngroups + 1, dtype=np.int64)
+            starts[:len(self.starts)] = self.starts
+            starts[len(self.starts):] = self.starts[-1]
+            starts[g + 1:] += np.cumsum(np.bincount(added_groups - g, minlength=ngroups - g))
+            self.starts = starts
+
+        # rows before the first one changed keep their running totals
+        lo = int(pos[0])
+        cum = np.empty((len(self.keys) + 1, self.values.shape[1]), dtype=np.int64)
+        cum[:lo + 1] = self.cum[:lo + 1]
+        np.cumsum(self.values[lo:], axis=0, out=cum[lo + 1:])
+        cum[lo + 1:] += cum[lo]
+        self.cum = cum
+
+    def rows(self, start_year=None, end_year=None):
+        """The rows in a year range, as an index into the table's arrays:
+        all of them, or those from the year ordered rows in range, which
+        are found by two binary searches and are in year order."""
+        lo = 0 if start_year is None else int(np.searchsorted(self.sorted_years, start_year, "left"))
+        hi = len(self.keys) if end_year is None else int(np.searchsorted(self.sorted_years, end_year, "right"))
+        if lo == 0 and hi == len(self.keys):
+            return slice(None)
+        return self.by_year[lo:max(hi, lo)]
+
+    def runs(self, groups):
+        """Row ranges [lo, hi) of each group."""
+        groups = np.asarray(groups, dtype=np.int64)
+        last = len(self.starts) - 1
+        return self.starts[np.minimum(groups, last)], self.starts[np.minimum(groups + 1, last)]
+
+    def range_sums(self, groups, start_year=None, end_year=None):
+        """(groups x values) totals of each group over a year range, from
+        the running totals at the ends of the group's rows in range.
+
+        Over all years this is a lookup per group, otherwise a binary
+        search per group and end of the range.
+        """
+        lo, hi = self.runs(groups)
+        base = np.asarray(groups, dtype=np.int64) * YEAR_SPAN
+        if start_year is not None:
+            # searching the whole table and clipping to the run keeps years
+            # outside the key range from reaching into neighbouring groups
+            lo = np.clip(np.searchsorted(self.keys, base + (start_year - YEAR_BASE), "left"), lo, hi)
+        if end_year is not None:
+            hi = np.clip(np.searchsorted(self.keys, base + (end_year - YEAR_BASE), "right"), lo, hi)
+        return np.take(self.cum, np.maximum(hi, lo), axis=0) - np.take(self.cum, lo, axis=0)
+
+
+class AuthorYearTensor:
+    """Per author, year and publication type: the number of publications
+    (one per author slot), of first, last and sole author positions, and
+    the first author slot on a publication with co-authors.
+
+    Groups of the underlying RangeTable are author * 4 + type, and counts
+    over a year range are differences of its running totals.
+    """
+
+    PUBLICATIONS, FIRST, LAST, SOLE = range(4)
+
+    def __init__(self):
+        self.size = 0
+        self.table = RangeTable(4)
+
+    def sync(self, store):
+        """Count every publication of store added since the last call."""
+        start = self.size
+        if start >= len(store):
+            return
+        lo = int(store.author_offsets[start])
+        nslots = len(store.author_ids) - lo
+        npubs = len(store) - start
+        first = store.first_author[start:]
+        last = store.last_author[start:]
+        pub_types = store.pub_type[start:]
+        pub_years = store.year[start:]
+        # as the baseline, only a lone author is sole, even on [A, B, A]
+        sole = (store.author_counts[start:] == 1).astype(np.int64)
+
+        groups = np.concatenate([
+            store.author_ids[lo:].astype(np.int64) * 4 + store.slot_type[lo:],
+            first.astype(np.int64) * 4 + pub_types,
+            last.astype(np.int64) * 4 + pub_types])
+        years = np.concatenate([store.slot_year[lo:], pub_years, pub_years])
+        values = np.zeros((nslots + 2 * npubs, 4), dtype=np.int64)
+        values[:nslots, self.PUBLICATIONS] = 1
+        values[nslots:nslots + npubs, self.FIRST] = 1 - sole
+        values[nslots:nslots + npubs, self.SOLE] = sole
+        values[nslots + npubs:, self.LAST] = 1 - sole
+        positions = np.full(len(groups), NOWHERE, dtype=np.int64)
+        shared = store.has_coauthors[store.slot_pub[lo:]]
+        positions[:nslots][shared] = lo + np.flatnonzero(shared)
+        self.table.add(groups, years, values, positions)
+        self.size = len(store)
+
+    def author_counts(self, author, start_year=None, end_year=None):
+        """(types x 4) publications, first, last and sole author counts of
+        one author over a year range."""
+        return self.table.range_sums(author * 4 + np.arange(4), start_year, end_year)
+
+    def range_counts(self, nauthors, start_year=None, end_year=None, pub_type=4):
+        """(authors x 4) publications, first, last and sole author counts
+        over a year range and publication type (4 for all types)."""
+        if pub_type != 4:
+            return self.table.range_sums(np.arange(nauthors) * 4 + pub_type, start_year, end_year)
+        counts = self.table.range_sums(np.arange(nauthors * 4), start_year, end_year)
+        return counts[0::4] + counts[1::4] + counts[2::4] + counts[3::4]
+
+    def counts_by_type(self, nauthors, start_year=None, end_year=None):
+        """(authors x types x 4) counts over a year range."""
+        counts = self.table.range_sums(np.arange(nauthors * 4), start_year, end_year)
+        return counts.reshape(nauthors, 4, 4)
+
+    def year_counts(self, nauthors, channel=PUBLICATIONS):
+        """(year, authors x types counts) of one channel for every year
+        with publications, in year order."""
+        table = self.table
+        order = table.by_year
+        years = table.sorted_years
+        bounds = np.flatnonzero(np.diff(years, prepend=YEAR_BASE - 1, append=YEAR_BASE - 1))
+        for lo, hi in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            rows = order[lo:hi]
+            counts = np.zeros(nauthors * 4, dtype=np.int64)
+            counts[table.groups[rows]] = table.values[rows, channel]
+            yield int(years[lo]), counts.reshape(nauthors, 4)
+
+    def first_shared_slot(self, nauthors, start_year=None, end_year=None, pub_type=4):
+        """First author slot of each author on a publication with co-authors
+        in a year range and type, NOWHERE for authors without one."""
+        rows = self.table.rows(start_year, end_year)
+        if not isinstance(rows, slice):
+            # back in author order
+            rows = np.sort(rows)
+        groups = self.table.groups[rows]
+        first = self.table.first[rows]
+        if pub_type != 4:
+            selected = groups % 4 == pub_type
+            groups, first = groups[selected], first[selected]
+        authors = groups // 4
+        smallest = np.full(nauthors, NOWHERE, dtype=np.int64)
+        if len(authors):
+            # rows are sorted by author, so each author's rows are a run
+            runs = np.flatnonzero(np.diff(authors, prepend=-1))
+            smallest[authors[runs]] = np.minimum.reduceat(first, runs)
+        return smallest
+
+    def active_by_year(self):
+        """Years, and the numbers of distinct authors with publications of
+        each type and of any type in them, as (years x 5) counts."""
+        authors = self.table.groups // 4
+        types = self.table.groups % 4
+        offsets = self.table.years.astype(np.int64) - YEAR_BASE
+        present = np.bincount(offsets) > 0
+        years = np.flatnonzero(present) + YEAR_BASE
+        inverse = (np.cumsum(present) - 1)[offsets]
+        counts = np.zeros((len(years), 5), dtype=np.int64)
+        counts[:, :4] = np.bincount(inverse * 4 + types, minlength=len(years) * 4).reshape(len(years), 4)
+        # an author counts once a year however many types they published
+        keys = np.sort(authors * len(years) + inverse)
+        distinct = keys[np.append(True, keys[1:] != keys[:-1])] if len(keys) else keys
+        counts[:, 4] = np.bincount(distinct % max(len(years), 1), minlength=len(years))
+        return years, counts
+
+
+class CoauthorYearTensor:
+    """Per pair of co-authors, year and publication type: the number of
+    publications they share, counted as in CoauthorGraph.
+
+    Every ordered pair (a, b) is given an edge id when first seen, and
+    groups of the underlying RangeTable are edge * 4 + type.
+    """
+
+    def __init__(self):
+        self.size = 0
+        self.table = RangeTable(1)
+        self._pair_keys = np.zeros(0, dtype=np.int64)
+        self._pair_ids = np.zeros(0, dtype=np.int64)
+        self.left = np.zeros(0, dtype=np.int64)
+        self.right = np.zeros(0, dtype=np.int64)
+
+    def sync(self, store):
+        """Count every publication of store added since the last call."""
+        start = self.size
+        if start >= len(store):
+            return
+        pubs = np.arange(start, len(store))
+        squares = store.author_counts[start:].astype(np.int64) ** 2
+        cuts = np.searchsorted(np.cumsum(squares), np.arange(PAIR_BLOCK, int(squares.sum()), PAIR_BLOCK))
+        # each block's pairs are counted by group and year, and the counts
+        # of all the blocks added to the table at once
+        keys = []
+        counts = []
+        for block in np.split(pubs, np.unique(cuts)):
+            left, right, owners = store.coauthor_pairs(block, with_pubs=True)
+            edges = self._edge_ids(left.astype(np.int64) << 32 | right)
+            k, n = np.unique((edges * 4 + store.pub_type[owners]) * YEAR_SPAN + (store.year[owners] - YEAR_BASE),
+                             return_counts=True)
+            keys.append(k)
+            counts.append(n)
+        keys = np.concatenate(keys)
+        self.table.add(keys // YEAR_SPAN, keys % YEAR_SPAN + YEAR_BASE, np.concatenate(counts)[:, None])
+        self.size = len(store)
+
+    def _edge_ids(self, pair_keys):
+        """Edge ids of the ordered pairs given as a << 32 | b, numbering
+        the pairs not seen before."""
+        keys = np.unique(pair_keys)
+        pos = np.searchsorted(self._pair_keys, keys)
+        new = ~_found(self._pair_keys, keys, pos)
+        ids = np.arange(len(self.left), len(self.left) + int(new.sum()))
+        self._pair_keys = np.insert(self._pair_keys, pos[new], keys[new])
+        self._pair_ids = np.insert(self._pair_ids, pos[new], ids)
+        self.left = np.append(self.left, keys[new] >> 32)
+        self.right = np.append(self.right, keys[new] & 0xFFFFFFFF)
+        return self._pair_ids[np.searchsorted(self._pair_keys, pair_keys)]
+
+    def graph(self, nauthors, start_year=None, end_year=None, pub_type=4):
+        """CoauthorGraph of the publications in a year range and type."""
+        rows = self.table.rows(start_year, end_year)
+        groups = self.table.groups[rows]
+        counts = self.table.values[rows, 0]
+        if pub_type != 4:
+            selected = groups % 4 == pub_type
+            groups, counts = groups[selected], counts[selected]
+        weights = np.bincount(groups // 4, weights=counts, minlength=len(self.left)).astype(np.int64)
+        keep = np.flatnonzero(weights)
+        return CoauthorGraph.from_keys(self.left[keep] * nauthors + self.right[keep], weights[keep], nauthors)
+
+
+def _found(sorted_keys, keys, pos):
+    """Which keys are present in sorted_keys, pos being their searchsorted positions."""
+    found = pos < len(sorted_keys)
+    found[found] = sorted_keys[pos[found]] == keys[found]
+    return found
@@ -0,0 +1,125 @@
+"""Memoization of Database query results.
+
+Results are kept per Database and keyed on the method, its arguments and
+the Database's version, which changes whenever its contents do, so a
+cached result is never stale. The least recently used results are evicted
+once their estimated size exceeds the budget.
+
+Cached results are shared between callers and must not be modified.
+"""
+import collections
+import functools
+import sys
+import threading
+
+import numpy as np
+
+DEFAULT_BUDGET = 256 * 2 ** 20
+# lists longer than this are sized from an even sample of their items
+SAMPLE = 64
+
+
+class ResultCache:
+    """LRU cache bounded by the estimated size of its values in bytes."""
+
+    def __init__(self, budget=DEFAULT_BUDGET):
+        self.budget = budget
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.version = None
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """(True, value) for a cached key, otherwise (False, None)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, key, value):
+        """Cache value under key, unless it alone is over the budget."""
+        size = estimate_size(value)
+        if size > self.budget:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > self.budget:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+
+    def sync(self, version):
+        """Drop everything cached for a version other than version."""
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.size = 0
+                self.version = version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries),
+                "bytes": self.size, "budget": self.budget}
+
+
+def cached(method):
+    """Memoize a Database method in the Database's ResultCache.
+
+    Calls with unhashable arguments are not cached.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        cache = self.cache
+        key = (method.__name__, self.version, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return method(self, *args, **kwargs)
+        cache.sync(self.version)
+        found, result = cache.get(key)
+        if not found:
+            result = method(self, *args, **kwargs)
+            cache.put(key, result)
+        return result
+    return wrapper
+
+
+def estimate_size(value):
+    """Approximate size in bytes of value and everything it contains.
+
+    A NumPy view is counted with the whole array it keeps alive."""
+    size = sys.getsizeof(value)
+    if isinstance(value, np.ndarray):
+        base = value
+        while isinstance(base.base, np.ndarray):
+            base = base.base
+        if base is not value:
+            size += base.nbytes
+        return size
+    if isinstance(value, dict):
+        value = list(value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = value if isinstance(value, (list, tuple)) else list(value)
+        n = len(items)
+        if n > SAMPLE:
+            sample = [items[i * n // SAMPLE] for i in range(SAMPLE)]
+            size += sum(estimate_size(v) for v in sample) * n // SAMPLE
+        else:
+            size += sum(estimate_size(v) for v in items)
+    return size
@@ -1,45 +1,28 @@
 from comp62521.statistics import average
+from comp62521.database.store import Author, AuthorList, Publication, PublicationStore
+from comp62521.database.index import NameIndex, NameMap, NgramIndex, PostingIndex, TokenPrefixIndex, YearIndex
+from comp62521.database.graph import CoauthorGraph
+from comp62521.database.aggregate import NOWHERE, AuthorYearTensor, CoauthorYearTensor, YearTypeCube
+from comp62521.database.cache import ResultCache, cached
+from comp62521.database import snapshot
+import contextlib
+import io
 import itertools
+import multiprocessing
+import os
+import re
+import threading
+import time
+import uuid
 import numpy as np
 import xml.sax
+from xml.parsers import expat
 from fuzzywuzzy import fuzz
 from fuzzywuzzy import process
-import validators
 
 PublicationType = ["Conference Paper", "Journal", "Book", "Book Chapter"]
 
 
-class Publication:
-    CONFERENCE_PAPER = 0
-    JOURNAL = 1
-    BOOK = 2
-    BOOK_CHAPTER = 3
-
-    def __init__(self, pub_type, title, link , year, authors, booktitle, journ, vol, pages, number, crossref, ee, isbn, series):
-        self.pub_type = pub_type
-        self.title = title
-        self.link = link
-        self.booktitle = booktitle
-        self.journ = journ
-        self.vol = vol
-        self.pages = pages
-        self.number = number
-        self.crossref = crossref
-        self.ee = ee
-        self.isbn = isbn
-        self.series = series
-        if year:
-            self.year = int(year)
-        else:
-            self.year = -1
-        self.authors = authors
-
-
-class Author:
-    def __init__(self, name):
-        self.name = name
-
-
 class Stat:
     STR = ["Mean", "Median", "Mode"]
     FUNC = [average.mean, average.median, average.mode]
@@ -50,216 +33,369 @@ class Stat:
 
 class Database:
     def __init__(self):
-        self.publications = []
-        self.authors = []
-        self.author_idx = {}
-        self.min_year = None
-        self.max_year = None
-
-    def read(self, filename):
-        self.publications = []
-        self.authors = []
-        self.author_idx = {}
+        # bumped whenever the contents change, to tell cached results apart
+        self.version = 0
+        # tells this Database (and processes forked from it) apart from
+        # others, whose versions count from the same start
+        self.instance = uuid.uuid4().hex
+        self.cache = ResultCache()
+        self._staff = None
+        # indexes are built by the first query to need them, which under a
+        # threaded server may be several at once
+        self._sync_lock = threading.RLock()
+        self._clear()
+
+    def fingerprint(self):
+        """Identifies the current contents of the Database, e.g. for HTTP ETags."""
+        return f"{self.instance}-{self.version}"
+
+    def _synced(self, index, source):
+        """index, brought up to date with source by one thread at a time."""
+        with self._sync_lock:
+            index.sync(source)
+        return index
+
+    def build_indexes(self):
+        """Build now every index and aggregate that is otherwise built on
+        first use, e.g. so that processes forked afterwards share them
+        instead of each building its own."""
+        store = self.publications
+        for index in (self._author_pubs, self.year_index, self.year_cube, self.author_years, self.coauthor_years):
+            self._synced(index, store)
+        names = self.author_names.names_lower
+        self._synced(self.author_ngrams, names)
+        self._synced(self.author_tokens, names)
+        self.get_coauthor_graph()
+
+    def _clear(self):
+        self.version += 1
+        self.publications = PublicationStore()
+        self._author_pubs = PostingIndex()
+        self.year_index = YearIndex()
+        self.year_cube = YearTypeCube()
+        self.author_years = AuthorYearTensor()
+        self.coauthor_years = CoauthorYearTensor()
+        self._coauthor_graph = None
+        self.authors = AuthorList()
+        self.author_idx = NameMap(self.authors.names)
+        self.author_names = NameIndex()
+        self.author_ngrams = NgramIndex()
+        self.author_tokens = TokenPrefixIndex()
         self.min_year = None
         self.max_year = None
+        # the snapshot the contents were loaded from or saved to, if any
+        self.snapshot_path = None
+
+    @property
+    def author_pubs(self):
+        """The PostingIndex, caught up with the publications."""
+        return self._synced(self._author_pubs, self.publications)
+
+    @author_pubs.setter
+    def author_pubs(self, index):
+        self._author_pubs = index
+
+    def read(self, filename, parser="expat", workers=1, serial_ids=True):
+        """Read a DBLP XML file, replacing the current contents.
+
+        parser is "expat" for the RecordReader, or "sax" for the original
+        DocumentHandler, which is slower but builds the same Database. With
+        the expat parser and more than one worker the file is read by a
+        ParallelReader; serial_ids then asks for authors to be numbered as
+        a serial read numbers them. There are never more workers than CPUs
+        to run them on, so with one CPU the file is read serially.
+        """
+        self._clear()
+        if parser == "expat":
+            workers = min(workers, ParallelReader.available_cpus())
+        if parser == "expat" and workers > 1:
+            valid = ParallelReader(self, workers, serial_ids).read(filename)
+        elif parser == "expat":
+            valid = RecordReader(self).read(filename)
+        else:
+            handler = DocumentHandler(self)
+            parser = xml.sax.make_parser()
+            parser.setContentHandler(handler)
+            infile = open(filename, "r")
+            valid = True
+            try:
+                parser.parse(infile)
+            except xml.sax.SAXException as e:
+                valid = False
+                print("Error reading file (" + e.getMessage() + ")")
+            infile.close()
 
-        handler = DocumentHandler(self)
-        parser = xml.sax.make_parser()
-        parser.setContentHandler(handler)
-        infile = open(filename, "r")
-        valid = True
-        try:
-            parser.parse(infile)
-        except xml.sax.SAXException as e:
-            valid = False
-            print("Error reading file (" + e.getMessage() + ")")
-        infile.close()
-
-        for p in self.publications:
-            if self.min_year is None or p.year < self.min_year:
-                self.min_year = p.year
-            if self.max_year is None or p.year > self.max_year:
-                self.max_year = p.year
+        if len(self.publications):
+            self.min_year = int(self.publications.year.min())
+            self.max_year = int(self.publications.year.max())
 
         return valid
 
+    def read_cached(self, filename, snapshot_path=None, workers=1, reload=False):
+        """Like read, but via a binary snapshot of the parsed file.
+
+        The snapshot (by default filename + ".snapshot") is loaded if it was
+        built from the current contents of filename. Otherwise the XML is
+        parsed, with workers processes, and the snapshot rewritten; with
+        reload, the contents are then loaded back from the new snapshot, so
+        that they are memory-mapped as on a warm start rather than held in
+        the arrays and lists the parse built.
+        """
+        if snapshot_path is None:
+            snapshot_path = snapshot.snapshot_path(filename)
+        try:
+            current = snapshot.is_current(snapshot.read_header(snapshot_path), filename)
+        except (OSError, ValueError, KeyError):
+            current = False
+        if current:
+            self._load_snapshot(snapshot_path)
+            self.snapshot_path = snapshot_path
+            return True
+        if not self.read(filename, workers=workers):
+            return False
+        try:
+            snapshot.save(self, snapshot_path, snapshot.source_key(filename))
+        except OSError as e:
+            print("Error writing snapshot (" + str(e) + ")")
+            return True
+        if reload:
+            self._load_snapshot(snapshot_path)
+        self.snapshot_path = snapshot_path
+        return True
+
+    def _load_snapshot(self, snapshot_path):
+        self._clear()
+        snapshot.load(self, snapshot_path)
+        if len(self.publications):
+            self.min_year = int(self.publications.year.min())
+            self.max_year = int(self.publications.year.max())
+
+    def read_incremental(self, filename):
+        """Add the publications of another DBLP XML file to the Database.
+
+        Unlike read, the current contents are kept, and the year bounds and
+        every index already built are updated with just the publications
+        and authors the file adds. Returns the Delta describing them.
+        """
+        store = self.publications
+        delta = Delta(filename, len(store), len(self.authors))
+        with delta.timed("parse"):
+            delta.valid = RecordReader(self).read(filename)
+        delta.publications = len(store) - delta.first_publication
+        delta.authors = len(self.authors) - delta.first_author
+        with delta.timed("years"):
+            years = store.year[delta.first_publication:]
+            if len(years):
+                lo, hi = int(years.min()), int(years.max())
+                self.min_year = lo if self.min_year is None else min(self.min_year, lo)
+                self.max_year = hi if self.max_year is None else max(self.max_year, hi)
+        # indexes that have not been built yet are left to build on first use
+        if self._author_pubs.size:
+            with delta.timed("posting index"):
+                self._author_pubs.sync(store)
+        if self.year_index.size:
+            with delta.timed("year index"):
+                self.year_index.sync(store)
+        if len(self.author_ngrams):
+            with delta.timed("trigram index"):
+                self.author_ngrams.sync(self.author_names.names_lower)
+        if self.author_tokens.size:
+            with delta.timed("token index"):
+                self.author_tokens.sync(self.author_names.names_lower)
+        for step, aggregate in [("year cube", self.year_cube), ("author tensor", self.author_years),
+                                ("co-author tensor", self.coauthor_years)]:
+            if aggregate.size:
+                with delta.timed(step):
+                    aggregate.sync(store)
+        if self._coauthor_graph is not None:
+            with delta.timed("co-author graph"):
+                mask = np.zeros(len(store), dtype=bool)
+                mask[delta.first_publication:] = True
+                added = CoauthorGraph.build(store, len(self.authors), mask)
+                self._coauthor_graph = (len(store), self._coauthor_graph[1].merged(added))
+        self.version += 1
+        return delta
+
     def get_all_authors(self):
         return self.author_idx.keys()
 
-    def get_coauthor_data(self, start_year, end_year, pub_type):
-        coauthors = {}
-        for p in self.publications:
-            if ((start_year is None or p.year >= start_year) and
-                    (end_year is None or p.year <= end_year) and
-                    (pub_type == 4 or pub_type == p.pub_type)):
-                for a in p.authors:
-                    for a2 in p.authors:
-                        if a != a2:
-                            try:
-                                coauthors[a].add(a2)
-                            except KeyError:
-                                coauthors[a] = set([a2])
-
-        def display(db, coauthors, author_id):
-            return f"{db.authors[author_id].name} {len(coauthors[author_id])}"
-
-        header = ("Author", "Co-Authors")
+    def find_author(self, name):
+        """Id of the author called name, ignoring case, or None."""
+        return self.author_names.lookup(name)
+
+    def get_coauthor_graph(self, start_year=None, end_year=None, pub_type=4):
+        """Co-authorship graph of the publications in a year range and type.
+
+        The graph of the whole dataset is built once and reused until more
+        publications are added. Other graphs are assembled from the
+        co-author tensor without looking at the publications, and cached.
+        """
+        store = self.publications
+        if start_year is None and end_year is None and pub_type == 4:
+            if self._coauthor_graph is None or self._coauthor_graph[0] != len(store):
+                self._coauthor_graph = (len(store), CoauthorGraph.build(store, len(self.authors)))
+            return self._coauthor_graph[1]
+        return self._coauthor_range_graph(start_year, end_year, pub_type)
+
+    @cached
+    def _coauthor_range_graph(self, start_year, end_year, pub_type):
+        return self._synced(self.coauthor_years, self.publications).graph(len(self.authors), start_year, end_year, pub_type)
+
+    def _year_cube(self):
+        return self._synced(self.year_cube, self.publications)
+
+    def _author_years(self):
+        return self._synced(self.author_years, self.publications)
+
+    COAUTHOR_HEADER = ("Author", "Co-Authors")
+
+    @cached
+    def get_coauthor_data(self, start_year, end_year, pub_type, offset=0, limit=None, sort=None,
+                          descending=False, name_filter=None):
+        """Each author with co-authors in a year range and type, with their
+        number of co-authors, and the co-authors with theirs.
+
+        Rows appear in the order authors first gain a co-author. The other
+        arguments page, sort and filter them as in get_publications_by_author.
+        """
+        graph = self.get_coauthor_graph(start_year, end_year, pub_type)
+        degree = graph.degree.tolist()
+        ids, _ = self._author_table_page("coauthors", start_year, end_year, pub_type, offset, limit,
+                                         sort, descending, name_filter)
+
+        def display(db, author_id):
+            return f"{db.authors[author_id].name} {degree[author_id]}"
+
+        header = self.COAUTHOR_HEADER
         data = []
-        for a in coauthors:
-            data.append([display(self, coauthors, a),
+        for a in ids:
+            data.append([display(self, a),
                          ", ".join([
-                             display(self, coauthors, ca) for ca in coauthors[a]])])
+                             display(self, ca) for ca in graph.neighbours(a).tolist()])])
 
         return header, data
 
+    @cached
     def get_average_authors_per_publication(self, av):
         header = ("Conference Paper", "Journal", "Book", "Book Chapter", "All Publications")
 
-        auth_per_pub = [[], [], [], []]
-
-        for p in self.publications:
-            auth_per_pub[p.pub_type].append(len(p.authors))
-
-        func = Stat.FUNC[av]
-
-        data = [func(auth_per_pub[i]) for i in np.arange(4)] + [func(list(itertools.chain(*auth_per_pub)))]
+        data = self._authors_per_publication_stats(av)
         return header, data
 
+    @cached
     def get_average_publications_per_author(self, av):
         header = ("Conference Paper", "Journal", "Book", "Book Chapter", "All Publications")
 
-        pub_per_auth = np.zeros((len(self.authors), 4))
-
-        for p in self.publications:
-            for a in p.authors:
-                pub_per_auth[a, p.pub_type] += 1
-
-        func = Stat.FUNC[av]
-
-        data = [func(pub_per_auth[:, i]) for i in np.arange(4)] + [func(pub_per_auth.sum(axis=1))]
+        data = self._publications_per_author_stats(av)
         return header, data
 
+    @cached
     def get_average_publications_in_a_year(self, av):
         header = ("Conference Paper",
                   "Journal", "Book", "Book Chapter", "All Publications")
 
-        ystats = np.zeros((int(self.max_year) - int(self.min_year) + 1, 4))
-
-        for p in self.publications:
-            ystats[p.year - self.min_year][p.pub_type] += 1
-
-        func = Stat.FUNC[av]
-
-        data = [func(ystats[:, i]) for i in np.arange(4)] + [func(ystats.sum(axis=1))]
+        data = average.columns(self._publications_in_a_year(), av)
         return header, data
 
+    @cached
     def get_average_authors_in_a_year(self, av):
         header = ("Conference Paper",
                   "Journal", "Book", "Book Chapter", "All Publications")
 
-        yauth = [[set(), set(), set(), set(), set()] for _ in range(int(self.min_year), int(self.max_year) + 1)]
-
-        for p in self.publications:
-            for a in p.authors:
-                yauth[p.year - self.min_year][p.pub_type].add(a)
-                yauth[p.year - self.min_year][4].add(a)
-
-        ystats = np.array([[len(S) for S in y] for y in yauth])
+        data = average.columns(self._authors_in_a_year(), av)
+        return header, data
 
-        func = Stat.FUNC[av]
+    @cached
+    def get_averages(self):
+        """Everything on the averages page at once: the mean, median and
+        mode of the authors per publication, publications per author,
+        publications in a year and authors in a year.
+
+        data holds, for each of those in turn, a (means, medians, modes)
+        tuple of rows as returned by the get_average_* methods. Each
+        distribution is built once and all three statistics are taken
+        from it.
+        """
+        header = ("Conference Paper", "Journal", "Book", "Book Chapter", "All Publications")
 
-        data = [func(ystats[:, i]) for i in np.arange(5)]
+        data = [self._authors_per_publication_stats(None),
+                self._publications_per_author_stats(None),
+                average.columns(self._publications_in_a_year()),
+                average.columns(self._authors_in_a_year())]
         return header, data
 
+    @cached
     def get_publication_summary_average(self, av):
         header = ("Details", "Conference Paper",
                   "Journal", "Book", "Book Chapter", "All Publications")
 
-        pub_per_auth = np.zeros((len(self.authors), 4))
-        auth_per_pub = [[], [], [], []]
-
-        for p in self.publications:
-            auth_per_pub[p.pub_type].append(len(p.authors))
-            for a in p.authors:
-                pub_per_auth[a, p.pub_type] += 1
-
         name = Stat.STR[av]
-        func = Stat.FUNC[av]
 
         data = [
-            [name + " authors per publication"]
-            + [func(auth_per_pub[i]) for i in np.arange(4)]
-            + [func(list(itertools.chain(*auth_per_pub)))],
-            [name + " publications per author"]
-            + [func(pub_per_auth[:, i]) for i in np.arange(4)]
-            + [func(pub_per_auth.sum(axis=1))]]
+            [name + " authors per publication"] + self._authors_per_publication_stats(av),
+            [name + " publications per author"] + self._publications_per_author_stats(av)]
         return header, data
 
+    @cached
     def get_publication_summary(self):
         header = ("Details", "Conference Paper",
                   "Journal", "Book", "Book Chapter", "Total")
 
-        plist = [0, 0, 0, 0]
-        alist = [set(), set(), set(), set()]
-
-        for p in self.publications:
-            plist[p.pub_type] += 1
-            for a in p.authors:
-                alist[p.pub_type].add(a)
+        plist = self._year_cube().range_counts().tolist()
+        counts = self._author_years().counts_by_type(len(self.authors))[:, :, AuthorYearTensor.PUBLICATIONS]
+        alist = np.count_nonzero(counts, axis=0).tolist()
         # create union of all authors
-        ua = alist[0] | alist[1] | alist[2] | alist[3]
+        ua = int(np.count_nonzero(counts.sum(axis=1)))
 
         data = [
             ["Number of publications"] + plist + [sum(plist)],
-            ["Number of authors"] + [len(a) for a in alist] + [len(ua)]]
+            ["Number of authors"] + alist + [ua]]
         return header, data
 
+    @cached
     def get_average_authors_per_publication_by_author(self, av):
         header = ("Author", "Number of conference papers",
                   "Number of journals", "Number of books",
                   "Number of book chapers", "All publications")
 
-        astats = [[[], [], [], []] for _ in range(len(self.authors))]
-        for p in self.publications:
-            for a in p.authors:
-                astats[a][p.pub_type].append(len(p.authors))
+        store = self.publications
+        stats = _stats_with_totals(store.author_ids, store.slot_type,
+                                   store.author_counts[store.slot_pub], len(self.authors), av)
 
-        func = Stat.FUNC[av]
-
-        data = [[self.authors[i].name]
-                + [func(L) for L in astats[i]]
-                + [func(list(itertools.chain(*astats[i])))]
-                for i in range(len(astats))]
+        data = [[self.authors[i].name] + stats[5 * i:5 * i + 5]
+                for i in range(len(self.authors))]
         return header, data
 
-    def get_publications_by_author(self):
-        header = ("Author", "Number of conference papers",
-                  "Number of journals", "Number of books",
-                  "Number of book chapers", "Total")
+    PUBLICATIONS_BY_AUTHOR_HEADER = ("Author", "Number of conference papers",
+                                     "Number of journals", "Number of books",
+                                     "Number of book chapers", "Total")
 
-        astats = [[0, 0, 0, 0] for _ in range(len(self.authors))]
-        for p in self.publications:
-            for a in p.authors:
-                astats[a][p.pub_type] += 1
+    @cached
+    def get_publications_by_author(self, offset=0, limit=None, sort=None, descending=False, name_filter=None):
+        """Publication counts of every author by type.
 
-        data = [[self.authors[i].name] + astats[i] + [sum(astats[i])]
-                for i in range(len(astats))]
+        offset and limit select one page of the rows. sort is the index in
+        the header of the column to order them by, ties going by surname,
+        and name_filter keeps only the authors whose name contains it, in
+        any case.
+        """
+        header = self.PUBLICATIONS_BY_AUTHOR_HEADER
+
+        ids, astats = self._author_table_page("publications", None, None, 4, offset, limit,
+                                              sort, descending, name_filter)
+
+        data = [[self.authors[a].name] + counts for a, counts in zip(ids, astats)]
         return header, data
 
+    @cached
     def get_author_firstlastsole(self):
         header = ("Author",
                   "First author",
                   "Last author",
                   "Sole author")
 
-        astats = [ [0, 0, 0] for _ in range(len(self.authors)) ]
+        astats = self._author_years().range_counts(len(self.authors))[:, 1:].tolist()
 
-        for p in self.publications:
-            if p.authors[0] == p.authors[-1]:
-                astats[p.authors[0]][2] += 1
-            else:
-                astats[p.authors[0]][0] += 1
-                astats[p.authors[-1]][1] += 1
         data = [[self.authors[i].name] + astats[i]
                 for i in range(len(astats))]
         return header, data
@@ -268,32 +404,58 @@ class Database:
         header = ("Author", "Number of all publications","Number of conference papers",
                   "Number of journals", "Number of book chapters", "Number of books",
                   "Number of co-authors", "First on a paper", "Last on a paper")
-        astats=[0,0,0,0,0,0,0,0]
-        for p in self.publications:
-            for a in p.authors:
-                if self.authors[a].name.lower() == name:
-                    astats[0]+= 1
-                    if p.pub_type == 0:
-                        astats[1]+= 1
-                    elif p.pub_type == 1:
-                        astats[2]+= 1
-                    elif p.pub_type == 2:
-                        astats[4]+= 1
-                    elif p.pub_type == 3:
-                        astats[3]+= 1
-                        
-        
-        astats[5] = len(self.get_coauthor_details_lowerCase(name)) - 1   
-        
+        astats = [0, 0, 0, 0, 0, 0, 0, 0]
+        author_id = self.find_author(name)
+        if author_id is None:
+            return header, astats
+
+        counts = self._author_years().author_counts(author_id)
+        types = counts[:, AuthorYearTensor.PUBLICATIONS].tolist()
+        astats[:5] = [sum(types), types[0], types[1], types[3], types[2]]
+
+        astats[5] = len(self._get_collaborations(author_id, False))
 
-        h , d = self.get_author_firstlastsole()
-        for i in d:
-            if i[0].lower()== name:
-                astats[6] = i[1]
-                astats[7] = i[2]
+        astats[6] = int(counts[:, AuthorYearTensor.FIRST].sum())
+        astats[7] = int(counts[:, AuthorYearTensor.LAST].sum())
         return header, astats
 
-    def get_partial_match(self, authorName, allAuthors):
+    def get_partial_match(self, authorName, allAuthors=None, limit=None):
+        """Names that fully match authorName by fuzzy partial ratio.
+
+        Without allAuthors, or with the list from
+        get_all_author_names_lower, candidates are shortlisted from the
+        author trigram index and only those are scored. The count is that
+        of all matches; limit caps the number of names returned.
+        """
+        names = self.author_names.names_lower
+        if allAuthors is not None and allAuthors is not names:
+            count, matched = self._scan_partial_match(authorName, allAuthors)
+            return count, matched[:limit]
+        matched = [names[i] for i in self._partial_match_ids(authorName)]
+        return len(matched), matched[:limit]
+
+    def _partial_match_ids(self, authorName):
+        names = self.author_names.names_lower
+        return [i for i in self._synced(self.author_ngrams, names).shortlist(authorName)
+                if fuzz.partial_ratio(authorName, names[i]) == 100]
+
+    def autocomplete(self, query, limit=10):
+        """Names of the authors matching query, ranked as on the search page.
+
+        Surname prefix matches come first, then first-name, then
+        middle-name prefix matches, then the remaining names that fully
+        match by partial ratio, i.e. contain the query or are contained
+        in it. These are found by plain substring tests on the trigram
+        shortlist, which is what a partial ratio of 100 amounts to, so no
+        fuzzy scoring happens per keystroke. limit=None returns every match.
+        """
+        names = self.author_names.names_lower
+        ngrams = self._synced(self.author_ngrams, names)
+        ids = self._synced(self.author_tokens, names).complete(
+            query, limit, lambda: ngrams.substring_matches(query.lower()))
+        return [self.authors[i].name for i in ids]
+
+    def _scan_partial_match(self, authorName, allAuthors):
         matchScore = {}
         matched = []
         for i in allAuthors:
@@ -303,135 +465,155 @@ class Database:
         return len(matched), matched
 
     def get_all_author_names_lower(self):
-        data = []
-        for i in range(len(self.authors)):
-            data += [self.authors[i].name.lower()]
-        return data
+        """Lower-cased names of all authors, in author order.
+
+        The list is shared with the name index and must not be modified.
+        """
+        return self.author_names.names_lower
 
-    def get_all_authors_stat_by_year(self,year):
+    @cached
+    def get_all_authors_stat_by_year(self, year, offset=0, limit=None):
+        """Publication counts of the authors active in year, in author order.
+
+        offset and limit select one page of the rows.
+        """
         header = ("Author", "Number of all publications","Number of conference papers",
                   "Number of journals", "Number of book chapters", "Number of books")
-        astats = []
-        data = []
-        for i in range(len(self.authors)) :
-            astats.append([self.authors[i].name, 0, 0, 0, 0 ,0 ]) 
-        for p in self.publications:
-                if p.year == year:
-                    for a in p.authors:
-                        for i in range(len(astats)):
-                            if self.authors[a].name == astats[i][0]:
-                                astats[i][1] += 1
-                                if p.pub_type == 0:
-                                    astats[i][2]+= 1
-                                elif p.pub_type == 1:
-                                    astats[i][3]+= 1
-                                elif p.pub_type == 2:
-                                    astats[i][5]+= 1
-                                elif p.pub_type == 3:
-                                    astats[i][4]+= 1          
-                           
+        partition = self._synced(self.year_index, self.publications)[year]
+        end = None if limit is None else offset + limit
+        authors = partition.authors[offset:end].tolist()
+        counts = partition.counts[offset:end].tolist()
+        astats = [[self.authors[a].name, sum(c), c[0], c[1], c[3], c[2]]
+                  for a, c in zip(authors, counts)]
         return header, astats
 
+    @cached
     def get_average_authors_per_publication_by_year(self, av):
         header = ("Year", "Conference papers",
                   "Journals", "Books",
                   "Book chapers", "All publications")
 
-        ystats = {}
-        for p in self.publications:
-            try:
-                ystats[p.year][p.pub_type].append(len(p.authors))
-            except KeyError:
-                ystats[p.year] = [[], [], [], []]
-                ystats[p.year][p.pub_type].append(len(p.authors))
-
-        func = Stat.FUNC[av]
+        store = self.publications
+        first, nyears = self._year_span()
+        stats = _stats_with_totals(store.year.astype(np.int64) - first, store.pub_type,
+                                   store.author_counts, nyears, av)
 
-        data = [[y]
-                + [func(L) for L in ystats[y]]
-                + [func(list(itertools.chain(*ystats[y])))]
-                for y in ystats]
+        data = [[y] + stats[5 * (y - first):5 * (y - first + 1)]
+                for y in self._years_in_order()]
         return header, data
 
+    @cached
     def get_publications_by_year(self):
         header = ("Year", "Number of conference papers",
                   "Number of journals", "Number of books",
                   "Number of book chapers", "Total")
 
-        ystats = {}
-        for p in self.publications:
-            try:
-                ystats[p.year][p.pub_type] += 1
-            except KeyError:
-                ystats[p.year] = [0, 0, 0, 0]
-                ystats[p.year][p.pub_type] += 1
+        cube = self._year_cube()
+        ystats = {y: cube[y].tolist() for y in cube.years_in_order()}
 
         data = [[y] + ystats[y] + [sum(ystats[y])] for y in ystats]
         return header, data
 
+    @cached
     def get_publications_for_year(self, year):
-        oldHeader, data = self.get_publications_by_year()
         header = ("Number of all publications","Number of conference papers",
                   "Number of journals", "Number of book chapters", "Number of books")
-        for i in data:
-            if i[0] == year:
-                return header, [i[5],i[1],i[2],i[4],i[3]]
- 
-        return header, [0,0,0,0,0]    
+        c = self._year_cube()[year].tolist()
+        return header, [sum(c), c[0], c[1], c[3], c[2]]
 
+    @cached
     def get_average_publications_per_author_by_year(self, av):
         header = ("Year", "Conference papers",
                   "Journals", "Books",
                   "Book chapers", "All publications")
 
-        ystats = {}
-        for p in self.publications:
-            try:
-                s = ystats[p.year]
-            except KeyError:
-                s = np.zeros((len(self.authors), 4))
-                ystats[p.year] = s
-            for a in p.authors:
-                s[a][p.pub_type] += 1
-
-        func = Stat.FUNC[av]
+        ystats = {y: average.columns(_with_totals(counts.astype(float)), av)
+                  for y, counts in self._author_years().year_counts(len(self.authors))}
 
-        data = [[y]
-                + [func(ystats[y][:, i]) for i in np.arange(4)]
-                + [func(ystats[y].sum(axis=1))]
-                for y in ystats]
+        data = [[y] + ystats[y] for y in self._years_in_order()]
         return header, data
 
+    @cached
     def get_author_totals_by_year(self):
         header = ("Year", "Number of conference papers",
                   "Number of journals", "Number of books",
                   "Number of book chapers", "Total")
 
-        ystats = {}
-        for p in self.publications:
-            try:
-                s = ystats[p.year][p.pub_type]
-            except KeyError:
-                ystats[p.year] = [set(), set(), set(), set()]
-                s = ystats[p.year][p.pub_type]
-            for a in p.authors:
-                s.add(a)
-        data = [[y] + [len(s) for s in ystats[y]] + [len(ystats[y][0] | ystats[y][1] | ystats[y][2] | ystats[y][3])]
-                for y in ystats]
-        return header, data
+        years, counts = self._author_years().active_by_year()
+        ystats = dict(zip(years.tolist(), counts.tolist()))
 
+        data = [[y] + ystats[y] for y in self._years_in_order()]
+        return header, data
 
-    def add_publication(self, pub_type, title, link , year, authors, booktitle, journ, vol, pages, number, crossref, ee, isbn, series):
+    def _years_in_order(self):
+        """Distinct publication years, in the order they were first read."""
+        return self._year_cube().years_in_order()
+
+    def _year_span(self):
+        """The first publication year and the number of years from it to
+        the last, (0, 0) while there are no publications."""
+        if not len(self.publications):
+            return 0, 0
+        return int(self.min_year), int(self.max_year) - int(self.min_year) + 1
+
+    def _publications_in_a_year(self):
+        """(years x 5) publication counts by type and in total, for every
+        year from the first to the last."""
+        store = self.publications
+        first, nyears = self._year_span()
+        ystats = np.bincount((store.year.astype(np.int64) - first) * 4 + store.pub_type,
+                             minlength=nyears * 4).reshape(nyears, 4).astype(float)
+        return _with_totals(ystats)
+
+    def _authors_in_a_year(self):
+        """(years x 5) numbers of distinct authors by publication type and
+        of any type, for every year from the first to the last."""
+        first, nyears = self._year_span()
+        years, counts = self._author_years().active_by_year()
+        ystats = np.zeros((nyears, 5), dtype=int)
+        ystats[years - first] = counts
+        return ystats
+
+    def _publications_per_author(self, mask=None):
+        """(authors x publication types) matrix of publication counts,
+        optionally restricted to the publications selected by mask."""
+        store = self.publications
+        keys = store.author_ids.astype(np.int64) * 4 + store.slot_type
+        if mask is not None:
+            keys = keys[mask[store.slot_pub]]
+        na = len(self.authors)
+        return np.bincount(keys, minlength=na * 4).reshape(na, 4)
+
+    def _authors_per_publication_stats(self, av):
+        """Average number of authors per publication, by publication type
+        and over all publications."""
+        store = self.publications
+        return _stats_with_totals(np.zeros(len(store), dtype=np.int64), store.pub_type,
+                                  store.author_counts, 1, av)
+
+    def _publications_per_author_stats(self, av):
+        """Average number of publications per author, by publication type
+        and over all publications."""
+        return average.columns(_with_totals(self._publications_per_author().astype(float)), av)
+
+    def _check_publication(self, pub_type, title, year, authors):
+        """Whether a publication has the information needed to add it,
+        warning about the information it lacks."""
         if year is None or len(authors) == 0:
             print("Warning: excluding publication due to missing information")
             print("    Publication type:", PublicationType[pub_type])
             print("    Title:", title)
             print("    Year:", year)
             print("    Authors:", ",".join(authors))
-            return
+            return False
         if title is None:
             print(f"Warning: adding publication with missing title "
                   f"[ {PublicationType[pub_type]} {year} ({','.join(authors)}) ]")
+        return True
+
+    def add_publication(self, pub_type, title, link , year, authors, booktitle, journ, vol, pages, number, crossref, ee, isbn, series):
+        if not self._check_publication(pub_type, title, year, authors):
+            return
         idlist = []
         for a in authors:
             try:
@@ -441,8 +623,9 @@ class Database:
                 self.author_idx[a] = a_id
                 idlist.append(a_id)
                 self.authors.append(Author(a))
+                self.author_names.add(a, a_id)
         self.publications.append(
-            Publication(pub_type, title, link, year, idlist, booktitle, journ, vol, pages, number, crossref, ee, isbn, series))
+            pub_type, title, link, year, idlist, booktitle, journ, vol, pages, number, crossref, ee, isbn, series)
         if (len(self.publications) % 100000) == 0:
             print(
                 f"Adding publication number {len(self.publications)} "
@@ -452,16 +635,14 @@ class Database:
             self.min_year = year
         if self.max_year is None or year > self.max_year:
             self.max_year = year
+        self.version += 1
 
     def _get_collaborations(self, author_id, include_self):
-        data = {}
-        for p in self.publications:
-            if author_id in p.authors:
-                for a in p.authors:
-                    try:
-                        data[a] += 1
-                    except KeyError:
-                        data[a] = 1
+        store = self.publications
+        slots = store.slots(self.author_pubs.publications_of(author_id))
+        ids, first, counts = np.unique(store.author_ids[slots], return_index=True, return_counts=True)
+        order = np.argsort(first)
+        data = dict(zip(ids[order].tolist(), counts[order].tolist()))
         if not include_self:
             del data[author_id]
         return data
@@ -473,206 +654,277 @@ class Database:
                 for key in data]
 
     def get_coauthor_details_lowerCase(self, name):
-        for a in range(len(self.author_idx)):
-            keys_list = list(self.author_idx)
-            if name == keys_list[a].lower():
-                author_id = self.author_idx[keys_list[a]]
-                data = self._get_collaborations(author_id, True)
-                return [(self.authors[key].name, data[key])
-                        for key in data]
+        author_id = self.find_author(name)
+        if author_id is not None:
+            data = self._get_collaborations(author_id, True)
+            return [(self.authors[key].name, data[key])
+                    for key in data]
 
+    @cached
     def get_network_data(self):
         na = len(self.authors)
+        graph = self.get_coauthor_graph()
+        degree = graph.degree.tolist()
 
-        nodes = [[self.authors[i].name, -1] for i in range(na)]
-        links = set()
-        for a in range(na):
-            collab = self._get_collaborations(a, False)
-            nodes[a][1] = len(collab)
-            for a2 in collab:
-                if a < a2:
-                    links.add((a, a2))
+        nodes = [[self.authors[i].name, degree[i]] for i in range(na)]
+        a, a2 = graph.edges()
+        links = set(zip(a.tolist(), a2.tolist()))
         return nodes, links
         
     def sort_result(self, input, searchedAuthorName):
-        # authorName = ['Brian Sam Alice', 'Sam Alice', 'Samuel Alice', 'Alice Sam Brian',
-        #               'Sam Brian', 'Samuel Brian', 'Alice Esam', 'Brian Esam', 'Alice Sam',
-        #               'Brian Sam', 'Alice Sammer', 'Brian Sammer', 'Alice Samming',
-        #               'Brian Samming', 'Mona Zaki']
-        # searchedAuthorName = ['Brian Sam Alice', 'Sam Alice', 'Samuel Alice', 'Alice Sam Brian',
-        #               'Sam Brian', 'Samuel Brian', 'Alice Esam', 'Brian Esam', 'Brian Sam',
-        #               'Alice Sam', 'Alice Sammer', 'Brian Sammer', 'Alice Samming',
-        #               'Brian Samming']
-        # print(searchedAuthorName)
-        searchValue = input
-        searchValue = searchValue.lower()
-        length = len(searchValue)
-        sort1 = []
-        for i in searchedAuthorName:
-            if (i.split()[-1][0:length].lower() == searchValue):
-                sort1.append(i)
-        # print(sort1)
-        sort1.sort(key=lambda x: (x.split()[0]))
-        sort1.sort(key=lambda x: (x.split()[-1]))
-        # print(sort1)
-        for i in sort1:
-            searchedAuthorName.remove(i)
-
-        sort2 = []
-        for i in searchedAuthorName:
-            if (i.split()[0][0:length].lower() == searchValue):
-                sort2.append(i)
-        # print(sort2)
-        sort2.sort(key=lambda x: (x.split()[-1]))
-        sort2.sort(key=lambda x: (x.split()[0]))
-        # print(sort2)
-        for i in sort2:
-            searchedAuthorName.remove(i)
-
-        sort3 = []
-        for i in searchedAuthorName:
-            if (len(i.split()) == 3 and i.split()[1][0:length].lower() == searchValue):
-                sort3.append(i)
-        # print('3:')
-        # print(sort3)
-        sort3.sort(key=lambda x: (x.split()[0]))
-        sort3.sort(key=lambda x: (x.split()[-1]))
-        sort3.sort(key=lambda x: (x.split()[1]))
-        # print(sort3)
-        for i in sort3:
-            searchedAuthorName.remove(i)
-
-        # print(searchedAuthorName)
-        sort4 = []
-        for i in searchedAuthorName:
-            if (searchValue in i.split()[-1].lower()):
-                sort4.append(i)
-        # print('4:')
-        # print(sort4)
-        sort4.sort(key=lambda x: (x.split()[0]))
-        sort4.sort(key=lambda x: (x.split()[-1]))
-        # print(sort4)
-        for i in sort4:
-            searchedAuthorName.remove(i)
-
-        searchedAuthorName.sort(key=lambda x: x.split()[0])
-        searchedAuthorName.sort(key=lambda x: x.split()[-1])
-
-        res = sort1 + sort2 + sort3 + sort4 + searchedAuthorName
+        """Order matched names for display: surname prefix matches, then
+        first-name, then middle-name prefix matches, then surname substring
+        matches, then the rest, each group sorted by its matching token."""
+        searchValue = input.lower()
+        groups = [[], [], [], [], []]
+        for name in searchedAuthorName:
+            tokens = name.split()
+            if tokens[-1].lower().startswith(searchValue):
+                groups[0].append(name)
+            elif tokens[0].lower().startswith(searchValue):
+                groups[1].append(name)
+            elif len(tokens) == 3 and tokens[1].lower().startswith(searchValue):
+                groups[2].append(name)
+            elif searchValue in tokens[-1].lower():
+                groups[3].append(name)
+            else:
+                groups[4].append(name)
+
+        def key(*positions):
+            return lambda name: tuple(name.split()[p] for p in positions)
+
+        groups[0].sort(key=key(-1, 0))
+        groups[1].sort(key=key(0, -1))
+        groups[2].sort(key=key(1, -1, 0))
+        groups[3].sort(key=key(-1, 0))
+        groups[4].sort(key=key(-1, 0))
+
+        res = groups[0] + groups[1] + groups[2] + groups[3] + groups[4]
         return (res)
 
-    def get_author_details(self, start_year, end_year, pub_type):
-        header = ("Author",
-                  "First author",
-                  "Last author",
-                  "Sole author")
+    AUTHOR_DETAILS_HEADER = ("Author", "First author", "Last author", "Sole author")
 
-        astats = [ [0, 0, 0] for _ in range(len(self.authors)) ]
-
-        for p in self.publications:
-            if ( (start_year == None or p.year >= start_year) and
-                (end_year == None or p.year <= end_year) and
-                (pub_type == 4 or pub_type == p.pub_type) ):
-                    if p.authors[0] == p.authors[-1]:
-                        astats[p.authors[0]][2] += 1
-                    else:
-                        astats[p.authors[0]][0] += 1
-                        astats[p.authors[-1]][1] += 1
-        data = [[self.authors[i].name] + astats[i]
-                for i in range(len(astats))]
+    @cached
+    def get_author_details(self, start_year, end_year, pub_type, offset=0, limit=None, sort=None,
+                           descending=False, name_filter=None):
+        """First, last and sole author counts of every author in a year range
+        and type, paged, sorted and filtered as in get_publications_by_author."""
+        header = self.AUTHOR_DETAILS_HEADER
+
+        ids, astats = self._author_table_page("firstlastsole", start_year, end_year, pub_type, offset, limit,
+                                              sort, descending, name_filter)
+
+        data = [[self.authors[a].name] + counts for a, counts in zip(ids, astats)]
         return header, data
 
+    @cached
+    def _author_table(self, table, start_year=None, end_year=None, pub_type=4):
+        """The author ids listed by a per-author table, in its default order,
+        and the numbers it shows for every author, one column per table
+        column after the name."""
+        nauthors = len(self.authors)
+        tensor = self._author_years()
+        if table == "coauthors":
+            # rows appear in the order authors first gain a co-author
+            first = tensor.first_shared_slot(nauthors, start_year, end_year, pub_type)
+            ids = np.flatnonzero(first != NOWHERE)
+            degree = self.get_coauthor_graph(start_year, end_year, pub_type).degree
+            return ids[np.argsort(first[ids])], degree[:, None]
+        if table == "publications":
+            values = _with_totals(tensor.counts_by_type(nauthors)[:, :, AuthorYearTensor.PUBLICATIONS])
+        elif table == "firstlastsole":
+            values = tensor.range_counts(nauthors, start_year, end_year, pub_type)[:, 1:]
+        else:
+            raise ValueError(f"no author table {table!r}")
+        return np.arange(nauthors), values
+
+    @cached
+    def _author_table_order(self, table, start_year=None, end_year=None, pub_type=4, sort=None,
+                            descending=False, name_filter=None):
+        """The author ids of a per-author table ordered by column sort, and
+        only those whose name contains name_filter.
+
+        Each ordering is computed once and filtered afterwards, so a page of
+        a large table costs little more than the page itself.
+        """
+        if name_filter:
+            ids = self._author_table_order(table, start_year, end_year, pub_type, sort, descending)
+            return ids[self._authors_containing(name_filter.lower())[ids]]
+        ids, values = self._author_table(table, start_year, end_year, pub_type)
+        if sort is None:
+            return ids[::-1] if descending else ids
+        if not 0 <= sort <= values.shape[1]:
+            raise ValueError(f"no column {sort} to sort by")
+        ranks = self._surname_ranks()[ids]
+        if sort == 0:
+            order = np.argsort(ranks)
+            return ids[order[::-1] if descending else order]
+        column = values[ids, sort - 1].astype(np.int64)
+        return ids[np.lexsort((ranks, -column if descending else column))]
+
+    def _author_table_page(self, table, start_year, end_year, pub_type, offset, limit, sort, descending,
+                           name_filter):
+        """Author ids and numbers of the rows of one page of an author table."""
+        _, values = self._author_table(table, start_year, end_year, pub_type)
+        ids = self._author_table_order(table, start_year, end_year, pub_type, sort, descending, name_filter)
+        end = None if limit is None else offset + limit
+        ids = ids[offset:end]
+        return ids.tolist(), values[ids].tolist()
+
+    @cached
+    def _surname_ranks(self):
+        """Position of every author when sorted by surname, then first name."""
+        tokens = self._synced(self.author_tokens, self.author_names.names_lower)
+        order = np.asarray(tokens.surname_order(), dtype=np.int64)
+        ranks = np.empty(len(order), dtype=np.int64)
+        ranks[order] = np.arange(len(order))
+        return ranks
+
+    @cached
+    def _authors_containing(self, query):
+        """Boolean mask of the authors whose lower-cased name contains query."""
+        names = self.author_names.names_lower
+        mask = np.zeros(len(names), dtype=bool)
+        mask[self._synced(self.author_ngrams, names).containing(query)] = True
+        return mask
+
     def get_cs_staff(self):
-        with open('data/CS-staff.txt') as f:
-            staff = list()
-            Lines = f.readlines()
-            converted_Lines = []
-            for line in Lines:
-                if line:
-                    converted_Lines.append(line.strip())
-            return converted_Lines
+        return list(self._cs_staff()[0])
+
+    def _cs_staff(self):
+        """The staff roster as a list and as a set, read from disk once."""
+        if self._staff is None:
+            with open('data/CS-staff.txt') as f:
+                names = [line.strip() for line in f.readlines()]
+            self._staff = (names, set(names))
+        return self._staff
 
+    @cached
     def get_author_stats_by_click(self,author):
-        coauthors = {}
-        author_name = ''
-        author_found = False
         NoPublications = [0, 0, 0, 0, 0]
         NoFirstAuthor = [0, 0, 0, 0, 0]
         NoLastAuthor = [0, 0, 0, 0, 0]
         NoSoleAuthor = [0, 0, 0, 0, 0]
         NoCoAuthor = 0
-        isInternal = 0
         AuthorType = 'External'
         ExCoAuthorsList = []
-        NoExCoAuthors = 0
-        internal_staff = self.get_cs_staff()
-
-        if author in internal_staff:
-            isInternal = 1
+        internal_staff = self._cs_staff()[1]
+        isInternal = author in internal_staff
+        if isInternal:
             AuthorType = 'Internal'
 
-        for p in self.publications:
-            for a in p.authors:
-                if str(self.authors[a].name) == author:
-                    author_found = True
-                    author_name = self.authors[a].name
-                    NoPublications[p.pub_type + 1] += 1
-                    for a2 in p.authors:
-                        if a != a2:
-                            try:
-                                coauthors[a].add(a2)
-                            except KeyError:
-                                coauthors[a] = set([a2])
-                    try:
-                        NoCoAuthor = len(coauthors[a])
-                    except:
-                        NoCoAuthor = 0
-
-                    if a == p.authors[0] and len(p.authors) > 1:
-                        NoFirstAuthor[p.pub_type + 1] += 1
-                    if a == p.authors[-1] and len(p.authors) > 1:
-                        NoLastAuthor[p.pub_type + 1] += 1
-                    if len(p.authors) == 1 and (a == p.authors[0]):
-                        NoSoleAuthor[p.pub_type + 1] += 1
-
-                    NoPublications[0] = NoPublications[1] + NoPublications[2] + NoPublications[3] + NoPublications[4]
-                    NoFirstAuthor[0] = NoFirstAuthor[1] + NoFirstAuthor[2] + NoFirstAuthor[3] + NoFirstAuthor[4]
-                    NoLastAuthor[0] = NoLastAuthor[1] + NoLastAuthor[2] + NoLastAuthor[3] + NoLastAuthor[4]
-                    NoSoleAuthor[0] = NoSoleAuthor[1] + NoSoleAuthor[2] + NoSoleAuthor[3] + NoSoleAuthor[4]
-
-                    if isInternal == 1:
-                        for b in p.authors:
-                            bname = self.authors[b].name
-                            if bname not in internal_staff and bname not in ExCoAuthorsList:
-                                ExCoAuthorsList.append(bname)
-                                NoExCoAuthors += 1
-
-        return author_found, NoPublications, NoFirstAuthor, NoLastAuthor, NoSoleAuthor, NoCoAuthor, AuthorType,  ", ".join(ExCoAuthorsList), NoExCoAuthors, author_name
-
-
-    def get_all_publications(self):
-        header = ('Title', 'Authors', 'Year', 'Book title', 'Journal', 'Volume', 'Pages', 'Number', 'Cross reference', 'Url', 'ISBN', 'Series')
-        all_publications = []
-        
-        for p in self.publications:
-            link_valid = validators.url(str(p.link))
-            authors_list = []
-
-            booktitle = '-' if p.booktitle == None else p.booktitle
-            jn = '-' if p.journ == None else p.journ
-            vol = '-' if p.vol == None else p.vol
-            pages = '-' if p.pages == None else p.pages
-            number = '-' if p.number == None else p.number
-            crossref = '-' if p.crossref == None else p.crossref
-            ee = '-' if p.ee == None else p.ee
-            isbn = '-' if p.isbn == None else p.isbn
-            series = '-' if p.series == None else p.series
-
-            if link_valid:
-                authors_list = ', '.join([self.authors[i].name for i in p.authors])
-                all_publications.append([p.title, p.link, authors_list, p.year, booktitle, jn, vol, pages, number, crossref, ee, isbn, series])
-                
-        return header, all_publications
+        author_id = self.author_idx.get(author)
+        if author_id is None:
+            return False, NoPublications, NoFirstAuthor, NoLastAuthor, NoSoleAuthor, NoCoAuthor, AuthorType, "", 0, ''
+
+        counts = self._author_years().author_counts(author_id)
+        for totals, channel in [(NoPublications, AuthorYearTensor.PUBLICATIONS), (NoFirstAuthor, AuthorYearTensor.FIRST),
+                                (NoLastAuthor, AuthorYearTensor.LAST), (NoSoleAuthor, AuthorYearTensor.SOLE)]:
+            totals[1:] = counts[:, channel].tolist()
+            totals[0] = sum(totals[1:])
+
+        collaborators = self._get_collaborations(author_id, True)
+        NoCoAuthor = len(collaborators) - 1
+
+        if isInternal:
+            # the authors of the author's publications, in order of appearance
+            names = [self.authors[b].name for b in collaborators]
+            ExCoAuthorsList = [name for name in names if name not in internal_staff]
+
+        return True, NoPublications, NoFirstAuthor, NoLastAuthor, NoSoleAuthor, NoCoAuthor, AuthorType,  ", ".join(ExCoAuthorsList), len(ExCoAuthorsList), self.authors[author_id].name
+
+
+    PUBLICATION_LINK_HEADER = ('Title', 'Authors', 'Year', 'Book title', 'Journal', 'Volume', 'Pages', 'Number',
+                               'Cross reference', 'Url', 'ISBN', 'Series')
+
+    @cached
+    def get_all_publications(self, offset=0, limit=None, sort=None, descending=False):
+        """The publications with a valid link, one row per publication.
+
+        sort is the index in the header of the column to order the rows by,
+        None keeping them in file order, and offset and limit select one
+        page of the rows.
+        """
+        order = self._publication_link_order(sort, descending)
+        end = None if limit is None else offset + limit
+        return self.PUBLICATION_LINK_HEADER, self._publication_link_rows(order[offset:end])
+
+    def iter_publication_links(self, offset=0, limit=None, sort=None, descending=False, batch=1000):
+        """The rows of get_all_publications, built batch publications at a
+        time as they are consumed."""
+        order = self._publication_link_order(sort, descending)
+        end = len(order) if limit is None else min(offset + limit, len(order))
+        for start in range(offset, end, batch):
+            yield from self._publication_link_rows(order[start:min(start + batch, end)])
+
+    @cached
+    def _publication_link_order(self, sort=None, descending=False):
+        """Indices of the publications with a valid link, in display order."""
+        store = self.publications
+        valid = np.flatnonzero(store.link_valid)
+        if sort is None:
+            return valid
+        if not 0 <= sort < len(self.PUBLICATION_LINK_HEADER):
+            raise ValueError(f"no column {sort} to sort by")
+        if self.PUBLICATION_LINK_HEADER[sort] == 'Year':
+            years = store.year[valid].astype(np.int64)
+            return valid[np.argsort(-years if descending else years, kind="stable")]
+        if self.PUBLICATION_LINK_HEADER[sort] == 'Authors':
+            keys = [', '.join(self.authors[a].name for a in store.authors_of(i)) for i in valid.tolist()]
+        else:
+            # the header has Authors and Year where FIELDS has the link
+            column = store.columns[PublicationStore.FIELDS[0 if sort == 0 else sort - 1]]
+            keys = ['-' if column[i] is None else column[i] for i in valid.tolist()]
+        order = sorted(range(len(keys)), key=keys.__getitem__, reverse=descending)
+        return valid[np.array(order, dtype=np.int64)]
+
+    def _publication_link_rows(self, pubs):
+        store = self.publications
+        c = store.columns
+        rows = []
+        for i in pubs.tolist():
+            authors_list = ', '.join([self.authors[a].name for a in store.authors_of(i)])
+            rows.append([c["title"][i], c["link"][i], authors_list, int(store.year[i])] +
+                        ['-' if c[name][i] is None else c[name][i] for name in PublicationStore.FIELDS[2:]])
+        return rows
+
+
+def _with_totals(counts):
+    """counts by publication type, with a column of their totals appended."""
+    return np.column_stack([counts, counts.sum(axis=1)])
+
+
+def _stats_with_totals(owners, pub_types, values, nowners, av):
+    """average.groups of the values of every owner by publication type and
+    of all of them, as five consecutive groups per owner."""
+    owners = np.asarray(owners, dtype=np.int64) * 5
+    return average.groups(np.concatenate([owners + pub_types, owners + 4]),
+                          np.concatenate([values, values]), nowners * 5, av)
+
+
+class Delta:
+    """What Database.read_incremental added: the publications from
+    first_publication and the authors from first_author on, and how long
+    in seconds each step of updating the Database took."""
+
+    def __init__(self, filename, first_publication, first_author):
+        self.filename = filename
+        self.valid = True
+        self.first_publication = first_publication
+        self.first_author = first_author
+        self.publications = 0
+        self.authors = 0
+        self.seconds = {}
+
+    @contextlib.contextmanager
+    def timed(self, step):
+        start = time.perf_counter()
+        yield
+        self.seconds[step] = time.perf_counter() - start
+
+    def __str__(self):
+        steps = ", ".join(f"{step} {seconds * 1e3:.1f} ms" for step, seconds in self.seconds.items())
+        return f"{self.filename}: {self.publications} publications, {self.authors} new authors ({steps})"
 
 
 class DocumentHandler(xml.sax.handler.ContentHandler):
@@ -713,6 +965,7 @@ class DocumentHandler(xml.sax.handler.ContentHandler):
         self.booktitle = None
         self.journ = None
         self.vol = None
+        self.pages = None
         self.number = None
         self.crossref = None
         self.ee = None
@@ -789,3 +1042,324 @@ class DocumentHandler(xml.sax.handler.ContentHandler):
     def characters(self, chrs):
         if self.pub_type is not None:
             self.chrs += chrs
+
+
+class RecordReader:
+    """Reads a DBLP XML file into a Database through expat.
+
+    A faster equivalent of DocumentHandler. Text is accumulated in a list
+    and joined once per element, element names are dispatched through
+    dictionaries, and accepted records are collected and appended to the
+    PublicationStore in batches, so no Publication is made per record. The
+    author name index is caught up once per batch.
+    """
+
+    TITLE_TAGS = frozenset(DocumentHandler.TITLE_TAGS)
+    PUB_TYPE = DocumentHandler.PUB_TYPE
+    FIELD_TAGS = {
+        "title": "title", "ee": "link", "booktitle": "booktitle", "journal": "journ",
+        "volume": "vol", "pages": "pages", "number": "number", "crossref": "crossref",
+        "url": "ee", "isbn": "isbn", "series": "series"}
+    FIELD_INDEX = {tag: PublicationStore.FIELDS.index(field) for tag, field in FIELD_TAGS.items()}
+    BATCH = 10000
+
+    def __init__(self, db, partial=False):
+        # a partial reader reads one chunk of a ParallelReader, which
+        # indexes and reports progress after merging the chunks
+        self.db = db
+        self.partial = partial
+        self._clear_batch()
+
+    def _clear_batch(self):
+        self.years = []
+        self.pub_types = []
+        self.author_counts = []
+        self.author_ids = []
+        self.records = []
+        self.pending = self.BATCH - len(self.db.publications) % self.BATCH
+
+    def read(self, filename):
+        """Parse filename into the Database. False if it is not well-formed,
+        in which case the records before the error are kept."""
+        try:
+            with open(filename, "rb") as infile:
+                self.parse(infile)
+        except expat.ExpatError as e:
+            print("Error reading file (" + expat.ErrorString(e.code) + ")")
+            return False
+        finally:
+            self.flush()
+        return True
+
+    def parse(self, infile):
+        db = self.db
+        check = db._check_publication
+        author_idx = db.author_idx
+        authors_list = db.authors
+        title_tags = self.TITLE_TAGS
+        pub_types = self.PUB_TYPE
+        field_index = self.FIELD_INDEX
+        nfields = len(PublicationStore.FIELDS)
+        text = []
+        pub_type = None
+        tag = None
+        authors = []
+        year = None
+        values = [None] * nfields
+
+        def start(name, attrs):
+            nonlocal pub_type, tag
+            if name in title_tags:
+                return
+            if name in pub_types:
+                pub_type = pub_types[name]
+            tag = name
+            text.clear()
+
+        def end(name):
+            nonlocal pub_type, tag, authors, year, values
+            if pub_type is None or name in title_tags:
+                return
+            k = field_index.get(tag)
+            if k is not None:
+                values[k] = "".join(text).strip()
+            elif tag == "author":
+                authors.append("".join(text).strip())
+            elif tag == "year":
+                year = int("".join(text).strip())
+            elif name in pub_types:
+                if check(pub_type, values[0], year, authors):
+                    self._add(pub_type, year, authors, values, author_idx, authors_list)
+                pub_type = None
+                authors = []
+                year = None
+                values = [None] * nfields
+            tag = None
+
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        parser.buffer_size = 1 << 16
+        parser.StartElementHandler = start
+        parser.EndElementHandler = end
+        parser.CharacterDataHandler = text.append
+        # like xml.sax: external entities are not loaded, and references to
+        # the entities they would declare are skipped
+        parser.ExternalEntityRefHandler = lambda context, base, system_id, public_id: 1
+        parser.SetParamEntityParsing(expat.XML_PARAM_ENTITY_PARSING_UNLESS_STANDALONE)
+        parser.ParseFile(infile)
+
+    def _add(self, pub_type, year, authors, values, author_idx, authors_list):
+        ids = self.author_ids
+        for a in authors:
+            a_id = author_idx.get(a)
+            if a_id is None:
+                a_id = author_idx[a] = len(authors_list)
+                authors_list.append(Author(a))
+            ids.append(a_id)
+        self.years.append(year if year else -1)
+        self.pub_types.append(pub_type)
+        self.author_counts.append(len(authors))
+        self.records.append(values)
+        self.pending -= 1
+        if not self.pending:
+            self.flush()
+
+    def flush(self):
+        """Append the records collected so far to the PublicationStore and
+        catch up the author name index."""
+        if not self.years:
+            return
+        db = self.db
+        store = db.publications
+        columns = zip(*self.records)
+        store.extend(self.years, self.pub_types, self.author_counts, self.author_ids,
+                     dict(zip(PublicationStore.FIELDS, map(list, columns))))
+        self._clear_batch()
+        if self.partial:
+            return
+        db.author_names.sync(db.authors)
+        if len(store) % 100000 == 0:
+            print(f"Adding publication number {len(store)} "
+                  f"(number of authors is {len(db.authors)})")
+
+
+class ParallelReader:
+    """Reads a DBLP XML file into a Database with a pool of processes.
+
+    The file is cut into chunks at the start tags of top-level records.
+    Each chunk, wrapped in the prolog and closing root tag of the file, is
+    read by a RecordReader in a worker process into a Database of its own,
+    which is sent back packed: the arrays of the PublicationStore, and its
+    author names and each text column joined into one string. Once every
+    chunk is in, the authors are numbered in one pass over all the names,
+    the author lists are remapped with one array lookup and the
+    publications appended in file order, and the warnings the chunks
+    printed are replayed.
+
+    With serial_ids the authors are numbered in order of first appearance
+    in the file, exactly as a serial read numbers them. Otherwise they are
+    numbered in the order the chunks finished.
+    If any chunk fails to parse the file is read serially instead, so
+    malformed files are reported and kept exactly as by RecordReader.
+
+    Only the parse is spread over the workers; the merge is left to this
+    process, so the reader is only worth it with a core per worker, see
+    available_cpus.
+    """
+
+    RECORD_START = re.compile(
+        rb"<(?:article|inproceedings|incollection|book|proceedings|phdthesis|mastersthesis|www|data)[\s>/]")
+    CHUNKS_PER_WORKER = 4
+    WINDOW = 1 << 20
+    # joins the strings of a chunk, as XML text cannot contain it
+    SEPARATOR = "\0"
+
+    def __init__(self, db, workers, serial_ids=True):
+        self.db = db
+        self.workers = workers
+        self.serial_ids = serial_ids
+
+    @staticmethod
+    def available_cpus():
+        """The number of CPUs this process may run on."""
+        if hasattr(os, "sched_getaffinity"):
+            return len(os.sched_getaffinity(0))
+        return os.cpu_count() or 1
+
+    def read(self, filename):
+        """Parse filename into the Database, as RecordReader.read."""
+        parts = self.split(filename, self.workers * self.CHUNKS_PER_WORKER)
+        if parts is None:
+            return RecordReader(self.db).read(filename)
+        header, footer, ranges = parts
+        tasks = [(k, filename, start, end, header, footer) for k, (start, end) in enumerate(ranges)]
+        try:
+            with multiprocessing.Pool(self.workers) as pool:
+                if self.serial_ids:
+                    chunks = list(pool.imap(_read_chunk, tasks))
+                else:
+                    chunks = list(pool.imap_unordered(_read_chunk, tasks))
+        except (expat.ExpatError, ValueError):
+            self.db._clear()
+            return RecordReader(self.db).read(filename)
+        print(self._merge(chunks), end="")
+        return True
+
+    def split(self, filename, nchunks):
+        """The prolog and closing root tag of filename, and the byte ranges
+        of at most nchunks chunks of whole records, or None if the file
+        does not hold at least two records to split between."""
+        size = os.path.getsize(filename)
+        with open(filename, "rb") as infile:
+            first = self._next_record(infile, 0)
+            if first is None:
+                return None
+            infile.seek(0)
+            header = infile.read(first)
+            infile.seek(max(first, size - 4096))
+            tail = infile.read()
+            end = size - len(tail) + tail.rfind(b"</")
+            footer = tail[tail.rfind(b"</"):]
+            bounds = [first]
+            for k in range(1, nchunks):
+                pos = self._next_record(infile, max(bounds[-1] + 1, first + (end - first) * k // nchunks))
+                if pos is None or pos >= end:
+                    break
+                bounds.append(pos)
+        if len(bounds) < 2:
+            return None
+        return header, footer, list(zip(bounds, bounds[1:] + [end]))
+
+    def _next_record(self, infile, pos):
+        """Offset of the first record start tag at or after pos, or None."""
+        while True:
+            infile.seek(pos)
+            window = infile.read(self.WINDOW)
+            match = self.RECORD_START.search(window)
+            if match:
+                return pos + match.start()
+            if len(window) < self.WINDOW:
+                return None
+            # step back a little in case a start tag straddles the windows
+            pos += len(window) - 64
+
+    def _merge(self, chunks):
+        """Append the chunks, in the order they finished, to the Database,
+        which must be empty; the output they printed, in file order."""
+        db = self.db
+        names = [self._unpack(*chunk[1]) for chunk in chunks]
+        # name -> None, in the order the authors are numbered; a dict keeps
+        # the position a key was first inserted at
+        order = {}
+        authors_after = {}
+        for chunk, chunk_names in zip(chunks, names):
+            order.update(dict.fromkeys(chunk_names))
+            authors_after[chunk[0]] = len(order)
+        ids = dict(zip(order, range(len(order))))
+        remap = np.fromiter(map(ids.__getitem__, itertools.chain.from_iterable(names)),
+                            dtype=np.int32, count=sum(map(len, names)))
+        name_offsets = np.cumsum([0] + [len(chunk_names) for chunk_names in names])
+        chunks = sorted(zip(chunks, name_offsets[:-1].tolist()), key=lambda item: item[0][0])
+
+        local_ids = np.concatenate([offset + chunk[5] for chunk, offset in chunks])
+        columns = {}
+        for f, field in enumerate(PublicationStore.FIELDS):
+            columns[field] = list(itertools.chain.from_iterable(
+                self._unpack(*chunk[6][f]) for chunk, _ in chunks))
+        db.publications.extend(np.concatenate([chunk[2] for chunk, _ in chunks]),
+                               np.concatenate([chunk[3] for chunk, _ in chunks]),
+                               np.concatenate([chunk[4] for chunk, _ in chunks]),
+                               remap[local_ids], columns,
+                               np.concatenate([chunk[7] for chunk, _ in chunks]))
+        db.authors.names.extend(order)
+        db.author_idx.update(ids)
+        db.author_names.sync(db.authors)
+
+        output = []
+        published = 0
+        for chunk, _ in chunks:
+            output.append(chunk[8])
+            before, published = published, published + len(chunk[2])
+            for n in range(before // 100000 + 1, published // 100000 + 1):
+                output.append(f"Adding publication number {n * 100000} "
+                              f"(number of authors is {authors_after[chunk[0]]})\n")
+        return "".join(output)
+
+    @classmethod
+    def _pack(cls, strings):
+        """strings, some of which may be None, as one string and a mask of
+        those that are not None, which pickle far faster than the list."""
+        present = np.fromiter((s is not None for s in strings), dtype=bool, count=len(strings))
+        return cls.SEPARATOR.join([s for s in strings if s is not None]), present
+
+    @classmethod
+    def _unpack(cls, text, present):
+        """The list of strings _pack packed into text and present."""
+        if not present.any():
+            return [None] * len(present)
+        strings = text.split(cls.SEPARATOR)
+        if present.all():
+            return strings
+        column = np.full(len(present), None, dtype=object)
+        column[present] = strings
+        return column.tolist()
+
+
+def _read_chunk(task):
+    """Worker of ParallelReader: read the byte range start:end of filename."""
+    k, filename, start, end, header, footer = task
+    db = Database()
+    # numbered apart from the Database's anyway, so a plain dict will do
+    db.author_idx = {}
+    reader = RecordReader(db, partial=True)
+    with open(filename, "rb") as infile:
+        infile.seek(start)
+        data = header + infile.read(end - start) + footer
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        reader.parse(io.BytesIO(data))
+        reader.flush()
+    store = db.publications
+    columns = [ParallelReader._pack(store.columns[field]) for field in PublicationStore.FIELDS]
+    return (k, ParallelReader._pack(list(db.author_idx)), store.year, store.pub_type, store.author_counts,
+            store.author_ids, columns, store.link_valid, output.getvalue())
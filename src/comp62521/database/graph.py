@@ -0,0 +1,102 @@
+import numpy as np
+
+# Upper bound on the author pairs expanded at once while building a graph,
+# so that a few papers with hundreds of authors cannot blow up memory.
+PAIR_BLOCK = 1 << 22
+
+
+class CoauthorGraph:
+    """Symmetric co-authorship graph held as CSR arrays.
+
+    The neighbours of author a are indices[indptr[a]:indptr[a + 1]], in
+    increasing id order, and weights holds the number of publications the
+    two authors share.
+    """
+
+    def __init__(self, indptr, indices, weights):
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+
+    def __sizeof__(self):
+        return object.__sizeof__(self) + self.indptr.nbytes + self.indices.nbytes + self.weights.nbytes
+
+    @classmethod
+    def build(cls, store, nauthors, mask=None):
+        """Build the graph of the publications of store selected by mask."""
+        selected = np.arange(len(store)) if mask is None else np.flatnonzero(mask)
+        counts = store.author_counts[selected].astype(np.int64)
+        # cut the publications into blocks of at most PAIR_BLOCK pairs
+        cuts = np.searchsorted(np.cumsum(counts * counts),
+                               np.arange(PAIR_BLOCK, int((counts * counts).sum()), PAIR_BLOCK))
+        keys = []
+        weights = []
+        for block in np.split(selected, np.unique(cuts)):
+            left, right = store.coauthor_pairs(block)
+            k, w = np.unique(left.astype(np.int64) * nauthors + right, return_counts=True)
+            keys.append(k)
+            weights.append(w)
+        keys = np.concatenate(keys) if keys else np.zeros(0, dtype=np.int64)
+        weights = np.concatenate(weights) if weights else np.zeros(0, dtype=np.int64)
+        return cls.from_keys(keys, weights, nauthors)
+
+    @classmethod
+    def from_keys(cls, keys, weights, nauthors):
+        """Graph of the edges with keys a * nauthors + b, summing the weights
+        of repeated keys."""
+        if len(keys):
+            keys, inverse = np.unique(keys, return_inverse=True)
+            weights = np.bincount(inverse.ravel(), weights=weights).astype(np.int64)
+        indptr = np.zeros(nauthors + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys // max(nauthors, 1), minlength=nauthors), out=indptr[1:])
+        return cls(indptr, (keys % max(nauthors, 1)).astype(np.int32), weights)
+
+    def merged(self, other):
+        """The graph over the authors of the larger of self and other, with
+        the weights of the edges of both added together.
+
+        The edges of other, e.g. those of a few added publications, are
+        merged into the sorted edges of self, so besides sorting other's
+        edges the cost is a copy of self rather than a sort of both.
+        """
+        nauthors = max(len(self), len(other))
+        keys = self._keys(nauthors)
+        added = other._keys(nauthors)
+        pos = np.searchsorted(keys, added)
+        known = pos < len(keys)
+        known[known] = keys[pos[known]] == added[known]
+        weights = self.weights.copy()
+        weights[pos[known]] += other.weights[known]
+        keys = np.insert(keys, pos[~known], added[~known])
+        weights = np.insert(weights, pos[~known], other.weights[~known])
+        indptr = np.zeros(nauthors + 1, dtype=np.int64)
+        indptr[1:len(self) + 1] = np.diff(self.indptr)
+        indptr[1:len(other) + 1] += np.bincount(added[~known] // max(nauthors, 1), minlength=len(other))
+        np.cumsum(indptr, out=indptr)
+        return CoauthorGraph(indptr, (keys % max(nauthors, 1)).astype(np.int32), weights)
+
+    def _keys(self, nauthors):
+        """The sorted keys a * nauthors + b of the edges."""
+        rows = np.repeat(np.arange(len(self), dtype=np.int64), self.degree)
+        return rows * nauthors + self.indices
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    @property
+    def degree(self):
+        """Number of distinct co-authors of every author."""
+        return np.diff(self.indptr)
+
+    def neighbours(self, author_id):
+        return self.indices[self.indptr[author_id]:self.indptr[author_id + 1]]
+
+    def shared(self, author_id):
+        """Number of publications shared with each of neighbours(author_id)."""
+        return self.weights[self.indptr[author_id]:self.indptr[author_id + 1]]
+
+    def edges(self):
+        """Each undirected edge once, as (a, b) arrays with a < b."""
+        rows = np.repeat(np.arange(len(self), dtype=np.int32), self.degree)
+        upper = rows < self.indices
+        return rows[upper], self.indices[upper]
@@ -0,0 +1,570 @@
+import bisect
+import collections.abc
+import functools
+import re
+import unicodedata
+import zlib
+
+import numpy as np
+
+from comp62521.database.store import StringList, StringTable
+
+
+class PostingIndex:
+    """Inverted index from author id to the ids of that author's publications.
+
+    Postings are kept CSR-style in publication order, the publications of
+    author a being pubs[offsets[a]:offsets[a + 1]], so looking up an author
+    costs time proportional to that author's own publications. Publications
+    added to the Database are merged in with a few array operations.
+    """
+
+    def __init__(self):
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.pubs = np.zeros(0, dtype=np.int32)
+        self.size = 0
+
+    @classmethod
+    def from_arrays(cls, offsets, pubs, size):
+        """Wrap existing arrays, e.g. memory-mapped ones, indexing the first
+        size publications. They are copied only when publications are added."""
+        index = cls()
+        index.offsets = offsets
+        index.pubs = pubs
+        index.size = size
+        return index
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def add(self, pub_id, author_ids):
+        """Record publication pub_id, whose authors are author_ids."""
+        self._merge(np.asarray(author_ids, dtype=np.int64), np.full(len(author_ids), pub_id, dtype=np.int64))
+        self.size = pub_id + 1
+
+    def sync(self, store):
+        """Index every publication of store added since the last call."""
+        start = self.size
+        if start >= len(store):
+            return
+        lo = int(store.author_offsets[start])
+        self._merge(store.author_ids[lo:].astype(np.int64), store.slot_pub[lo:])
+        self.size = len(store)
+
+    def _merge(self, authors, pubs):
+        """Add the postings (authors[k], pubs[k]) of publications that are
+        all later than those indexed so far."""
+        if not len(authors):
+            return
+        order = np.lexsort((pubs, authors))
+        authors = authors[order]
+        pubs = pubs[order]
+        # an author listed twice on a paper still has one posting for it
+        keep = np.ones(len(authors), dtype=bool)
+        keep[1:] = (authors[1:] != authors[:-1]) | (pubs[1:] != pubs[:-1])
+        authors = authors[keep]
+        pubs = pubs[keep]
+        nauthors = max(len(self), int(authors[-1]) + 1)
+        old = np.zeros(nauthors, dtype=np.int64)
+        old[:len(self)] = np.diff(self.offsets)
+        new = np.bincount(authors, minlength=nauthors)
+        offsets = np.zeros(nauthors + 1, dtype=np.int64)
+        np.cumsum(old + new, out=offsets[1:])
+        merged = np.empty(offsets[-1], dtype=np.int32)
+        # each author's old postings move up by the new ones of the authors
+        # before it, and its new ones follow them
+        merged[np.arange(len(self.pubs)) + np.repeat(offsets[:-1] - np.cumsum(old) + old, old)] = self.pubs
+        firsts = np.cumsum(new) - new
+        merged[(offsets[:-1] + old)[authors] + np.arange(len(authors)) - firsts[authors]] = pubs
+        self.offsets = offsets
+        self.pubs = merged
+
+    def publications_of(self, author_id):
+        """Sorted ids of the publications of author_id, as a NumPy array."""
+        return self.pubs[self.offsets[author_id]:self.offsets[author_id + 1]].astype(np.int64)
+
+    def count(self, author_id):
+        return int(self.offsets[author_id + 1] - self.offsets[author_id])
+
+
+class YearPartition:
+    """The publications of one year and the per-author, per-type
+    publication counts derived from them."""
+
+    def __init__(self):
+        self.pubs = np.zeros(0, dtype=np.int64)
+        self.authors = np.zeros(0, dtype=np.int32)
+        self.counts = np.zeros((0, 4), dtype=np.int64)
+
+    def extend(self, pubs, authors, pub_types):
+        """Add publications, given with one (author, type) entry per author slot."""
+        self.pubs = np.concatenate([self.pubs, pubs])
+        # insert the authors new to the year into the sorted authors, so the
+        # cost is a copy of the partition rather than a sort of it
+        added = np.unique(authors).astype(np.int32)
+        pos = np.searchsorted(self.authors, added)
+        known = pos < len(self.authors)
+        known[known] = self.authors[pos[known]] == added[known]
+        self.authors = np.insert(self.authors, pos[~known], added[~known])
+        self.counts = np.insert(self.counts, pos[~known], 0, axis=0)
+        np.add.at(self.counts, (np.searchsorted(self.authors, authors), pub_types), 1)
+
+
+class YearIndex:
+    """Publications partitioned by year.
+
+    Each YearPartition holds the ids of that year's publications and the
+    publication counts by type of every author active in the year, so a
+    per-year query costs time proportional to that year's publications.
+    """
+
+    def __init__(self):
+        self._partitions = {}
+        self.size = 0
+
+    def sync(self, store):
+        """Partition every publication of store added since the last call."""
+        start = self.size
+        if start >= len(store):
+            return
+        lo = int(store.author_offsets[start])
+        pubs = start + np.argsort(store.year[start:], kind="stable")
+        slots = lo + np.argsort(store.slot_year[lo:], kind="stable")
+        pub_years = store.year[pubs]
+        slot_years = store.slot_year[slots]
+        years = np.unique(pub_years)
+        pub_bounds = np.searchsorted(pub_years, years).tolist() + [len(pubs)]
+        slot_bounds = np.searchsorted(slot_years, years).tolist() + [len(slots)]
+        for k, year in enumerate(years.tolist()):
+            in_year = slots[slot_bounds[k]:slot_bounds[k + 1]]
+            self._partitions.setdefault(year, YearPartition()).extend(
+                pubs[pub_bounds[k]:pub_bounds[k + 1]], store.author_ids[in_year], store.slot_type[in_year])
+        self.size = len(store)
+
+    def years(self):
+        return sorted(self._partitions)
+
+    def __getitem__(self, year):
+        """The partition of year, empty if nothing was published in it."""
+        return self._partitions.get(year, YearPartition())
+
+
+def normalize_name(name):
+    """Case- and form-insensitive key for an author name.
+
+    Names are NFC-normalized, Unicode case-folded (so that e.g. "STRAß" and
+    "strass" agree) and have their runs of whitespace collapsed.
+    """
+    return " ".join(unicodedata.normalize("NFC", name).casefold().split())
+
+
+class StringHashTable:
+    """Position of each string of a sequence, by open addressing.
+
+    slots, a power of two long, holds the position of every string at the
+    CRC-32 of its UTF-8 bytes, probing linearly past taken slots, and -1
+    in the empty ones. Being a single array it is saved in a snapshot and
+    memory-mapped from it, so looking a string up costs a few probes
+    rather than a dict of every string in each process.
+    """
+
+    def __init__(self, strings, slots=None):
+        self.strings = strings
+        self.slots = np.full(1, -1, dtype=np.int32) if slots is None else slots
+
+    @classmethod
+    def build(cls, strings):
+        """The table of strings, the first of equal strings winning."""
+        size = 1 << (2 * len(strings)).bit_length()
+        mask = size - 1
+        slots = [-1] * size
+        for k, string in enumerate(strings):
+            i = zlib.crc32(string.encode("utf-8")) & mask
+            while slots[i] >= 0:
+                if strings[slots[i]] == string:
+                    break
+                i = (i + 1) & mask
+            else:
+                slots[i] = k
+        return cls(strings, np.array(slots, dtype=np.int32))
+
+    def find(self, string):
+        """Position of string, or None if it is not in the table."""
+        slots = self.slots
+        mask = len(slots) - 1
+        i = zlib.crc32(string.encode("utf-8")) & mask
+        while True:
+            k = int(slots[i])
+            if k < 0:
+                return None
+            if self.strings[k] == string:
+                return k
+            i = (i + 1) & mask
+
+
+class NameMap(collections.abc.Mapping):
+    """Author name -> author id, in the order the authors were added, as a
+    dict of them would be.
+
+    The names of the first count authors, e.g. those of a snapshot, are
+    found through a StringHashTable over the names, whose slots are given.
+    Names added since are kept in a dict.
+    """
+
+    def __init__(self, names=None, slots=None, count=0):
+        self.names = StringList() if names is None else names
+        self.count = count
+        self._table = StringHashTable(self.names, slots)
+        self._added = {}
+
+    def get(self, name, default=None):
+        a_id = self._added.get(name)
+        if a_id is None:
+            a_id = self._table.find(name)
+        return default if a_id is None else a_id
+
+    def __getitem__(self, name):
+        a_id = self.get(name)
+        if a_id is None:
+            raise KeyError(name)
+        return a_id
+
+    def __setitem__(self, name, author_id):
+        self._added[name] = author_id
+
+    def update(self, ids):
+        """Add the names of the mapping ids, none of them already here."""
+        self._added.update(ids)
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def __len__(self):
+        return self.count + len(self._added)
+
+    def __iter__(self):
+        for a in range(self.count):
+            yield self.names[a]
+        yield from self._added
+
+    def items(self):
+        for a in range(self.count):
+            yield self.names[a], a
+        yield from self._added.items()
+
+    def slots(self):
+        """The slots of a StringHashTable over all the names, each at its
+        author id, e.g. for a snapshot."""
+        return StringHashTable.build(self.names).slots
+
+
+class NameIndex:
+    """Normalized author name -> author id.
+
+    When several authors share a normalized name the first one read wins.
+    The lower-cased display names are kept alongside for the search page.
+    The normalized names of a snapshot are held in a StringTable, found
+    through a StringHashTable over it, with their ids in key_ids. Those
+    added since are kept in a dict.
+    """
+
+    def __init__(self):
+        self.keys = StringHashTable(StringTable.pack([]))
+        self.key_ids = np.zeros(0, dtype=np.int32)
+        self._ids = {}
+        self.names_lower = StringList()
+
+    @classmethod
+    def from_arrays(cls, names_lower, keys, key_ids, key_slots):
+        """Wrap the tables written by arrays, e.g. memory-mapped ones."""
+        index = cls()
+        index.names_lower = StringList(names_lower)
+        index.keys = StringHashTable(keys, key_slots)
+        index.key_ids = key_ids
+        return index
+
+    def __len__(self):
+        return len(self.names_lower)
+
+    def add(self, name, author_id):
+        key = normalize_name(name)
+        if self._find(key) is None:
+            self._ids.setdefault(key, author_id)
+        self.names_lower.append(name.lower())
+
+    def sync(self, authors):
+        """Index every author of the authors list added since the last call."""
+        for a in range(len(self.names_lower), len(authors)):
+            self.add(authors[a].name, a)
+
+    def _find(self, key):
+        k = self.keys.find(key)
+        return None if k is None else int(self.key_ids[k])
+
+    def lookup(self, name):
+        """Author id for name, in any case, or None if there is no such author."""
+        key = normalize_name(name)
+        author_id = self._find(key)
+        return self._ids.get(key) if author_id is None else author_id
+
+    def arrays(self):
+        """The lower-cased names and the normalized names as StringTables,
+        the author id of each normalized name and the slots of a
+        StringHashTable over them."""
+        keys = self.keys.strings
+        keys = [keys[k] for k in range(len(keys))] + list(self._ids)
+        ids = np.concatenate([self.key_ids, np.array(list(self._ids.values()), dtype=np.int32)])
+        table = StringHashTable.build(StringTable.pack(keys))
+        return StringTable.pack(self.names_lower), table.strings, ids.astype(np.int32), table.slots
+
+
+class _Keyed:
+    """The keys key(ids[k]) of ids sorted by them, as a sequence for bisect."""
+
+    def __init__(self, ids, key):
+        self.ids = ids
+        self.key = key
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, k):
+        return self.key(int(self.ids[k]))
+
+
+class NgramIndex:
+    """Trigram index over lower-cased author names for substring search.
+
+    shortlist(query) returns the ids of the names that contain every
+    trigram of the query, which is a small superset of the names that
+    contain the query itself, so an expensive scorer only has to run on
+    those few candidates.
+
+    The index is held in arrays: the codes of the distinct trigrams,
+    sorted, with the ids of the names holding each CSR-style, and the
+    hashes of the names, sorted, with the id of each. For queries shorter
+    than a trigram the names are also kept joined in one UTF-8 string,
+    each followed by a NUL.
+    """
+
+    N = 3
+
+    def __init__(self):
+        self.size = 0
+        self.names = []
+        self._grams = np.zeros(0, dtype=np.int64)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._ids = np.zeros(0, dtype=np.int32)
+        self._hashes = np.zeros(0, dtype=np.int64)
+        self._hash_ids = np.zeros(0, dtype=np.int32)
+        self._text = b""
+        self._starts = np.zeros(0, dtype=np.int64)
+
+    def __len__(self):
+        return self.size
+
+    def sync(self, names):
+        """Index the names of the list added since the last call."""
+        start = self.size
+        if start >= len(names):
+            return
+        self.names = names
+        added = names[start:]
+        ids = np.arange(start, len(names), dtype=np.int32)
+        text = "".join(name + "\0" for name in added)
+
+        points = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+        owners = np.repeat(ids, np.diff(np.flatnonzero(points == 0), prepend=-1))
+        codes = points[:-2] << 42 | points[1:-1] << 21 | points[2:]
+        within = (points[:-2] != 0) & (points[1:-1] != 0) & (points[2:] != 0)
+        self._merge(codes[within], owners[:-2][within])
+
+        # equal hashes stay in id order, the added names coming last
+        hashes = np.array([hash(name) for name in added], dtype=np.int64)
+        order = np.argsort(hashes, kind="stable")
+        at = np.searchsorted(self._hashes, hashes[order], "right")
+        self._hashes = np.insert(self._hashes, at, hashes[order])
+        self._hash_ids = np.insert(self._hash_ids, at, ids[order])
+
+        encoded = [(name + "\0").encode("utf-8") for name in added]
+        lengths = np.array([len(e) for e in encoded], dtype=np.int64)
+        self._starts = np.concatenate([self._starts, len(self._text) + np.cumsum(lengths) - lengths])
+        self._text += b"".join(encoded)
+        self.size = len(names)
+
+    def _merge(self, grams, gram_ids):
+        """Add the postings (grams[k], gram_ids[k]) of names whose ids are
+        all larger than those indexed so far. As in PostingIndex, the
+        postings of each trigram are moved up by the new ones before them
+        and followed by their own new ones, so the cost is a copy of the
+        index rather than a sort of it."""
+        order = np.lexsort((gram_ids, grams))
+        grams = grams[order]
+        gram_ids = gram_ids[order]
+        # a trigram repeated in a name is indexed once for it
+        keep = np.ones(len(grams), dtype=bool)
+        keep[1:] = (grams[1:] != grams[:-1]) | (gram_ids[1:] != gram_ids[:-1])
+        gram_ids = gram_ids[keep]
+        added, new = np.unique(grams[keep], return_counts=True)
+        pos = np.searchsorted(self._grams, added)
+        known = pos < len(self._grams)
+        known[known] = self._grams[pos[known]] == added[known]
+        at = pos[~known]
+        old = np.insert(np.diff(self._offsets), at, 0)
+        merged_grams = np.insert(self._grams, at, added[~known])
+        counts = old.copy()
+        # where each added trigram is in the merged ones
+        slots = pos + np.cumsum(~known) - ~known
+        counts[slots] += new
+        offsets = np.zeros(len(merged_grams) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        ids = np.empty(offsets[-1], dtype=np.int32)
+        ids[np.arange(len(self._ids)) + np.repeat(offsets[:-1] - (np.cumsum(old) - old), old)] = self._ids
+        ids[np.repeat(offsets[slots] + old[slots] - (np.cumsum(new) - new), new) + np.arange(len(gram_ids))] = gram_ids
+        self._grams = merged_grams
+        self._offsets = offsets
+        self._ids = ids
+
+    def _posting(self, code):
+        k = np.searchsorted(self._grams, code)
+        if k < len(self._grams) and self._grams[k] == code:
+            return self._ids[self._offsets[k]:self._offsets[k + 1]]
+        return self._ids[:0]
+
+    def _names_within(self, query):
+        """Ids of the names that are substrings of query."""
+        substrings = {query[i:j] for i in range(len(query)) for j in range(i + 1, len(query) + 1)}
+        hashes = np.array([hash(sub) for sub in substrings], dtype=np.int64)
+        lo = np.searchsorted(self._hashes, hashes, "left").tolist()
+        hi = np.searchsorted(self._hashes, hashes, "right").tolist()
+        ids = [int(self._hash_ids[k]) for l, h in zip(lo, hi) for k in range(l, h)]
+        return [i for i in ids if self.names[i] in substrings]
+
+    def _names_containing(self, query):
+        """Ids of the names that contain query, from a scan of them all."""
+        positions = [m.start() for m in re.finditer(re.escape(query.encode("utf-8")), self._text)]
+        return np.unique(np.searchsorted(self._starts, positions, "right") - 1).tolist()
+
+    def shortlist(self, query):
+        """Sorted ids of the names that may contain query or be contained in it."""
+        if not query:
+            return []
+        # names no longer than the query can only match by being a substring of it
+        ids = set(self._names_within(query))
+        if len(query) < self.N:
+            ids.update(self._names_containing(query))
+            return sorted(ids)
+        postings = sorted((self._posting(code) for code in set(_gram_codes(query))), key=len)
+        candidates = postings[0]
+        for posting in postings[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, posting, assume_unique=True)
+        ids.update(candidates.tolist())
+        return sorted(ids)
+
+    def containing(self, query):
+        """Ids of the names that contain query, sorted, as an array."""
+        if len(query) < self.N:
+            # the scan behind the shortlist of a short query is already exact
+            return np.array(self._names_containing(query) if query else range(self.size), dtype=np.int64)
+        return np.array([i for i in self.shortlist(query) if query in self.names[i]], dtype=np.int64)
+
+    def substring_matches(self, query):
+        """Sorted ids of the names that contain query or are contained in it."""
+        return [i for i in self.shortlist(query)
+                if query in self.names[i] or self.names[i] in query]
+
+
+def _gram_codes(text):
+    """The trigrams of text, each as one integer of its three code points."""
+    return [ord(a) << 42 | ord(b) << 21 | ord(c) for a, b, c in zip(text, text[1:], text[2:])]
+
+
+class TokenPrefixIndex:
+    """Prefix lookup over the surname, first-name and middle-name tokens of
+    the lower-cased author names.
+
+    Each token role keeps an array of the author ids sorted by the ranking
+    used on the search page (surname matches by surname then first name,
+    first-name matches by first name then surname, middle-name matches by
+    middle name, surname and first name), so the authors whose token starts
+    with a prefix form one contiguous, already ranked run. The tokens are
+    split from the names as they are compared. Authors added later are
+    inserted into the sorted runs rather than re-sorting them.
+    """
+
+    def __init__(self):
+        self.size = 0
+        self.names = []
+        self._roles = [np.zeros(0, dtype=np.int32) for _ in range(3)]
+
+    def _key(self, role, i):
+        tokens = self.names[i].split() or [""]
+        if role == 0:
+            return tokens[-1], tokens[0], i
+        if role == 1:
+            return tokens[0], tokens[-1], i
+        return tokens[1], tokens[-1], tokens[0], i
+
+    def sync(self, names):
+        """Index the authors added to names since the last call."""
+        start = self.size
+        if start == len(names):
+            return
+        self.names = names
+        new = range(start, len(names))
+        middle = [i for i in new if len(names[i].split()) == 3]
+        self._roles = [self._merged(role, ids, added)
+                       for role, (ids, added) in enumerate(zip(self._roles, [new, new, middle]))]
+        self.size = len(names)
+
+    def _merged(self, role, ids, added):
+        """ids, sorted by the key of role, with the ids added inserted: a
+        binary search per added id, each starting from the previous one,
+        and a copy of ids."""
+        if not added:
+            return ids
+        key = functools.partial(self._key, role)
+        added = sorted(added, key=key)
+        keys = _Keyed(ids, key)
+        positions = []
+        lo = 0
+        for i in added:
+            lo = bisect.bisect_left(keys, key(i), lo)
+            positions.append(lo)
+        return np.insert(ids, positions, np.array(added, dtype=np.int32))
+
+    def surname_order(self):
+        """Author ids sorted by surname, then first name. Must not be modified."""
+        return self._roles[0]
+
+    def complete(self, query, limit=None, matches=None):
+        """Ids of the authors matching query, best first.
+
+        Surname, first-name and middle-name prefix matches come first, in
+        that order. They are followed by the ids returned by matches(), a
+        callable giving the other names that contain the query, with
+        surname substring matches ahead of the rest. limit caps the number
+        of ids, and matches is only called if the prefix runs do not fill it.
+        """
+        query = query.lower()
+        seen = set()
+        result = []
+        for role, ids in enumerate(self._roles):
+            tokens = _Keyed(ids, lambda i, role=role: self._key(role, i)[0])
+            lo = bisect.bisect_left(tokens, query)
+            hi = bisect.bisect_left(tokens, query + "\U0010ffff", lo)
+            for i in ids[lo:hi].tolist():
+                if i not in seen:
+                    seen.add(i)
+                    result.append(i)
+                    if limit is not None and len(result) >= limit:
+                        return result
+        if matches is None:
+            return result
+        surname = functools.partial(self._key, 0)
+        rest = sorted((i for i in matches() if i not in seen), key=surname)
+        result += [i for i in rest if query in surname(i)[0]]
+        result += [i for i in rest if query not in surname(i)[0]]
+        return result[:limit]
@@ -1,30 +1,64 @@
 class MockDatabase:
+    """Made-up results in the shape of Database's, for working on the pages
+    without a dataset.
+
+    With size, every method the pages call answers from generated tables
+    of size authors and publications, built once on first use and the
+    same for the same size. Paging arguments are honoured, sorting and
+    name filters are not. This puts the cost of rendering the pages at
+    any size apart from the cost of the queries behind them.
+    """
+
+    PUBLICATION_LINK_HEADER = ('Title', 'Authors', 'Year', 'Book title', 'Journal', 'Volume', 'Pages', 'Number',
+                               'Cross reference', 'Url', 'ISBN', 'Series')
+    FIRST_YEAR = 1990
+
+    def __init__(self, size=None):
+        self.size = size
+        self.version = 0
+        self.min_year = self.FIRST_YEAR
+        # at most one year per ten rows, so every year has some
+        self.max_year = self.FIRST_YEAR + max(1, min((size or 10) // 10, 30)) - 1
+        self._tables = {}
+
     def read(self, filename):
         pass
 
+    def fingerprint(self):
+        return "mock" if self.size is None else f"mock-{self.size}"
+
     def get_publication_summary(self):
         return (('Details', 'Conference Paper', 'Journal', 'Book', 'Book Chapter', 'Total'),
                 [('Number of publications', 10, 5, 8, 2, 25), ('Number of authors', 20, 15, 18, 12, 35)])
 
     # Return tuple containing headers and list of data
-    def get_publications_by_author(self):
-        return ('Author', 'Number of conference papers', 'Number of journals', 'Number of books',
-                'Number of book chapters', 'Total'), \
+    def get_publications_by_author(self, offset=0, limit=None, **options):
+        header = ('Author', 'Number of conference papers', 'Number of journals', 'Number of books',
+                  'Number of book chapters', 'Total')
+        if self.size is None:
+            return header, \
                [
                 ('Author C', 1, 6, 7, 8, 26),
                 ('Author D', 5, 5, 2, 6, 21),
                 ('Author B', 1, 5, 4, 5, 23),
                 ('Author A', 1, 5, 7, 4, 10)]
+        return header, _page(self._table("publications"), offset, limit)
 
     # Return tuple containing headers and list of data
     def get_publications_by_year(self):
-        return ('Year', 'Number of conference papers', 'Number of journals', 'Number of books',
-                'Number of book chapters'), [(2002, 100, 50, 25, 10), (2004, 99, 49, 24, 9)]
+        header = ('Year', 'Number of conference papers', 'Number of journals', 'Number of books',
+                  'Number of book chapters')
+        if self.size is None:
+            return header, [(2002, 100, 50, 25, 10), (2004, 99, 49, 24, 9)]
+        return header, self._table("years")
 
     # Return tuple containing headers and list of data
     def get_author_totals_by_year(self):
-        return ('Year', 'Number of conference papers', 'Number of journals', 'Number of books',
-                'Number of book chapters'), [(2001, 10, 5, 6, 3), (2003, 12, 7, 4, 2)]
+        header = ('Year', 'Number of conference papers', 'Number of journals', 'Number of books',
+                  'Number of book chapters')
+        if self.size is None:
+            return header, [(2001, 10, 5, 6, 3), (2003, 12, 7, 4, 2)]
+        return header, [[y] + [c // 2 for c in counts] for y, *counts in self._table("years")]
 
     # Return a list in the format:
     # [ [author, total], ... ]
@@ -34,3 +68,122 @@ class MockDatabase:
     # the give name was an author
     def get_coauthor_details(self, name):
         return [('foo', 1), ('bar', 2), ('baz', 3)]
+
+    def get_averages(self):
+        header = ("Conference Paper", "Journal", "Book", "Book Chapter", "All Publications")
+        rows = ([2.5, 3.25, 1.5, 2.0, 2.75], [2.0, 3.0, 1.0, 2.0, 3.0], [[2.0], [3.0], [1.0], [2.0], [2.0, 3.0]])
+        return header, [rows, rows, rows, rows]
+
+    def get_coauthor_data(self, start_year, end_year, pub_type, offset=0, limit=None, **options):
+        return ("Author", "Co-Authors"), _page(self._table("coauthors"), offset, limit)
+
+    def get_author_details(self, start_year, end_year, pub_type, offset=0, limit=None, **options):
+        return ("Author", "First author", "Last author", "Sole author"), \
+            _page(self._table("firstlastsole"), offset, limit)
+
+    def get_all_author_names_lower(self):
+        return self._table("names_lower")
+
+    def find_author(self, name):
+        return self._table("index").get(name.lower())
+
+    def get_partial_match(self, authorName, allAuthors=None, limit=None):
+        matched = [name for name in self._table("names_lower") if authorName in name]
+        return len(matched), matched[:limit]
+
+    def sort_result(self, input, searchedAuthorName):
+        return sorted(searchedAuthorName)
+
+    def autocomplete(self, query, limit=10):
+        query = query.lower()
+        names = self._table("names")
+        return [names[i] for i, name in enumerate(self._table("names_lower")) if query in name][:limit]
+
+    def get_author_stat(self, name):
+        header = ("Author", "Number of all publications", "Number of conference papers",
+                  "Number of journals", "Number of book chapters", "Number of books",
+                  "Number of co-authors", "First on a paper", "Last on a paper")
+        i = self.find_author(name)
+        if i is None:
+            return header, [0, 0, 0, 0, 0, 0, 0, 0]
+        _, conference, journal, book, chapter, total = self._table("publications")[i]
+        return header, [total, conference, journal, chapter, book, 1 + i % 10, i % 4, i % 3]
+
+    def get_author_stats_by_click(self, author):
+        i = self._table("index").get(author.lower())
+        if i is None:
+            return False, [0] * 5, [0] * 5, [0] * 5, [0] * 5, 0, 'External', "", 0, ''
+        counts = self._table("publications")[i][1:]
+        totals = [counts[-1]] + counts[:-1]
+        names = self._table("names")
+        coauthors = [names[(i + k) % len(names)] for k in range(1, 1 + i % 10)]
+        return (True, totals, [c // 2 for c in totals], [c // 3 for c in totals], [c // 4 for c in totals],
+                len(coauthors), 'External', ", ".join(coauthors), len(coauthors), names[i])
+
+    def get_publications_for_year(self, year):
+        header = ("Number of all publications", "Number of conference papers",
+                  "Number of journals", "Number of book chapters", "Number of books")
+        for y, conference, journal, book, chapter in self._table("years"):
+            if y == year:
+                return header, [conference + journal + book + chapter, conference, journal, chapter, book]
+        return header, [0, 0, 0, 0, 0]
+
+    def get_all_authors_stat_by_year(self, year, offset=0, limit=None):
+        header = ("Author", "Number of all publications", "Number of conference papers",
+                  "Number of journals", "Number of book chapters", "Number of books")
+        nyears = self.max_year - self.min_year + 1
+        rows = [[name, total, conference, journal, chapter, book]
+                for name, conference, journal, book, chapter, total
+                in self._table("publications")[(year - self.min_year) % nyears::nyears]]
+        return header, _page(rows, offset, limit)
+
+    def get_all_publications(self, offset=0, limit=None, sort=None, descending=False):
+        return self.PUBLICATION_LINK_HEADER, _page(self._table("links"), offset, limit)
+
+    def iter_publication_links(self, offset=0, limit=None, sort=None, descending=False, batch=1000):
+        return iter(_page(self._table("links"), offset, limit))
+
+    def _table(self, key):
+        """The generated table called key, built on first use."""
+        try:
+            return self._tables[key]
+        except KeyError:
+            pass
+        n = self.size or 4
+        nyears = self.max_year - self.min_year + 1
+        if key == "names":
+            table = [f"Author {chr(ord('A') + i % 26)}{i // 26 or ''}" for i in range(n)]
+        elif key == "names_lower":
+            table = [author.lower() for author in self._table("names")]
+        elif key == "index":
+            table = {author: i for i, author in enumerate(self._table("names_lower"))}
+        elif key == "publications":
+            table = []
+            for i, author in enumerate(self._table("names")):
+                counts = [i % 7, (i * 3) % 5, i % 2, (i * 5) % 3]
+                table.append([author] + counts + [sum(counts)])
+        elif key == "firstlastsole":
+            table = [[author, i % 5, i % 4, i % 3] for i, author in enumerate(self._table("names"))]
+        elif key == "coauthors":
+            names = self._table("names")
+            table = [[f"{author} {1 + i % 10}",
+                      ", ".join([f"{names[(i + k) % n]} {1 + (i + k) % 10}" for k in range(1, 1 + i % 10)])]
+                     for i, author in enumerate(names)]
+        elif key == "years":
+            table = [[self.min_year + y, n // nyears + y, n // nyears // 2 + y, y % 3, y % 4]
+                     for y in range(nyears)]
+        elif key == "links":
+            names = self._table("names")
+            table = [[f"Publication title {i}", f"https://doi.org/10.1000/mock.{i}",
+                      ", ".join([names[(i + k) % n] for k in range(1 + i % 4)]), self.min_year + i % nyears,
+                      f"Conference {i % 50}", "-", str(1 + i % 40), f"{1 + i % 900}-{10 + i % 900}", "-",
+                      f"conf/c{i % 50}/{self.min_year + i % nyears}", f"db/conf/c{i % 50}.html#{i}", "-", "-"]
+                     for i in range(n)]
+        else:
+            raise KeyError(key)
+        self._tables[key] = table
+        return table
+
+
+def _page(rows, offset, limit):
+    return rows[offset:None if limit is None else offset + limit]
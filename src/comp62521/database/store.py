@@ -0,0 +1,417 @@
+import re
+
+import numpy as np
+import validators
+
+
+class Author:
+    def __init__(self, name):
+        self.name = name
+
+
+class Publication:
+    CONFERENCE_PAPER = 0
+    JOURNAL = 1
+    BOOK = 2
+    BOOK_CHAPTER = 3
+
+    def __init__(self, pub_type, title, link , year, authors, booktitle, journ, vol, pages, number, crossref, ee, isbn, series):
+        self.pub_type = pub_type
+        self.title = title
+        self.link = link
+        self.booktitle = booktitle
+        self.journ = journ
+        self.vol = vol
+        self.pages = pages
+        self.number = number
+        self.crossref = crossref
+        self.ee = ee
+        self.isbn = isbn
+        self.series = series
+        if year:
+            self.year = int(year)
+        else:
+            self.year = -1
+        self.authors = authors
+
+
+class PublicationStore:
+    """Column-oriented storage for the publications of a Database.
+
+    Years and publication types are kept in NumPy arrays, and the author
+    lists are kept CSR-style: the authors of publication i are
+    author_ids[author_offsets[i]:author_offsets[i + 1]]. The remaining
+    descriptive fields are plain per-column lists, and whether each link is
+    a valid URL is worked out as publications are added and kept in a
+    boolean array. Publication objects are only created when a caller
+    indexes or iterates over the store.
+    """
+
+    FIELDS = ("title", "link", "booktitle", "journ", "vol", "pages",
+              "number", "crossref", "ee", "isbn", "series")
+
+    def __init__(self, capacity=1024):
+        self._size = 0
+        self._year = np.empty(capacity, dtype=np.int32)
+        self._pub_type = np.empty(capacity, dtype=np.int8)
+        self._link_valid = np.empty(capacity, dtype=bool)
+        self._author_offsets = np.zeros(capacity + 1, dtype=np.int64)
+        self._author_ids = np.empty(capacity * 4, dtype=np.int32)
+        self.columns = {f: [] for f in self.FIELDS}
+        self._derived = {}
+
+    @classmethod
+    def from_arrays(cls, year, pub_type, author_offsets, author_ids, columns, link_valid=None):
+        """Wrap existing arrays, e.g. memory-mapped ones, without copying.
+
+        The arrays are copied into growable storage only when a publication
+        is appended. Without link_valid the links are validated here.
+        """
+        store = cls(capacity=0)
+        store._size = len(year)
+        store._year = year
+        store._pub_type = pub_type
+        store._link_valid = _validate_links(columns["link"]) if link_valid is None else link_valid
+        store._author_offsets = author_offsets
+        store._author_ids = author_ids
+        store.columns = columns
+        return store
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._size))]
+        if i < 0:
+            i += self._size
+        if not 0 <= i < self._size:
+            raise IndexError("publication index out of range")
+        c = self.columns
+        return Publication(
+            int(self._pub_type[i]), c["title"][i], c["link"][i],
+            int(self._year[i]), self.authors_of(i), c["booktitle"][i],
+            c["journ"][i], c["vol"][i], c["pages"][i], c["number"][i],
+            c["crossref"][i], c["ee"][i], c["isbn"][i], c["series"][i])
+
+    def __iter__(self):
+        for i in range(self._size):
+            yield self[i]
+
+    def append(self, pub_type, title, link, year, author_ids, booktitle, journ, vol, pages, number, crossref, ee, isbn, series):
+        i = self._size
+        start = self._author_offsets[i]
+        end = start + len(author_ids)
+        self._reserve(i + 1, end)
+        self._year[i] = int(year) if year else -1
+        self._pub_type[i] = pub_type
+        self._link_valid[i] = link_is_valid(link)
+        self._author_ids[start:end] = author_ids
+        self._author_offsets[i + 1] = end
+        for name, value in zip(self.FIELDS, (title, link, booktitle, journ, vol, pages,
+                                             number, crossref, ee, isbn, series)):
+            self.columns[name].append(value)
+        self._size = i + 1
+        if self._derived:
+            self._derived = {}
+
+    def extend(self, years, pub_types, author_counts, author_ids, columns, link_valid=None):
+        """Append many publications at once.
+
+        author_counts gives the number of authors of each publication, whose
+        ids follow one another in author_ids, and columns maps every name in
+        FIELDS to a list of values. link_valid, if the links have already
+        been validated, saves validating them again.
+        """
+        n = len(years)
+        if not n:
+            return
+        i = self._size
+        start = self._author_offsets[i]
+        end = start + len(author_ids)
+        self._reserve(i + n, end)
+        self._year[i:i + n] = years
+        self._pub_type[i:i + n] = pub_types
+        self._link_valid[i:i + n] = _validate_links(columns["link"]) if link_valid is None else link_valid
+        self._author_ids[start:end] = author_ids
+        self._author_offsets[i + 1:i + n + 1] = start + np.cumsum(author_counts)
+        for name in self.FIELDS:
+            self.columns[name].extend(columns[name])
+        self._size = i + n
+        if self._derived:
+            self._derived = {}
+
+    def _reserve(self, npubs, nslots):
+        if npubs > len(self._year):
+            capacity = max(npubs, 2 * len(self._year))
+            self._year = _grow(self._year, capacity)
+            self._pub_type = _grow(self._pub_type, capacity)
+            self._link_valid = _grow(self._link_valid, capacity)
+            self._author_offsets = _grow(self._author_offsets, capacity + 1)
+        if nslots > len(self._author_ids):
+            self._author_ids = _grow(self._author_ids, max(nslots, 2 * len(self._author_ids)))
+
+    @property
+    def year(self):
+        return self._year[:self._size]
+
+    @property
+    def pub_type(self):
+        return self._pub_type[:self._size]
+
+    @property
+    def link_valid(self):
+        """Whether the link of each publication is a valid URL."""
+        return self._link_valid[:self._size]
+
+    @property
+    def author_offsets(self):
+        return self._author_offsets[:self._size + 1]
+
+    @property
+    def author_ids(self):
+        return self._author_ids[:self._author_offsets[self._size]]
+
+    @property
+    def author_counts(self):
+        return self._cached("author_counts", lambda: np.diff(self.author_offsets))
+
+    @property
+    def slot_pub(self):
+        """Index of the owning publication for every entry of author_ids."""
+        return self._cached("slot_pub", lambda: np.repeat(
+            np.arange(self._size), self.author_counts))
+
+    @property
+    def slot_type(self):
+        return self._cached("slot_type", lambda: self.pub_type[self.slot_pub])
+
+    @property
+    def slot_year(self):
+        return self._cached("slot_year", lambda: self.year[self.slot_pub])
+
+    @property
+    def first_author(self):
+        return self._cached("first_author", lambda: self.author_ids[self.author_offsets[:-1]])
+
+    @property
+    def last_author(self):
+        return self._cached("last_author", lambda: self.author_ids[self.author_offsets[1:] - 1])
+
+    @property
+    def has_coauthors(self):
+        """Whether each publication lists at least two distinct authors."""
+        def compute():
+            if not self._size:
+                return np.zeros(0, dtype=bool)
+            starts = self.author_offsets[:-1]
+            return np.maximum.reduceat(self.author_ids, starts) != np.minimum.reduceat(self.author_ids, starts)
+        return self._cached("has_coauthors", compute)
+
+    def _cached(self, key, compute):
+        try:
+            return self._derived[key]
+        except KeyError:
+            value = self._derived[key] = compute()
+            return value
+
+    def authors_of(self, i):
+        return self._author_ids[self._author_offsets[i]:self._author_offsets[i + 1]].tolist()
+
+    def select(self, start_year=None, end_year=None, pub_type=4):
+        """Boolean mask of the publications inside a year range and type.
+
+        pub_type 4 stands for all publication types, as in the views.
+        """
+        mask = np.ones(self._size, dtype=bool)
+        if start_year is not None:
+            mask &= self.year >= start_year
+        if end_year is not None:
+            mask &= self.year <= end_year
+        if pub_type != 4:
+            mask &= self.pub_type == pub_type
+        return mask
+
+    def slots(self, pubs):
+        """Positions in author_ids of the authors of the given publications,
+        in publication order."""
+        pubs = np.asarray(pubs, dtype=np.int64)
+        counts = self.author_counts[pubs]
+        starts = self.author_offsets[pubs]
+        total = int(counts.sum())
+        base = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        return base + np.arange(total)
+
+    def publications_of(self, author_id):
+        """Sorted indices of the publications listing author_id."""
+        return np.unique(self.slot_pub[self.author_ids == author_id])
+
+    def coauthor_pairs(self, mask=None, with_pubs=False):
+        """All ordered (author, coauthor) pairs of distinct author ids that
+        share a publication, one pair per shared author slot.
+
+        mask, a boolean mask or an array of publication indices, optionally
+        restricts the publications considered. with_pubs also returns the
+        publication of each pair.
+        """
+        counts = self.author_counts
+        starts = self.author_offsets[:-1]
+        pubs = np.arange(self._size)
+        if mask is not None:
+            counts = counts[mask]
+            starts = starts[mask]
+            pubs = pubs[mask]
+        counts = counts.astype(np.int64)
+        squares = counts * counts
+        owner = np.repeat(np.arange(len(counts)), squares)
+        local = np.arange(int(squares.sum())) - np.repeat(np.cumsum(squares) - squares, squares)
+        k = counts[owner]
+        left = self.author_ids[starts[owner] + local // k]
+        right = self.author_ids[starts[owner] + local % k]
+        keep = left != right
+        if with_pubs:
+            return left[keep], right[keep], pubs[owner[keep]]
+        return left[keep], right[keep]
+
+
+# a subset of the URLs validators.url accepts: http(s), a plain host name
+# and a path, as nearly all DBLP links are, matched without its overhead
+SIMPLE_URL = re.compile(r"https?://(?=[^/]{1,253}(?:/|\Z))(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z]{2,63}"
+                        r"(?:/[a-z0-9/\-._~!$&'()*+,;=:@%]*)?\Z", re.IGNORECASE)
+
+
+def link_is_valid(link):
+    link = str(link)
+    if SIMPLE_URL.match(link):
+        return True
+    # every URL has a scheme, ending at a colon
+    if ":" not in link:
+        return False
+    return bool(validators.url(link))
+
+
+def _validate_links(links):
+    return np.fromiter((link_is_valid(link) for link in links), dtype=bool, count=len(links))
+
+
+def _grow(array, capacity):
+    grown = np.zeros(capacity, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class StringTable:
+    """Strings packed UTF-8 encoded into one byte blob, string k being
+    blob[offsets[k]:offsets[k + 1]]."""
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def pack(cls, strings):
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, k):
+        return self.blob[self.offsets[k]:self.offsets[k + 1]].tobytes().decode("utf-8")
+
+
+class StringColumn:
+    """A list-like column of optional strings held as ids into a StringTable,
+    -1 standing for None. Appended values are kept in a plain list."""
+
+    def __init__(self, ids, table):
+        self.ids = ids
+        self.table = table
+        self._appended = []
+
+    def __len__(self):
+        return len(self.ids) + len(self._appended)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if i >= len(self.ids):
+            return self._appended[i - len(self.ids)]
+        k = self.ids[i]
+        return None if k < 0 else self.table[k]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def append(self, value):
+        self._appended.append(value)
+
+    def extend(self, values):
+        self._appended.extend(values)
+
+
+class StringList:
+    """A list of strings, the first count of them those of a StringTable
+    (all of its strings by default). Appended strings are kept in a plain
+    list."""
+
+    def __init__(self, table=None, count=None):
+        self.table = table
+        self.count = 0 if table is None else len(table) if count is None else count
+        self._appended = []
+
+    def __len__(self):
+        return self.count + len(self._appended)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if i >= self.count:
+            return self._appended[i - self.count]
+        if i < 0:
+            raise IndexError("string index out of range")
+        return self.table[i]
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self.table[i]
+        yield from self._appended
+
+    def __eq__(self, other):
+        if isinstance(other, (list, StringList)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def append(self, value):
+        self._appended.append(value)
+
+    def extend(self, values):
+        self._appended.extend(values)
+
+
+class AuthorList:
+    """The authors of a Database, held as their names in a StringList.
+    Author objects are only created when a caller indexes or iterates."""
+
+    def __init__(self, names=None):
+        self.names = StringList() if names is None else names
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [Author(name) for name in self.names[i]]
+        return Author(self.names[i])
+
+    def __iter__(self):
+        for name in self.names:
+            yield Author(name)
+
+    def append(self, author):
+        self.names.append(author.name)
@@ -0,0 +1,305 @@
+"""Prometheus metrics of the pages and the Database, on /metrics.
+
+enable(app) wraps every view function and every public method of the
+Database in app.config['DATABASE'] with a timer that counts the calls and
+their durations in a histogram. The Database's size, the age of the
+snapshot it was loaded from and the hits and misses of its result cache
+are read when /metrics is requested. Until enable is called, and after
+disable, nothing is wrapped and /metrics answers 404. Under the prefork
+server the counts and the cache statistics are kept in memory shared by
+the workers, and /metrics reports their sums.
+
+View functions are timed until they return, so the time spent sending a
+streamed page is not included. Nested calls, e.g. of one Database method
+by another, are counted by each.
+"""
+import bisect
+import functools
+import math
+import mmap
+import multiprocessing
+import os
+import threading
+import time
+
+import numpy as np
+from flask import Response, abort
+
+from comp62521 import app
+
+# upper bounds in seconds of the histogram buckets
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PREFIX = "comp62521"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_metrics = None
+
+
+class Metrics:
+    """Call counts and duration histograms, by metric and label.
+
+    The counters are NumPy arrays with one row per worker process, each
+    worker adding to its own row only. share moves them into memory shared
+    with the processes forked afterwards, so that whichever worker answers
+    /metrics reports the sums over all of them.
+    """
+
+    HELP = {
+        "http_request_duration_seconds": ("route", "Time spent in the view function of each route."),
+        "http_request_exceptions_total": ("route", "Exceptions raised by the view function of each route."),
+        "database_call_duration_seconds": ("method", "Time spent in each public Database method."),
+        "database_call_exceptions_total": ("method", "Exceptions raised by each public Database method."),
+    }
+    # exception types told apart per series; any further ones count as "other"
+    EXCEPTION_TYPES = 32
+    # hits and misses of the worker's result cache, counted on from those of
+    # the workers it replaced, and its entries, bytes and budget
+    CACHE_FIELDS = ("hits", "misses", "entries", "bytes", "budget")
+
+    def __init__(self):
+        # (metric, label value) -> row of the histograms
+        self.series = {}
+        # worker x series x (count in each bucket and above the last, sum)
+        self.histograms = np.zeros((1, 0, len(BUCKETS) + 2))
+        # worker x series x exception type -> count
+        self.exceptions = np.zeros((1, 0, self.EXCEPTION_TYPES), dtype=np.int64)
+        self.exception_names = np.zeros(self.EXCEPTION_TYPES, dtype="S64")
+        self.caches = np.zeros((1, len(self.CACHE_FIELDS)))
+        self.worker = 0
+        self._cache_base = np.zeros(2)
+        self._lock = threading.Lock()
+        # guards exception_names, which all the workers add to
+        self._names_lock = threading.Lock()
+        self._app = self._db = None
+        self._views = {}
+        self._methods = []
+
+    def timed(self, function, metric, label):
+        """function, recording the duration of each call under metric."""
+        row = self.series.setdefault((metric + "_duration_seconds", label), len(self.series))
+        if row == self.histograms.shape[1]:
+            # series are added before share is called, while there is one row
+            self.histograms = np.concatenate([self.histograms, np.zeros((1, 1, len(BUCKETS) + 2))], axis=1)
+            self.exceptions = np.concatenate(
+                [self.exceptions, np.zeros((1, 1, self.EXCEPTION_TYPES), dtype=np.int64)], axis=1)
+        # locals, as the wrapper runs on every call
+        lock = self._lock
+        clock = time.perf_counter
+        bucket = bisect.bisect_left
+        requests = metric == "http_request"
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            except Exception as e:
+                k = self._exception_type(type(e).__name__)
+                with lock:
+                    self.exceptions[self.worker, row, k] += 1
+                raise
+            finally:
+                seconds = clock() - start
+                i = bucket(BUCKETS, seconds)
+                with lock:
+                    series = self.histograms[self.worker, row]
+                    series[i] += 1
+                    series[-1] += seconds
+                if requests:
+                    self.publish_cache()
+        return wrapper
+
+    def _exception_type(self, name):
+        """Column of the exceptions named name, giving it one if it is new."""
+        key = name.encode("utf-8")[:64]
+        with self._names_lock:
+            names = self.exception_names
+            for k in range(self.EXCEPTION_TYPES - 1):
+                if names[k] == key:
+                    return k
+                if not names[k]:
+                    names[k] = key
+                    return k
+            names[-1] = b"other"
+            return self.EXCEPTION_TYPES - 1
+
+    def publish_cache(self):
+        """Record the statistics of this worker's result cache in its row."""
+        cache = getattr(self._db, "cache", None)
+        if cache is None:
+            return
+        stats = cache.stats()
+        row = self.caches[self.worker]
+        row[:2] = self._cache_base + (stats["hits"], stats["misses"])
+        row[2:] = stats["entries"], stats["bytes"], stats["budget"]
+
+    def share(self, workers):
+        """Move the counters into memory shared with the processes forked
+        from now on, with a row for each of workers of them. The counts so
+        far are kept in the first."""
+        self.histograms = _shared(self.histograms, workers)
+        self.exceptions = _shared(self.exceptions, workers)
+        self.exception_names = _shared(self.exception_names[None], 1)[0]
+        self.caches = _shared(self.caches, workers)
+        self._names_lock = multiprocessing.Lock()
+
+    def start_worker(self, worker):
+        """Count into row worker from now on, in a newly forked process.
+        The counts of the worker it replaces are kept."""
+        self.worker = worker
+        cache = getattr(self._db, "cache", None)
+        if cache is not None:
+            stats = cache.stats()
+            self._cache_base = self.caches[worker, :2] - (stats["hits"], stats["misses"])
+        self.publish_cache()
+
+    def instrument(self, app, db):
+        """Time every view function of app and public method of db."""
+        self._app, self._db = app, db
+        for rule in app.url_map.iter_rules():
+            if rule.endpoint in ("static", "showMetrics") or rule.endpoint in self._views:
+                continue
+            view = self._views[rule.endpoint] = app.view_functions[rule.endpoint]
+            app.view_functions[rule.endpoint] = self.timed(view, "http_request", rule.rule)
+        for name in dir(type(db)):
+            if name.startswith("_") or not callable(getattr(type(db), name)):
+                continue
+            # the instance attribute shadows the method until it is deleted
+            setattr(db, name, self.timed(getattr(db, name), "database_call", name))
+            self._methods.append(name)
+
+    def uninstrument(self):
+        self._app.view_functions.update(self._views)
+        for name in self._methods:
+            delattr(self._db, name)
+        self._views = {}
+        self._methods = []
+
+    def render(self, db):
+        """All the metrics, summed over the workers, in the Prometheus text
+        format."""
+        self.publish_cache()
+        with self._lock:
+            histograms = self.histograms.sum(axis=0)
+            exceptions = self.exceptions.sum(axis=0)
+            caches = self.caches.sum(axis=0)
+        names = [name.decode("utf-8") for name in self.exception_names]
+        lines = []
+        for metric, (label, text) in self.HELP.items():
+            name = f"{PREFIX}_{metric}"
+            if metric.endswith("_total"):
+                lines += [f"# HELP {name} {text}", f"# TYPE {name} counter"]
+                series = metric[:-len("_exceptions_total")] + "_duration_seconds"
+                counts = sorted((value, names[k], int(exceptions[row, k]))
+                                for (m, value), row in self.series.items() if m == series
+                                for k in np.flatnonzero(exceptions[row]).tolist())
+                for value, exception, count in counts:
+                    lines.append(f'{name}{{{label}="{_escape(value)}",exception="{exception}"}} {count}')
+                continue
+            lines += [f"# HELP {name} {text}", f"# TYPE {name} histogram"]
+            for (m, value), row in sorted(self.series.items()):
+                if m != metric:
+                    continue
+                series = histograms[row]
+                labels = f'{label}="{_escape(value)}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ("+Inf",), series[:-1].tolist()):
+                    cumulative += int(count)
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{labels}}} {_number(float(series[-1]))}")
+                lines.append(f"{name}_count{{{labels}}} {cumulative}")
+        lines += _database_gauges(db, dict(zip(self.CACHE_FIELDS, caches.tolist())))
+        return "\n".join(lines) + "\n"
+
+
+def _shared(array, rows):
+    """A copy of array, with rows rows of which the first is array[0], in
+    memory shared with the processes forked afterwards."""
+    shape = (rows,) + array.shape[1:]
+    size = int(np.prod(shape)) * array.dtype.itemsize
+    shared = np.frombuffer(mmap.mmap(-1, max(size, 1)), dtype=array.dtype,
+                           count=int(np.prod(shape))).reshape(shape)
+    shared[0] = array[0]
+    return shared
+
+
+def _database_gauges(db, cache_stats):
+    gauges = []
+
+    def gauge(metric, text, value, kind="gauge"):
+        name = f"{PREFIX}_{metric}"
+        gauges.extend([f"# HELP {name} {text}", f"# TYPE {name} {kind}", f"{name} {_number(value)}"])
+
+    if hasattr(db, "publications"):
+        gauge("publications", "Publications in the Database.", len(db.publications))
+    if hasattr(db, "authors"):
+        gauge("authors", "Authors in the Database.", len(db.authors))
+    gauge("database_version", "Number of times the Database contents changed.", db.version)
+    path = getattr(db, "snapshot_path", None)
+    if path is not None:
+        try:
+            gauge("snapshot_age_seconds", "Time since the snapshot the Database was loaded from was written.",
+                  time.time() - os.stat(path).st_mtime)
+        except OSError:
+            pass
+    if getattr(db, "cache", None) is not None:
+        stats = {field: int(value) for field, value in cache_stats.items()}
+        lookups = stats["hits"] + stats["misses"]
+        gauge("result_cache_hits_total", "Database results served from the caches.", stats["hits"], "counter")
+        gauge("result_cache_misses_total", "Database results computed for lack of a cached one.",
+              stats["misses"], "counter")
+        gauge("result_cache_hit_ratio", "Share of the result cache lookups that were hits.",
+              stats["hits"] / lookups if lookups else math.nan)
+        gauge("result_cache_entries", "Results in the caches of all the workers.", stats["entries"])
+        gauge("result_cache_bytes", "Estimated size of the cached results of all the workers.", stats["bytes"])
+        gauge("result_cache_budget_bytes", "Sum of the sizes above which each worker evicts cached results.",
+              stats["budget"])
+    return gauges
+
+
+def _number(value):
+    if isinstance(value, float) and math.isnan(value):
+        return "NaN"
+    return repr(value)
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def enable(app):
+    """Start measuring the routes of app and its current Database."""
+    global _metrics
+    if _metrics is not None:
+        return
+    _metrics = Metrics()
+    _metrics.instrument(app, app.config['DATABASE'])
+
+
+def share(workers):
+    """Share the metrics, if enabled, with workers processes forked from
+    now on, see Metrics.share."""
+    if _metrics is not None:
+        _metrics.share(workers)
+
+
+def start_worker(worker):
+    """Count the metrics, if enabled, as worker, in a newly forked process."""
+    if _metrics is not None:
+        _metrics.start_worker(worker)
+
+
+def disable(app):
+    """Stop measuring, restoring the original functions, and forget the metrics."""
+    global _metrics
+    if _metrics is None:
+        return
+    _metrics.uninstrument()
+    _metrics = None
+
+
+@app.route("/metrics")
+def showMetrics():
+    if _metrics is None:
+        abort(404)
+    return Response(_metrics.render(app.config['DATABASE']), content_type=CONTENT_TYPE)
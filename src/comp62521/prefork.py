@@ -0,0 +1,216 @@
+"""Prefork HTTP server sharing one loaded Database between its workers.
+
+The parent process loads the Database, builds every index up front and
+freezes the garbage collector, so that everything allocated so far is
+never scanned again. It then listens on the port and forks the workers,
+each serving requests from the shared socket one at a time. The workers
+see the Database through copy-on-write pages, which stay shared as long
+as nothing writes to them: the NumPy arrays and string blobs are only
+read, and with the collector frozen only the Python objects a worker
+touches (through their reference counts) get copied.
+
+The parent replaces workers that die, and stops them all on SIGTERM or
+SIGINT. A worker that dies soon after it was forked is replaced after a
+delay that doubles with each such death in a row, and if too many die
+soon within a short window the parent stops the rest and gives up,
+rather than forking a worker that cannot start in a tight loop. On
+SIGUSR1 it prints the memory of every worker, as read from
+/proc/<pid>/smaps_rollup, to stderr; the workers ignore it.
+
+With metrics enabled, each worker counts into its own row of arrays
+shared with the others, and a new worker takes over the row of the one
+it replaces, so /metrics reports the same totals whichever answers it.
+"""
+import ctypes
+import ctypes.util
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+from werkzeug.serving import make_server
+
+from comp62521 import metrics
+
+# what memory_usage reads from smaps_rollup, in kB
+MEMORY_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+# blocks from this size up are mapped apart from the C heap
+MMAP_THRESHOLD = 2 ** 20
+# glibc's mallopt parameter for it
+M_MMAP_THRESHOLD = -3
+# a worker dying within CRASH_WINDOW seconds of its fork is a crash;
+# crashes in a row are replaced after RESPAWN_DELAY seconds, doubling up
+# to MAX_RESPAWN_DELAY, and MAX_CRASHES of them within the window stop
+# the server
+CRASH_WINDOW = 10.0
+RESPAWN_DELAY = 0.1
+MAX_RESPAWN_DELAY = 5.0
+MAX_CRASHES = 5
+
+
+def _libc():
+    try:
+        return ctypes.CDLL(ctypes.util.find_library("c"))
+    except (OSError, TypeError):
+        return None
+
+
+def release_free_memory():
+    """Return the free pages of the C heap to the OS. Freed but still
+    mapped, they would be shared with the workers, and each page a worker
+    allocates from would be copied, leaving the parent its stale copy."""
+    libc = _libc()
+    if libc is not None and hasattr(libc, "malloc_trim"):
+        libc.malloc_trim(0)
+
+
+def map_large_blocks(threshold=MMAP_THRESHOLD):
+    """Allocate blocks of threshold bytes and more, e.g. the temporary
+    arrays of a query, in mappings of their own that are unmapped when
+    freed. glibc otherwise raises its threshold as such blocks are freed,
+    and a worker keeps the peak memory of the queries it ran in its heap."""
+    libc = _libc()
+    if libc is not None and hasattr(libc, "mallopt"):
+        libc.mallopt(M_MMAP_THRESHOLD, threshold)
+
+
+def memory_usage(pid):
+    """Memory of process pid in bytes, by smaps_rollup field, with
+    "Private" the memory no other process shares. None off Linux."""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+    usage = {}
+    for line in lines:
+        field, _, value = line.partition(":")
+        if field in MEMORY_FIELDS:
+            usage[field] = int(value.split()[0]) * 1024
+    usage["Private"] = usage.get("Private_Clean", 0) + usage.get("Private_Dirty", 0)
+    return usage
+
+
+def memory_report(pids):
+    """One line per process of its RSS, PSS and private memory, in MiB."""
+    lines = [f"{'pid':>8} {'rss':>8} {'pss':>8} {'private':>8}"]
+    for pid in pids:
+        usage = memory_usage(pid)
+        if usage is not None:
+            lines.append(f"{pid:>8} {usage['Rss'] / 2 ** 20:>8.1f} {usage['Pss'] / 2 ** 20:>8.1f} "
+                         f"{usage['Private'] / 2 ** 20:>8.1f}")
+    return "\n".join(lines)
+
+
+class PreforkServer:
+    """Serves app on host:port from worker processes forked from this one."""
+
+    def __init__(self, app, host, port, workers, backlog=128, crash_window=CRASH_WINDOW,
+                 respawn_delay=RESPAWN_DELAY, max_crashes=MAX_CRASHES):
+        self.app = app
+        self.workers = workers
+        self.crash_window = crash_window
+        self.respawn_delay = respawn_delay
+        self.max_crashes = max_crashes
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind((host, port))
+        self.socket.listen(backlog)
+        self.host, self.port = self.socket.getsockname()[:2]
+        # pid -> time the worker was forked
+        self.pids = {}
+        # pid -> row of the shared metrics the worker counts into
+        self.slots = {}
+        # times at which workers died soon after their fork, in a row
+        self.crashes = []
+        self._stopping = False
+
+    def prepare(self):
+        """Build the Database's indexes, freeze what is allocated so far and
+        trim the C heap before the workers are forked. Large blocks are
+        mapped apart already while the indexes are built, which measurably
+        leaves the workers less of the heap to copy."""
+        map_large_blocks()
+        db = self.app.config['DATABASE']
+        if hasattr(db, "build_indexes"):
+            db.build_indexes()
+        metrics.share(self.workers)
+        gc.collect()
+        gc.freeze()
+        release_free_memory()
+
+    def serve_forever(self):
+        """Fork the workers and replace those that die until stopped.
+        Raises RuntimeError if max_crashes of them die soon after their
+        fork within crash_window seconds."""
+        self.prepare()
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGUSR1, lambda signum, frame: print(memory_report(sorted(self.pids)),
+                                                                  file=sys.stderr, flush=True))
+        for _ in range(self.workers):
+            self._spawn()
+        while self.pids:
+            try:
+                pid, _ = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            started = self.pids.pop(pid, None)
+            self.slots.pop(pid, None)
+            if not self._stopping:
+                self._respawn(started)
+        self.socket.close()
+        if len(self.crashes) >= self.max_crashes:
+            raise RuntimeError(f"{len(self.crashes)} workers died within {self.crash_window:g} s "
+                               f"of starting, giving up")
+
+    def _respawn(self, started):
+        """Replace a worker forked at started that died, after a delay if
+        it died soon, or stop the server if too many did."""
+        now = time.monotonic()
+        if started is not None and now - started >= self.crash_window:
+            self.crashes = []
+            self._spawn()
+            return
+        self.crashes = [t for t in self.crashes if now - t < self.crash_window] + [now]
+        if len(self.crashes) >= self.max_crashes:
+            print(f"{len(self.crashes)} workers died soon after starting, stopping", file=sys.stderr, flush=True)
+            self._stop(None, None)
+            return
+        time.sleep(min(self.respawn_delay * 2 ** (len(self.crashes) - 1), MAX_RESPAWN_DELAY))
+        if not self._stopping:
+            self._spawn()
+
+    def _spawn(self):
+        slot = min(set(range(self.workers)) - set(self.slots.values()))
+        pid = os.fork()
+        if pid:
+            self.pids[pid] = time.monotonic()
+            self.slots[pid] = slot
+            return
+        try:
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, signal.SIG_DFL)
+            # only the parent reports on SIGUSR1, and it must not kill a worker
+            signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+            metrics.start_worker(slot)
+            self._work()
+        finally:
+            os._exit(1)
+
+    def _work(self):
+        """Serve requests from the shared socket; runs in a worker."""
+        server = make_server(self.host, self.port, self.app, fd=self.socket.fileno())
+        server.serve_forever()
+
+    def _stop(self, signum, frame):
+        self._stopping = True
+        for pid in self.pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
@@ -0,0 +1,126 @@
+"""Sampling profiles of single requests, as collapsed stacks.
+
+With app.config['PROFILING'] set, a request carrying the header
+X-Profile: 1 or the query argument profile=1 is profiled: a sampler
+thread records the stack of the thread serving it every
+app.config['PROFILE_INTERVAL'] seconds, each stack weighted by the
+microseconds since the previous sample.
+
+The result is in the collapsed format that flamegraph.pl, speedscope and
+similar tools read, one "frame;frame;...;frame microseconds" line per
+distinct stack. The root frame of every stack names the request, e.g.
+"GET /coauthors?start_year=1990&end_year=1992", so profiles of different
+requests can be concatenated. With app.config['PROFILE_DIR'] set the
+profile is saved there and named in the X-Profile-File header of the
+usual response; otherwise it is the response.
+
+Only the view function and the hooks around it are profiled, not the
+sending of a streamed page. Time spent in C code that holds the GIL is
+counted in the stack the thread returns to.
+"""
+import collections
+import itertools
+import os
+import sys
+import threading
+import time
+
+from flask import Response, g, request
+
+from comp62521 import app
+
+DEFAULT_INTERVAL = 0.001
+
+_saved = itertools.count()
+
+
+class Sampler(threading.Thread):
+    """Samples the stack of the thread thread_id until stopped."""
+
+    def __init__(self, thread_id, interval=DEFAULT_INTERVAL):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        # tuple of code objects, outermost first -> seconds
+        self.stacks = collections.Counter()
+        self._last = None
+        self._done = threading.Event()
+
+    def run(self):
+        self._last = time.perf_counter()
+        while not self._done.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        now = time.perf_counter()
+        if frame is not None:
+            codes = []
+            while frame is not None:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            self.stacks[tuple(reversed(codes))] += now - self._last
+        self._last = now
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+    def collapsed(self, root, elapsed):
+        """The samples as collapsed stack lines under the frame root.
+
+        elapsed, the seconds the profiled code ran for, is given to root
+        itself when no sample was taken, so a profile is never empty.
+        """
+        counts = collections.Counter()
+        for stack, seconds in self.stacks.items():
+            counts[";".join([root] + [_frame(code) for code in stack])] += seconds
+        if not counts:
+            counts[root] = elapsed
+        return "".join(f"{stack} {max(1, round(seconds * 1e6))}\n" for stack, seconds in sorted(counts.items()))
+
+
+def _frame(code):
+    """Frame name of a code object: function, file and the line it starts on."""
+    filename = "/".join(code.co_filename.replace("\\", "/").split("/")[-2:])
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+def requested():
+    return request.headers.get("X-Profile") == "1" or request.args.get("profile") == "1"
+
+
+@app.before_request
+def start_profile():
+    if not app.config.get("PROFILING") or not requested():
+        return
+    sampler = Sampler(threading.get_ident(), app.config.get("PROFILE_INTERVAL", DEFAULT_INTERVAL))
+    g.profile = (sampler, time.perf_counter())
+    sampler.start()
+
+
+@app.after_request
+def finish_profile(response):
+    profile = g.pop("profile", None)
+    if profile is None:
+        return response
+    sampler, start = profile
+    sampler.stop()
+    root = f"{request.method} {request.full_path.rstrip('?')}".replace(";", "%3B")
+    text = sampler.collapsed(root, time.perf_counter() - start)
+    directory = app.config.get("PROFILE_DIR")
+    if directory is None:
+        return Response(text, mimetype="text/plain")
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.endpoint}-{os.getpid()}-{next(_saved)}.folded"
+    with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+        f.write(text)
+    response.headers["X-Profile-File"] = name
+    return response
+
+
+@app.teardown_request
+def abandon_profile(exception):
+    # after_request is skipped when the view raises
+    profile = g.pop("profile", None)
+    if profile is not None:
+        profile[0].stop()
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 def mean(X):
     n = len(X)
     if n > 0:
@@ -39,4 +42,123 @@ def mode(X):
             modelist.append(key)
     modelist.sort()
     
-    return modelist
\ No newline at end of file
+    return modelist
+
+# Batched versions of the functions above, over many groups of values at
+# once. For integer values, whatever their dtype, they return exactly what
+# mean, median and mode return for each group, as Python numbers and lists
+# of the values' type. stat, an index into (mean, median, mode), asks for
+# that statistic alone.
+
+def columns(X, stat=None):
+    """Mean, median and mode of every column of the 2-D array X, as three
+    lists with one entry per column."""
+    X = np.asarray(X)
+    nrows, ncols = X.shape
+    if nrows == 0 or ncols == 0:
+        return _select(([0] * ncols, [0] * ncols, [[] for _ in range(ncols)]), stat)
+    found = [None, None, None]
+
+    if stat in (None, 0):
+        found[0] = (X.sum(axis=0) / nrows).tolist()
+
+    if stat in (None, 1):
+        m = nrows // 2
+        if nrows % 2:
+            found[1] = np.partition(X, m, axis=0)[m].tolist()
+        else:
+            P = np.partition(X, [m - 1, m], axis=0)
+            found[1] = ((P[m - 1] + P[m]) / 2).tolist()
+
+    if stat in (None, 2):
+        found[2] = _column_modes(X)
+    return _select(found, stat)
+
+
+def _column_modes(X):
+    nrows, ncols = X.shape
+    # count integer values with bincount, one row of counts per column
+    V = X.astype(np.int64)
+    low = V.min(axis=0)
+    width = int((V.max(axis=0) - low).max()) + 1
+    if not np.array_equal(V, X) or width > 2 * nrows:
+        return groups(np.repeat(np.arange(ncols), nrows), X.T.ravel(), ncols, 2)
+    counts = np.bincount((V - low + np.arange(ncols) * width).ravel(),
+                         minlength=ncols * width).reshape(ncols, width)
+    best = counts.max(axis=1)
+    return [(np.flatnonzero(counts[c] == best[c]) + low[c]).astype(X.dtype).tolist()
+            for c in range(ncols)]
+
+
+def groups(keys, values, ngroups, stat=None):
+    """Mean, median and mode of the values of every group, the values
+    being split into ngroups groups by the integer array keys, as three
+    lists with one entry per group."""
+    keys = np.asarray(keys, dtype=np.int64)
+    values = np.asarray(values)
+    if len(values) == 0:
+        return _select(([0] * ngroups, [0] * ngroups, [[] for _ in range(ngroups)]), stat)
+    found = [None, None, None]
+    counts = np.bincount(keys, minlength=ngroups)
+    empty = np.flatnonzero(counts == 0).tolist()
+
+    if stat in (None, 0):
+        found[0] = (np.bincount(keys, weights=values, minlength=ngroups) / np.maximum(counts, 1)).tolist()
+        for g in empty:
+            found[0][g] = 0
+    if stat == 0:
+        return found[0]
+
+    keys, values = _sort_groups(keys, values)
+
+    if stat in (None, 1):
+        starts = np.cumsum(counts) - counts
+        last = len(values) - 1
+        lo = values[np.minimum(starts + (counts - 1) // 2, last)]
+        hi = values[np.minimum(starts + counts // 2, last)]
+        found[1] = [h if odd else e for odd, h, e in
+                    zip((counts % 2).tolist(), lo.tolist(), ((lo + hi) / 2).tolist())]
+        for g in empty:
+            found[1][g] = 0
+
+    if stat in (None, 2):
+        found[2] = _group_modes(keys, values, ngroups)
+    return _select(found, stat)
+
+
+def _group_modes(keys, values, ngroups):
+    # runs of equal values within a group, and the longest run of each group
+    new = np.ones(len(values), dtype=bool)
+    new[1:] = (keys[1:] != keys[:-1]) | (values[1:] != values[:-1])
+    runs = np.flatnonzero(new)
+    lengths = np.diff(np.append(runs, len(values)))
+    owners = keys[runs]
+    firsts = np.flatnonzero(np.diff(owners, prepend=-1))
+    best = np.zeros(ngroups, dtype=np.int64)
+    best[owners[firsts]] = np.maximum.reduceat(lengths, firsts)
+    modal = lengths == best[owners]
+    modal_values = values[runs[modal]]
+    nmodal = np.bincount(owners[modal], minlength=ngroups)
+    first_modal = np.cumsum(nmodal) - nmodal
+    # most groups have a single mode; slice out the others
+    modes = [[v] for v in modal_values[np.minimum(first_modal, len(modal_values) - 1)].tolist()]
+    modal_values = modal_values.tolist()
+    for g in np.flatnonzero(nmodal != 1).tolist():
+        modes[g] = modal_values[first_modal[g]:first_modal[g] + nmodal[g]]
+    return modes
+
+
+def _sort_groups(keys, values):
+    """keys and values sorted by key, then value."""
+    if values.dtype.kind in "iu":
+        low = int(values.min())
+        span = int(values.max()) - low + 1
+        if (int(keys.max()) + 1) * span < 2 ** 62:
+            packed = np.sort(keys * span + (values.astype(np.int64) - low))
+            return packed // span, (packed % span + low).astype(values.dtype)
+    order = np.lexsort((values, keys))
+    return keys[order], values[order]
+
+
+def _select(found, stat):
+    return tuple(found) if stat is None else found[stat]
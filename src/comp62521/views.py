@@ -1,6 +1,12 @@
+from urllib.parse import urlencode
+
 from comp62521 import app
 from comp62521.database import database
-from flask import render_template, request
+from flask import Response, abort, jsonify, render_template, request, stream_with_context
+
+
+# rows of a /publication_link page when no limit is given, unless streamed
+PUBLICATION_LINK_PAGE_SIZE = 100
 
 
 def format_data(data):
@@ -14,6 +20,49 @@ def format_data(data):
     return result
 
 
+def int_arg(name, default=None):
+    """The integer query parameter name, default if it is missing. A value
+    that is not an integer is a bad request."""
+    if name not in request.args:
+        return default
+    try:
+        return int(request.args.get(name))
+    except ValueError:
+        abort(400, f"{name} must be an integer")
+
+
+def table_options(args, header=None):
+    """Read the paging, sorting and name filter parameters of a table page
+    into args, and return them as keyword arguments for the Database.
+
+    A negative offset or limit counts as 0. A parameter that is not an
+    integer, or a sort by a column outside header, the table's header, is
+    a bad request.
+    """
+    sort = int_arg("sort")
+    if sort is not None and header is not None and not 0 <= sort < len(header):
+        abort(400, f"no column {sort} to sort by")
+    limit = int_arg("limit")
+    options = {"offset": max(int_arg("offset", 0), 0), "limit": None if limit is None else max(limit, 0),
+               "sort": sort, "descending": request.args.get("order") == "desc",
+               "name_filter": request.args.get("name", "").strip() or None}
+    args.update(options)
+    args["order"] = "desc" if options["descending"] else "asc"
+    # the query string of the page without its position and ordering, for links
+    args["query"] = urlencode([(k, v) for k, v in request.args.items(multi=True)
+                               if k not in ("offset", "sort", "order")])
+    args["sorting"] = "" if options["sort"] is None else f"&sort={options['sort']}&order={args['order']}"
+    return options
+
+
+def year_range(db):
+    """The start year, end year and publication type chosen on a page."""
+    pub_type = int_arg("pub_type", 4)
+    if not 0 <= pub_type <= 4:
+        abort(400, "pub_type must be from 0 to 4")
+    return int_arg("start_year", db.min_year), int_arg("end_year", db.max_year), pub_type
+
+
 @app.route("/averages")
 def showAverages():
     dataset = app.config['DATASET']
@@ -22,38 +71,15 @@ def showAverages():
     tables = []
     headers = ["Average", "Conference Paper", "Journal", "Book", "Book Chapter", "All Publications"]
     averages = [database.Stat.MEAN, database.Stat.MEDIAN, database.Stat.MODE]
-    tables.append({
-        "id": 1,
-        "title": "Average Authors per Publication",
-        "header": headers,
-        "rows": [
-            [database.Stat.STR[i]]
-            + format_data(db.get_average_authors_per_publication(i)[1])
-            for i in averages]})
-    tables.append({
-        "id": 2,
-        "title": "Average Publications per Author",
-        "header": headers,
-        "rows": [
-            [database.Stat.STR[i]]
-            + format_data(db.get_average_publications_per_author(i)[1])
-            for i in averages]})
-    tables.append({
-        "id": 3,
-        "title": "Average Publications in a Year",
-        "header": headers,
-        "rows": [
-            [database.Stat.STR[i]]
-            + format_data(db.get_average_publications_in_a_year(i)[1])
-            for i in averages]})
-    tables.append({
-        "id": 4,
-        "title": "Average Authors in a Year",
-        "header": headers,
-        "rows": [
-            [database.Stat.STR[i]]
-            + format_data(db.get_average_authors_in_a_year(i)[1])
-            for i in averages]})
+    titles = ["Average Authors per Publication", "Average Publications per Author",
+              "Average Publications in a Year", "Average Authors in a Year"]
+    _, stats = db.get_averages()
+    for i, (title, rows) in enumerate(zip(titles, stats)):
+        tables.append({
+            "id": i + 1,
+            "title": title,
+            "header": headers,
+            "rows": [[database.Stat.STR[av]] + format_data(rows[av]) for av in averages]})
 
     args['tables'] = tables
     return render_template("averages.html", args=args)
@@ -66,19 +92,10 @@ def showCoAuthors():
     PUB_TYPES = ["Conference Papers", "Journals", "Books", "Book Chapters", "All Publications"]
     args = {"dataset": dataset, "id": "coauthors", "title": "Co-Authors"}
     
-    start_year = db.min_year
-    if "start_year" in request.args:
-        start_year = int(request.args.get("start_year"))
+    start_year, end_year, pub_type = year_range(db)
 
-    end_year = db.max_year
-    if "end_year" in request.args:
-        end_year = int(request.args.get("end_year"))
-
-    pub_type = 4
-    if "pub_type" in request.args:
-        pub_type = int(request.args.get("pub_type"))
-
-    args["data"] = db.get_coauthor_data(start_year, end_year, pub_type)
+    args["data"] = db.get_coauthor_data(start_year, end_year, pub_type,
+                                        **table_options(args, database.Database.COAUTHOR_HEADER))
     args["start_year"] = start_year
     args["end_year"] = end_year
     args["pub_type"] = pub_type
@@ -109,7 +126,8 @@ def showPublicationSummary(status):
 
     if status == "publication_author":
         args["title"] = "Publications by Author"
-        args["data"] = db.get_publications_by_author()
+        args["data"] = db.get_publications_by_author(
+            **table_options(args, database.Database.PUBLICATIONS_BY_AUTHOR_HEADER))
         args["status"] = status
         return render_template('publications_by_author.html', args=args)
 
@@ -137,7 +155,7 @@ def showSearch_Author():
         matchedNum, matched = db.get_partial_match(authorName.lower(), allAuthors)
 
 
-        if authorName.lower() in allAuthors:
+        if db.find_author(authorName) is not None:
             args["data"] = db.get_author_stat(authorName.lower())
             args["search"] = True
             args["invalid"] = False
@@ -150,7 +168,7 @@ def showSearch_Author():
             args["search"] = False
             args["invalid"] = False
             args["multipleMatch"] = True
-            args["matches"] = db.get_partial_match(authorName.lower(), allAuthors)
+            args["matches"] = matchedNum, matched
             args["sortedname"]=db.sort_result(authorName,args['matches'][1])
 
         else:
@@ -162,6 +180,18 @@ def showSearch_Author():
 
 
 
+@app.route("/autocomplete")
+def showAutocomplete():
+    db = app.config['DATABASE']
+    query = request.args.get("q", "").strip()
+    limit = 10
+    if "limit" in request.args:
+        limit = int(request.args.get("limit"))
+    if not query:
+        return jsonify([])
+    return jsonify(db.autocomplete(query, limit))
+
+
 @app.route("/author_stats")
 def showAuthor_Stats():
     dataset = app.config['DATASET']
@@ -183,20 +213,11 @@ def showAuthorsfirstlastsole():
     args = {"dataset":dataset, "id":"authors_count"}
     PUB_TYPES = ["Conference Papers", "Journals", "Books", "Book Chapters", "All Publications"]
 
-    start_year = db.min_year
-    if "start_year" in request.args:
-        start_year = int(request.args.get("start_year"))
-
-    end_year = db.max_year
-    if "end_year" in request.args:
-        end_year = int(request.args.get("end_year"))
-
-    pub_type = 4
-    if "pub_type" in request.args:
-        pub_type = int(request.args.get("pub_type"))
+    start_year, end_year, pub_type = year_range(db)
 
     args["title"] = "First/Last/Sole Author"
-    args["data"] = db.get_author_details(start_year, end_year, pub_type)
+    args["data"] = db.get_author_details(start_year, end_year, pub_type,
+                                        **table_options(args, database.Database.AUTHOR_DETAILS_HEADER))
     args["pub_type"] = pub_type
     args["min_year"] = db.min_year
     args["max_year"] = db.max_year
@@ -261,11 +282,21 @@ def showDepartment_VS_authors():
     if "search_year" in request.args:
         search_year = int(request.args.get("search_year"))
 
+    offset = 0
+    if "offset" in request.args:
+        offset = int(request.args.get("offset"))
+
+    limit = None
+    if "limit" in request.args:
+        limit = int(request.args.get("limit"))
+
     args["depData"] = db.get_publications_for_year(search_year)
-    args["data"] = db.get_all_authors_stat_by_year(search_year)
+    args["data"] = db.get_all_authors_stat_by_year(search_year, offset, limit)
     args["min_year"] = db.min_year
     args["max_year"] = db.max_year
     args["search_year"] = search_year
+    args["offset"] = offset
+    args["limit"] = limit
 
     return render_template("department_VS_authors.html", args=args)
     
@@ -275,6 +306,25 @@ def showAllPublications():
     db = app.config['DATABASE']
     args = {"dataset": dataset, "id": "all_publications_link"}
     args["title"] = "All publications"
-    args['data'] = db.get_all_publications()
+
+    options = table_options(args, db.PUBLICATION_LINK_HEADER)
+    offset, limit, sort, descending = options["offset"], options["limit"], options["sort"], options["descending"]
+    args["stream"] = "stream" in request.args
+    if limit is None and not args["stream"]:
+        # a streamed page may list every publication, a rendered one is paged
+        limit = args["limit"] = PUBLICATION_LINK_PAGE_SIZE
+    if args["stream"]:
+        # rows are rendered and sent as they are produced, never all held at once
+        args["data"] = (db.PUBLICATION_LINK_HEADER,
+                        db.iter_publication_links(offset, limit, sort, descending))
+        return Response(stream_with_context(stream_template('publication_link.html', args=args)))
+    args['data'] = db.get_all_publications(offset, limit, sort, descending)
 
     return render_template('publication_link.html', args=args)
+
+
+def stream_template(template_name, **context):
+    app.update_template_context(context)
+    stream = app.jinja_env.get_template(template_name).stream(context)
+    stream.enable_buffering(50)
+    return stream
@@ -1,4 +1,4 @@
-from comp62521 import app
+from comp62521 import app, metrics
 from comp62521.database import database, mock_database
 import sys
 import os
@@ -11,8 +11,15 @@ else:
     path, dataset = os.path.split(data_file)
     print(f"Database: path={path} name={dataset}")
     db = database.Database()
-    if not db.read(data_file):
+    db.cache.budget = int(os.environ.get("RESULT_CACHE_MB", "256")) * 2 ** 20
+    if not db.read_cached(data_file, workers=int(os.environ.get("READ_WORKERS", "1"))):
         sys.exit(1)
+    # any further files are added to the first one
+    for more_file in sys.argv[2:]:
+        delta = db.read_incremental(more_file)
+        print(delta)
+        if not delta.valid:
+            sys.exit(1)
 
 app.config['DATASET'] = dataset
 app.config['DATABASE'] = db
@@ -23,4 +30,13 @@ if "DEBUG" in os.environ:
 if "TESTING" in os.environ:
     app.config['TESTING'] = True
 
+if "METRICS" in os.environ:
+    metrics.enable(app)
+
+# requests asking with X-Profile: 1 or profile=1 are profiled, see profiling.py
+if "PROFILING" in os.environ:
+    app.config['PROFILING'] = True
+    if "PROFILE_DIR" in os.environ:
+        app.config['PROFILE_DIR'] = os.environ["PROFILE_DIR"]
+
 app.run(host='0.0.0.0', port=9292 ,debug=True) # debug=True forces auto reload
@@ -0,0 +1,44 @@
+from comp62521 import app, metrics
+from comp62521.database import database
+from comp62521.prefork import PreforkServer
+import sys
+import os
+
+# Production entry point: python serve.py data/dblp.xml [more.xml ...]
+# The Database is read once, then shared by WORKERS forked processes
+# (default: one per core) serving on HOST:PORT. See comp62521/prefork.py.
+
+if len(sys.argv) < 2:
+    sys.exit("usage: serve.py DATA_FILE [MORE_DATA_FILES ...]")
+
+data_file = sys.argv[1]
+path, dataset = os.path.split(data_file)
+print(f"Database: path={path} name={dataset}")
+db = database.Database()
+# the cache is per worker, so its budget is too
+db.cache.budget = int(os.environ.get("RESULT_CACHE_MB", "256")) * 2 ** 20
+# reload a freshly written snapshot so that even a cold start forks workers
+# sharing its memory-mapped pages rather than the parse's private heap
+if not db.read_cached(data_file, workers=int(os.environ.get("READ_WORKERS", "1")), reload=True):
+    sys.exit(1)
+for more_file in sys.argv[2:]:
+    delta = db.read_incremental(more_file)
+    print(delta)
+    if not delta.valid:
+        sys.exit(1)
+
+app.config['DATASET'] = dataset
+app.config['DATABASE'] = db
+
+if "METRICS" in os.environ:
+    metrics.enable(app)
+
+if "PROFILING" in os.environ:
+    app.config['PROFILING'] = True
+    if "PROFILE_DIR" in os.environ:
+        app.config['PROFILE_DIR'] = os.environ["PROFILE_DIR"]
+
+server = PreforkServer(app, os.environ.get("HOST", "0.0.0.0"), int(os.environ.get("PORT", "9292")),
+                       int(os.environ.get("WORKERS", str(os.cpu_count() or 1))))
+print(f"Serving on {server.host}:{server.port} with {server.workers} workers")
+server.serve_forever()
@@ -0,0 +1,138 @@
+from os import path
+import unittest
+
+import numpy as np
+
+from comp62521.database import database
+from comp62521.database.aggregate import (NOWHERE, AuthorYearTensor, CoauthorYearTensor, RangeTable,
+                                          YearTypeCube)
+from comp62521.database.graph import CoauthorGraph
+from comp62521.database.store import PublicationStore
+
+
+class TestAggregate(unittest.TestCase):
+
+    RANGES = [(None, None, 4), (2003, 2005, 1), (2000, 2010, 0), (2005, 2003, 4), (None, 2004, 2),
+              (-5, 3000, 3), (40000, None, 4), (None, -40000, 4)]
+
+    def setUp(self):
+        directory, _ = path.split(__file__)
+        self.db = database.Database()
+        self.assertTrue(self.db.read(path.join(directory, "..", "data", "dblp_curated_sample.xml")))
+        self.store = self.db.publications
+
+    def scan(self, start_year, end_year, pub_type):
+        """Boolean mask of the publications in a year range and type."""
+        mask = np.ones(len(self.store), dtype=bool)
+        if start_year is not None:
+            mask &= self.store.year >= start_year
+        if end_year is not None:
+            mask &= self.store.year <= end_year
+        if pub_type != 4:
+            mask &= self.store.pub_type == pub_type
+        return mask
+
+    def prefix(self, n):
+        """The first n publications of the store."""
+        s = self.store
+        return PublicationStore.from_arrays(s.year[:n], s.pub_type[:n], s.author_offsets[:n + 1],
+                                            s.author_ids[:s.author_offsets[n]], s.columns)
+
+    def halves(self, aggregate):
+        """Sync aggregate with the first half of the store, then the rest."""
+        aggregate.sync(self.prefix(len(self.store) // 2))
+        aggregate.sync(self.store)
+        return aggregate
+
+    def test_year_type_cube(self):
+        cube = YearTypeCube()
+        cube.sync(self.store)
+        for start, end, _ in self.RANGES:
+            expected = [int((self.scan(start, end, t)).sum()) for t in range(4)]
+            self.assertEqual(cube.range_counts(start, end).tolist(), expected)
+        self.assertEqual(cube[1900].tolist(), [0, 0, 0, 0])
+        self.assertEqual(self.halves(YearTypeCube()).cum.tolist(), cube.cum.tolist())
+
+    def test_author_year_tensor(self):
+        tensor = AuthorYearTensor()
+        tensor.sync(self.store)
+        nauthors = len(self.db.authors)
+        for start, end, t in self.RANGES:
+            pubs = np.flatnonzero(self.scan(start, end, t))
+            expected = np.zeros((nauthors, 4), dtype=np.int64)
+            for i in pubs:
+                authors = self.store.authors_of(i)
+                expected[authors, AuthorYearTensor.PUBLICATIONS] += 1
+                if len(authors) == 1:
+                    expected[authors[0], AuthorYearTensor.SOLE] += 1
+                else:
+                    expected[authors[0], AuthorYearTensor.FIRST] += 1
+                    expected[authors[-1], AuthorYearTensor.LAST] += 1
+            counts = tensor.range_counts(nauthors, start, end, t)
+            self.assertEqual(counts.tolist(), expected.tolist())
+            for author in range(0, nauthors, 7):
+                by_type = tensor.author_counts(author, start, end)
+                self.assertEqual((by_type.sum(axis=0) if t == 4 else by_type[t]).tolist(),
+                                 expected[author].tolist())
+
+            first = tensor.first_shared_slot(nauthors, start, end, t)
+            shared = np.zeros(len(self.store.author_ids), dtype=bool)
+            for i in pubs:
+                if self.store.author_counts[i] > 1:
+                    lo = self.store.author_offsets[i]
+                    shared[lo:lo + self.store.author_counts[i]] = True
+            for author in range(nauthors):
+                slots = np.flatnonzero(shared & (self.store.author_ids == author))
+                self.assertEqual(first[author], slots[0] if len(slots) else NOWHERE)
+
+        self.assertEqual(self.halves(AuthorYearTensor()).table.cum.tolist(), tensor.table.cum.tolist())
+
+    def test_duplicate_author_is_not_sole(self):
+        db = database.Database()
+        db.add_publication(0, "Twice", None, 2000, ["A", "B", "A"],
+                           None, None, None, None, None, None, None, None, None)
+        db.add_publication(0, "Alone", None, 2001, ["A"],
+                           None, None, None, None, None, None, None, None, None)
+        tensor = AuthorYearTensor()
+        tensor.sync(db.publications)
+        self.assertEqual(tensor.range_counts(2).tolist(), [[3, 1, 1, 1], [1, 0, 0, 0]])
+
+    def test_range_table_merges_match_one_add(self):
+        for aggregate in (AuthorYearTensor(), CoauthorYearTensor()):
+            for n in [1, 2, 5, 40, 41, 90, len(self.store)]:
+                aggregate.sync(self.prefix(min(n, len(self.store))))
+            table = aggregate.table
+            whole = RangeTable(table.values.shape[1])
+            whole.add(table.groups, table.years, table.values, table.first)
+            for name in ["keys", "values", "first", "groups", "years", "by_year", "sorted_years", "starts", "cum"]:
+                self.assertEqual(getattr(table, name).tolist(), getattr(whole, name).tolist(), name)
+
+    def test_rows_in_year_range(self):
+        table = self.halves(AuthorYearTensor()).table
+        for start, end, _ in self.RANGES:
+            expected = np.ones(len(table), dtype=bool)
+            if start is not None:
+                expected &= table.years >= start
+            if end is not None:
+                expected &= table.years <= end
+            index = table.rows(start, end)
+            rows = np.arange(len(table))[index]
+            self.assertEqual(sorted(rows.tolist()), np.flatnonzero(expected).tolist())
+            if not isinstance(index, slice):
+                self.assertTrue((np.diff(table.years[rows]) >= 0).all())
+
+    def test_coauthor_year_tensor(self):
+        tensor = CoauthorYearTensor()
+        tensor.sync(self.store)
+        halves = self.halves(CoauthorYearTensor())
+        nauthors = len(self.db.authors)
+        for start, end, t in self.RANGES:
+            expected = CoauthorGraph.build(self.store, nauthors, self.scan(start, end, t))
+            for g in (tensor.graph(nauthors, start, end, t), halves.graph(nauthors, start, end, t)):
+                self.assertEqual(g.indptr.tolist(), expected.indptr.tolist())
+                self.assertEqual(g.indices.tolist(), expected.indices.tolist())
+                self.assertEqual(g.weights.tolist(), expected.weights.tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,14 @@
 from os import path
+import gzip
+import tempfile
+import threading
+import time
 import unittest
+import zlib
 import comp62521
+from comp62521 import metrics, profiling, views
+from markupsafe import escape
+from comp62521.database import database, mock_database
 
 
 class TestApp(unittest.TestCase):
@@ -17,6 +25,181 @@ class TestApp(unittest.TestCase):
         r = self.app.get("/")
         self.assertEqual(200, r.status_code, "Status code was not 'OK'.")
 
+    def test_autocomplete(self):
+        directory, _ = path.split(__file__)
+        db = database.Database()
+        self.assertTrue(db.read(path.join(directory, "..", "data", "dblp_curated_sample.xml")))
+        comp62521.app.config['DATABASE'] = db
+        r = self.app.get("/autocomplete?q=corn")
+        self.assertEqual(200, r.status_code, "Status code was not 'OK'.")
+        self.assertEqual(r.get_json(), ["Mike Cornell", "Cornelia Hedeler"])
+        r = self.app.get("/autocomplete?q=andrew&limit=2")
+        self.assertEqual(len(r.get_json()), 2)
+
+    def test_author_table_paging(self):
+        directory, _ = path.split(__file__)
+        db = database.Database()
+        self.assertTrue(db.read(path.join(directory, "..", "data", "dblp_curated_sample.xml")))
+        comp62521.app.config['DATABASE'] = db
+        for url in ("/statisticsdetails/publication_author", "/coauthors?pub_type=4", "/authorfirstlastsole"):
+            r = self.app.get(url + ("&" if "?" in url else "?") + "offset=2&limit=3&sort=1&order=desc&name=a")
+            self.assertEqual(200, r.status_code, "Status code was not 'OK'.")
+            self.assertIn(b"offset=5&amp;sort=1&amp;order=desc", r.data)
+
+    def test_bad_table_parameters(self):
+        directory, _ = path.split(__file__)
+        db = database.Database()
+        self.assertTrue(db.read(path.join(directory, "..", "data", "dblp_curated_sample.xml")))
+        comp62521.app.config['DATABASE'] = db
+        for url in ("/statisticsdetails/publication_author", "/coauthors", "/authorfirstlastsole",
+                    "/publication_link"):
+            queries = ["sort=99", "sort=-1", "sort=x", "offset=x", "limit=1.5"]
+            if url in ("/coauthors", "/authorfirstlastsole"):
+                queries += ["pub_type=9", "start_year=x"]
+            for query in queries:
+                for prefix in ("", "/api"):
+                    r = self.app.get(f"{prefix}{url}?{query}")
+                    self.assertEqual(r.status_code, 400, f"{prefix}{url}?{query}")
+            r = self.app.get(url + "?offset=-3&limit=-1")
+            self.assertEqual(200, r.status_code, "Status code was not 'OK'.")
+
+    def test_publication_link(self):
+        directory, _ = path.split(__file__)
+        db = database.Database()
+        self.assertTrue(db.read(path.join(directory, "..", "data", "dblp_curated_sample.xml")))
+        comp62521.app.config['DATABASE'] = db
+        r = self.app.get("/publication_link?offset=1&limit=2&sort=2&order=desc")
+        self.assertEqual(200, r.status_code, "Status code was not 'OK'.")
+        self.assertIn(b"Next", r.data)
+        r = self.app.get("/publication_link?stream=1")
+        self.assertEqual(200, r.status_code, "Status code was not 'OK'.")
+        for row in db.get_all_publications()[1]:
+            self.assertIn(str(escape(row[1])).encode("utf-8"), r.data)
+
+    def test_api(self):
+        directory, _ = path.split(__file__)
+        db = database.Database()
+        self.assertTrue(db.read(path.join(directory, "..", "data", "dblp_curated_sample.xml")))
+        comp62521.app.config['DATABASE'] = db
+        r = self.app.get("/api/authorfirstlastsole?start_year=2000&end_year=2005&limit=5&sort=1")
+        self.assertEqual(200, r.status_code, "Status code was not 'OK'.")
+        header, data = db.get_author_details(2000, 2005, 4, limit=5, sort=1)
+        self.assertEqual(r.get_json(), {"header": list(header), "data": data})
+        self.assertEqual(self.app.get("/api/statisticsdetails/unknown").status_code, 404)
+        self.assertEqual(self.app.get("/api/publication_link?sort=99").status_code, 400)
+
+    def test_api_conditional_and_compressed(self):
+        directory, _ = path.split(__file__)
+        db = database.Database()
+        self.assertTrue(db.read(path.join(directory, "..", "data", "dblp_curated_sample.xml")))
+        comp62521.app.config['DATABASE'] = db
+        url = "/api/statisticsdetails/publication_author"
+        plain = self.app.get(url)
+        etag = plain.headers["ETag"]
+        self.assertEqual(self.app.get(url, headers={"If-None-Match": etag}).status_code, 304)
+        self.assertEqual(self.app.get(url + "?limit=3", headers={"If-None-Match": etag}).status_code, 200)
+        for encoding, decompress in [("gzip", gzip.decompress), ("deflate", zlib.decompress)]:
+            r = self.app.get(url, headers={"Accept-Encoding": encoding})
+            self.assertEqual(r.headers["Content-Encoding"], encoding)
+            self.assertNotEqual(r.headers["ETag"], etag)
+            self.assertEqual(decompress(r.data), plain.data)
+            self.assertEqual(self.app.get(url, headers={"Accept-Encoding": encoding}).data, r.data)
+        db.add_publication(0, "Another paper", None, 2000, ["Someone New"],
+                           None, None, None, None, None, None, None, None, None)
+        r = self.app.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(r.status_code, 200)
+        self.assertNotEqual(r.headers["ETag"], etag)
+
+    def test_mock_database_of_a_size(self):
+        comp62521.app.config['DATABASE'] = mock_database.MockDatabase(size=300)
+        for url in ("/averages", "/coauthors?start_year=1991&end_year=1995&pub_type=1",
+                    "/statisticsdetails/publication_year", "/search_author?authorName=author%20c",
+                    "/author_stats?authorName=Author%20C1", "/authorstatsbyclick?author=Author%20C1",
+                    "/department_VS_authors?search_year=1992", "/publication_link?stream=1"):
+            r = self.app.get(url)
+            self.assertEqual(200, r.status_code, url)
+        r = self.app.get("/publication_link")
+        self.assertEqual(r.data.count(b"<tr>") - 1, views.PUBLICATION_LINK_PAGE_SIZE)
+        self.assertIn(b"Next", r.data)
+        r = self.app.get("/publication_link?stream=1&sort=2")
+        self.assertIn(b"sort=0&order=asc&stream=1", r.data)
+        self.assertEqual(r.data.count(b"<tr>") - 1, 300)
+        r = self.app.get("/api/statisticsdetails/publication_author?offset=290&limit=20")
+        self.assertEqual(len(r.get_json()["data"]), 10)
+        self.assertEqual(self.app.get("/autocomplete?q=author%20z1&limit=3").get_json(),
+                         ["Author Z1", "Author Z10"])
+
+    def test_metrics(self):
+        directory, _ = path.split(__file__)
+        db = database.Database()
+        self.assertTrue(db.read(path.join(directory, "..", "data", "dblp_curated_sample.xml")))
+        comp62521.app.config['DATABASE'] = db
+        self.assertEqual(self.app.get("/metrics").status_code, 404)
+        metrics.enable(comp62521.app)
+        try:
+            self.app.get("/coauthors?pub_type=4")
+            self.app.get("/coauthors?pub_type=4")
+            self.assertEqual(self.app.get("/api/publication_link?sort=99").status_code, 400)
+            # the view rejects the sort before the Database sees it
+            with self.assertRaises(ValueError):
+                db.get_all_publications(sort=99)
+            r = self.app.get("/metrics")
+        finally:
+            metrics.disable(comp62521.app)
+        self.assertEqual(200, r.status_code, "Status code was not 'OK'.")
+        self.assertTrue(r.headers["Content-Type"].startswith("text/plain; version=0.0.4"))
+        text = r.data.decode("utf-8")
+        self.assertIn('comp62521_http_request_duration_seconds_count{route="/coauthors"} 2\n', text)
+        self.assertIn('comp62521_http_request_duration_seconds_bucket{route="/coauthors",le="+Inf"} 2\n', text)
+        self.assertIn('comp62521_database_call_duration_seconds_count{method="get_coauthor_data"} 2\n', text)
+        self.assertIn('comp62521_database_call_exceptions_total{method="get_all_publications",'
+                      'exception="ValueError"} 1\n', text)
+        self.assertIn(f"comp62521_publications {len(db.publications)}\n", text)
+        self.assertIn("comp62521_result_cache_hit_ratio ", text)
+        # disabled again: the original functions are back
+        self.assertNotIn("get_coauthor_data", vars(db))
+        self.assertEqual(self.app.get("/metrics").status_code, 404)
+
+    def test_profile(self):
+        directory, _ = path.split(__file__)
+        db = database.Database()
+        self.assertTrue(db.read(path.join(directory, "..", "data", "dblp_curated_sample.xml")))
+        comp62521.app.config['DATABASE'] = db
+        url = "/coauthors?pub_type=4&profile=1"
+        self.assertIn(b"<html", self.app.get(url).data)
+        comp62521.app.config['PROFILING'] = True
+        try:
+            r = self.app.get(url)
+            self.assertEqual(r.headers["Content-Type"], "text/plain; charset=utf-8")
+            lines = r.data.decode("utf-8").splitlines()
+            self.assertTrue(lines)
+            for line in lines:
+                self.assertRegex(line, r"^GET /coauthors\?pub_type=4&profile=1(;[^;]+)* \d+$")
+            with tempfile.TemporaryDirectory() as tmp:
+                comp62521.app.config['PROFILE_DIR'] = tmp
+                r = self.app.get("/coauthors?pub_type=4", headers={"X-Profile": "1"})
+                self.assertIn(b"<html", r.data)
+                with open(path.join(tmp, r.headers["X-Profile-File"])) as f:
+                    self.assertTrue(f.read().startswith("GET /coauthors?pub_type=4"))
+        finally:
+            comp62521.app.config.pop('PROFILING')
+            comp62521.app.config.pop('PROFILE_DIR', None)
+
+    def test_profile_sampler(self):
+        def busy():
+            end = time.perf_counter() + 0.1
+            while time.perf_counter() < end:
+                pass
+        thread = threading.Thread(target=busy)
+        thread.start()
+        sampler = profiling.Sampler(thread.ident)
+        sampler.start()
+        thread.join()
+        sampler.stop()
+        text = sampler.collapsed("busy", 0.1)
+        busy_us = sum(int(line.rsplit(" ", 1)[1]) for line in text.splitlines() if "busy (" in line)
+        self.assertGreater(busy_us, 50000)
+
 
 if __name__ == '__main__':
     unittest.main()
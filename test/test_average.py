@@ -1,5 +1,7 @@
 import unittest
 
+import numpy as np
+
 from comp62521.statistics import average
 
 
@@ -50,6 +52,38 @@ class TestAverage(unittest.TestCase):
     def test_mode_is_sorted_for_multiple_values(self):
         self.assertEqual(average.mode([2, 2, 1, 1]), [1, 2])
 
+    def test_columns_match_single_column_functions(self):
+        X = np.array([[1, 2, 0], [2, 2, 7], [2, 1, 7], [1, 5, 3]])
+        for Y in (X, X.astype(float), X[:3]):
+            means, medians, modes = average.columns(Y)
+            for c in range(Y.shape[1]):
+                column = Y[:, c].tolist()
+                for batched, single in [(means[c], average.mean(column)),
+                                        (medians[c], average.median(column)),
+                                        (modes[c], average.mode(column))]:
+                    self.assertEqual(batched, single)
+                    self.assertEqual(repr(batched), repr(single))
+
+    def test_columns_of_empty_dataset(self):
+        self.assertEqual(average.columns(np.zeros((0, 2))), ([0, 0], [0, 0], [[], []]))
+
+    def test_columns_single_statistic(self):
+        X = np.array([[4, 1], [4, 1], [1, 2]])
+        self.assertEqual(average.columns(X, 1), [4, 1])
+        self.assertEqual(average.columns(X, 2), [[4], [1]])
+
+    def test_groups_match_single_group_functions(self):
+        keys = np.array([2, 0, 2, 2, 0, 3, 2])
+        values = np.array([5, 1, 3, 5, 2, 9, 3])
+        means, medians, modes = average.groups(keys, values, 5)
+        for g in range(5):
+            group = values[keys == g].tolist()
+            self.assertEqual(means[g], average.mean(group))
+            self.assertEqual(medians[g], average.median(group))
+            self.assertEqual(modes[g], average.mode(group))
+        self.assertEqual(modes[2], [3, 5])
+        self.assertEqual(average.groups(keys, values, 5, 0), means)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,97 @@
+from os import path
+import unittest
+
+import numpy as np
+
+from comp62521.database import cache, database
+from comp62521.database.cache import ResultCache, estimate_size
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        directory, _ = path.split(__file__)
+        self.data_dir = path.join(directory, "..", "data")
+
+    def test_repeated_calls_are_hits(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "dblp_curated_sample.xml")))
+        first = db.get_author_details(2000, 2010, 4)
+        hits, misses = db.cache.hits, db.cache.misses
+        self.assertIs(db.get_author_details(2000, 2010, 4), first)
+        self.assertEqual((db.cache.hits, db.cache.misses), (hits + 1, misses))
+        self.assertIsNot(db.get_author_details(2000, 2010, 1), first)
+        self.assertGreater(db.cache.misses, misses)
+
+    def test_changes_invalidate(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "sprint-2-acceptance-1.xml")))
+        _, before = db.get_publication_summary()
+        db.add_publication(0, "Another paper", None, 2000, ["Someone New"],
+                           None, None, None, None, None, None, None, None, None)
+        _, after = db.get_publication_summary()
+        self.assertEqual(after[0][1], before[0][1] + 1)
+        self.assertTrue(db.read(path.join(self.data_dir, "sprint-2-acceptance-1.xml")))
+        self.assertEqual(db.get_publication_summary()[1], before)
+        self.assertEqual(db.cache.hits, 0)
+
+    def test_unhashable_arguments_are_not_cached(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "dblp_curated_sample.xml")))
+        names = list(db.get_all_author_names_lower())
+        db.get_partial_match("goble", names)
+        self.assertEqual(len(db.cache), 0)
+
+    def test_evicts_least_recently_used(self):
+        cache = ResultCache(budget=3 * estimate_size([0] * 100))
+        for key in "abc":
+            cache.put(key, [0] * 100)
+        self.assertTrue(cache.get("a")[0])
+        cache.put("d", [0] * 100)
+        self.assertEqual([cache.get(key)[0] for key in "abcd"], [True, False, True, True])
+        self.assertLessEqual(cache.size, cache.budget)
+        cache.put("e", [0] * 1000)
+        self.assertFalse(cache.get("e")[0])
+
+    def test_estimate_size(self):
+        rows = [["Author %d" % i, i, i, i] for i in range(10000)]
+        sampled = estimate_size(rows)
+        saved = cache.SAMPLE
+        cache.SAMPLE = len(rows)
+        try:
+            exact = estimate_size(rows)
+        finally:
+            cache.SAMPLE = saved
+        self.assertAlmostEqual(sampled / exact, 1, places=1)
+
+    def test_estimate_size_of_arrays(self):
+        array = np.zeros((1000, 5), dtype=np.int64)
+        self.assertGreaterEqual(estimate_size(array), array.nbytes)
+        # views keep their whole base alive
+        self.assertGreaterEqual(estimate_size(array[:, 1:]), array.nbytes)
+        self.assertGreaterEqual(estimate_size(array[::-1][:10]), array.nbytes)
+        self.assertGreaterEqual(estimate_size((array[:, None], [array[0]])), 2 * array.nbytes)
+
+    def test_budget_counts_cached_views(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "dblp_curated_sample.xml")))
+        ids, values = db._author_table("firstlastsole", 2000, 2010, 4)
+        self.assertIsNotNone(values.base)
+        self.assertGreaterEqual(db.cache.size, ids.nbytes + values.base.nbytes)
+        # a budget for a few such tables holds no more than that
+        db.cache.clear()
+        db.cache.budget = 3 * estimate_size((ids, values))
+        for start_year in range(1990, 2010):
+            db._author_table("firstlastsole", start_year, 2010, 4)
+            self.assertLessEqual(db.cache.size, db.cache.budget)
+        self.assertLessEqual(len(db.cache), 3)
+
+    def test_unknown_author_table(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "dblp_curated_sample.xml")))
+        with self.assertRaises(ValueError):
+            db._author_table("author_details")
+
+
+if __name__ == '__main__':
+    unittest.main()
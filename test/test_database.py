@@ -1,4 +1,7 @@
 from os import path
+import sys
+import tempfile
+import threading
 import unittest
 
 from comp62521.database import database
@@ -31,6 +34,106 @@ class TestDatabase(unittest.TestCase):
         # publications with missing titles should be added
         self.assertEqual(len(db.publications), 1)
 
+    def test_read_parsers_agree(self):
+        saved = database.RecordReader.BATCH
+        database.RecordReader.BATCH = 7
+        try:
+            for name in ["dblp_curated_sample.xml", "simple2.xml", "missing_year.xml",
+                         "invalid_xml_file.xml", "dblp_curated_separations.xml"]:
+                sax = database.Database()
+                fast = database.Database()
+                self.assertEqual(sax.read(path.join(self.data_dir, name), parser="sax"),
+                                 fast.read(path.join(self.data_dir, name)))
+                self.assertEqual([vars(p) for p in fast.publications],
+                                 [vars(p) for p in sax.publications])
+                self.assertEqual(fast.author_idx, sax.author_idx)
+                self.assertEqual(fast.author_names.names_lower, sax.author_names.names_lower)
+                for a in range(len(sax.authors)):
+                    self.assertEqual(fast.author_pubs.publications_of(a).tolist(),
+                                     sax.author_pubs.publications_of(a).tolist())
+        finally:
+            database.RecordReader.BATCH = saved
+
+    def test_read_parallel(self):
+        filename = path.join(self.data_dir, "dblp_curated_sample.xml")
+        serial = database.Database()
+        self.assertTrue(serial.read(filename))
+        for serial_ids in [True, False]:
+            db = database.Database()
+            # directly, as read would not fork more workers than there are CPUs
+            self.assertTrue(database.ParallelReader(db, 2, serial_ids).read(filename))
+            self.assertEqual(len(db.publications), len(serial.publications))
+            self.assertEqual(sorted(db.author_idx), sorted(serial.author_idx))
+            for p, q in zip(db.publications, serial.publications):
+                self.assertEqual(p.title, q.title)
+                self.assertEqual([db.authors[a].name for a in p.authors],
+                                 [serial.authors[a].name for a in q.authors])
+            if serial_ids:
+                self.assertEqual(db.author_idx, serial.author_idx)
+                self.assertEqual(db.publications.author_ids.tolist(),
+                                 serial.publications.author_ids.tolist())
+        db = database.Database()
+        self.assertFalse(database.ParallelReader(db, 2).read(path.join(self.data_dir, "invalid_xml_file.xml")))
+        for strings in [[], [""], [None], ["a", None, "", "b"]]:
+            self.assertEqual(database.ParallelReader._unpack(*database.ParallelReader._pack(strings)), strings)
+        db = database.Database()
+        self.assertTrue(db.read(filename, workers=database.ParallelReader.available_cpus() + 1))
+        self.assertEqual(db.author_idx, serial.author_idx)
+
+    def test_read_incremental(self):
+        first = path.join(self.data_dir, "dblp_2000_2005_114_papers.xml")
+        second = path.join(self.data_dir, "dblp_2006_2010_205_papers.xml")
+        with open(first) as f, open(second) as g:
+            combined = f.read().rsplit("</dblp>", 1)[0] + g.read().split("<dblp>", 1)[1]
+        with tempfile.NamedTemporaryFile("w", suffix=".xml") as both:
+            both.write(combined)
+            both.flush()
+            whole = database.Database()
+            self.assertTrue(whole.read(both.name))
+
+        db = database.Database()
+        self.assertTrue(db.read(first))
+        # build the indexes so that the delta has to update them
+        graph = db.get_coauthor_graph()
+        db.autocomplete("goble")
+        db.get_partial_match("goble")
+        db.get_all_authors_stat_by_year(2005)
+        db.get_author_details(2000, 2010, 4)
+        db.get_coauthor_data(2004, 2008, 1)
+        version = db.version
+        delta = db.read_incremental(second)
+        self.assertTrue(delta.valid)
+        self.assertEqual(delta.first_publication, 114)
+        self.assertEqual(delta.publications, 205)
+        self.assertEqual(delta.authors, len(whole.authors) - delta.first_author)
+        self.assertIn("co-author graph", delta.seconds)
+        self.assertGreater(db.version, version)
+
+        self.assertEqual([vars(p) for p in db.publications], [vars(p) for p in whole.publications])
+        self.assertEqual(db.author_idx, whole.author_idx)
+        self.assertEqual((db.min_year, db.max_year), (whole.min_year, whole.max_year))
+        merged, rebuilt = db.get_coauthor_graph(), whole.get_coauthor_graph()
+        self.assertIsNot(merged, graph)
+        self.assertEqual(merged.indptr.tolist(), rebuilt.indptr.tolist())
+        self.assertEqual(merged.indices.tolist(), rebuilt.indices.tolist())
+        self.assertEqual(merged.weights.tolist(), rebuilt.weights.tolist())
+        for query in ["goble", "an", "de roure"]:
+            self.assertEqual(db.autocomplete(query), whole.autocomplete(query))
+            self.assertEqual(db.get_partial_match(query), whole.get_partial_match(query))
+        for year in [2005, 2009]:
+            self.assertEqual(db.get_all_authors_stat_by_year(year), whole.get_all_authors_stat_by_year(year))
+        self.assertEqual(db.get_author_stat("Carole A. Goble"), whole.get_author_stat("Carole A. Goble"))
+        self.assertEqual(db.get_author_details(2000, 2010, 4), whole.get_author_details(2000, 2010, 4))
+        self.assertEqual(db.get_coauthor_data(2004, 2008, 1), whole.get_coauthor_data(2004, 2008, 1))
+        self.assertEqual(db.get_publication_summary(), whole.get_publication_summary())
+
+    def test_read_does_not_carry_pages_over(self):
+        for parser in ["sax", "expat"]:
+            db = database.Database()
+            self.assertTrue(db.read(path.join(self.data_dir, "publications_small_sample.xml"), parser))
+            self.assertEqual(db.publications[1].pages, "63-70")
+            self.assertIsNone(db.publications[2].pages)
+
     def test_get_average_authors_per_publication(self):
         db = database.Database()
         self.assertTrue(
@@ -77,6 +180,18 @@ class TestDatabase(unittest.TestCase):
         # additional test for union of authors
         self.assertEqual(data[-1], [0, 2, 4, 5])
 
+    def test_get_averages(self):
+        db = database.Database()
+        self.assertTrue(
+            db.read(path.join(self.data_dir, "sprint-2-acceptance-4.xml")))
+        header, data = db.get_averages()
+        self.assertEqual(len(data), 4)
+        methods = [db.get_average_authors_per_publication, db.get_average_publications_per_author,
+                   db.get_average_publications_in_a_year, db.get_average_authors_in_a_year]
+        for stats, method in zip(data, methods):
+            for av in [database.Stat.MEAN, database.Stat.MEDIAN, database.Stat.MODE]:
+                self.assertEqual((header, stats[av]), method(av))
+
     def test_get_publication_summary(self):
         db = database.Database()
         self.assertTrue(db.read(path.join(self.data_dir, "simple.xml")))
@@ -125,6 +240,25 @@ class TestDatabase(unittest.TestCase):
         self.assertEqual(len(data), 1, "incorrect number of rows")
         self.assertEqual(data[0][0], 9999, "incorrect year in result")
 
+    def test_author_tables_paged_sorted_and_filtered(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "dblp_curated_sample.xml")))
+        surname = lambda row: (row[0].lower().split()[-1], row[0].lower().split()[0])
+        for query in (db.get_publications_by_author,
+                      lambda **kw: db.get_author_details(2000, 2010, 4, **kw),
+                      lambda **kw: db.get_coauthor_data(2000, 2010, 4, **kw)):
+            header, data = query()
+            self.assertEqual(query(offset=3, limit=4)[1], data[3:7])
+            by_name = query(sort=0)[1]
+            if len(header) > 2:
+                self.assertEqual(by_name, sorted(data, key=surname))
+                self.assertEqual(query(sort=1, descending=True, limit=5)[1],
+                                 sorted(by_name, key=lambda row: -row[1])[:5])
+            self.assertEqual(query(sort=0, descending=True)[1], by_name[::-1])
+            self.assertEqual(query(name_filter="Hed")[1], [row for row in data if "hed" in row[0].lower()])
+            self.assertEqual(query(sort=0, name_filter="an", offset=1, limit=2)[1],
+                             [row for row in by_name if "an" in row[0].lower()][1:3])
+
     def test_get_publications_by_year(self):
         db = database.Database()
         self.assertTrue(db.read(path.join(self.data_dir, "simple.xml")))
@@ -197,6 +331,16 @@ class TestDatabase(unittest.TestCase):
         self.assertEqual(
             data[0][5], 1.75, "incorrect mean authors per publication for year1")
 
+    def test_averages_by_year_without_publications(self):
+        for name in ["missing_year.xml", "invalid_xml_file.xml"]:
+            db = database.Database()
+            db.read(path.join(self.data_dir, name))
+            self.assertEqual(len(db.publications), 0)
+            for av in [database.Stat.MEAN, database.Stat.MEDIAN, database.Stat.MODE]:
+                self.assertEqual(db.get_average_authors_per_publication_by_year(av)[1], [])
+                self.assertEqual(db.get_average_publications_per_author_by_year(av)[1], [])
+            self.assertEqual(len(db.get_averages()[1]), 4)
+
     def test_get_collaborations(self):
         db = database.Database()
         self.assertTrue(db.read(path.join(self.data_dir,
@@ -317,6 +461,13 @@ class TestDatabase(unittest.TestCase):
         data = db.get_all_author_names_lower()
         self.assertEqual(data, ['author1', 'author3', 'author4', 'author2'])
 
+    def test_find_author(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir,
+                                          "dblp_curated_sample.xml")))
+        self.assertEqual(db.find_author("CARLO BATINI"), db.author_idx["Carlo Batini"])
+        self.assertIsNone(db.find_author("carlo"))
+
     def test_get_coauthor_details_lowerCase(self):
         db = database.Database()
         self.assertTrue(db.read(path.join(self.data_dir,
@@ -337,6 +488,18 @@ class TestDatabase(unittest.TestCase):
         matchedNum, matched = db.get_partial_match("cornell", allAuthors)
         self.assertEqual(matchedNum, 1)
         self.assertEqual(matched, ['mike cornell'])
+    def test_get_partial_match_uses_index(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir,
+                                          "dblp_curated_sample.xml")))
+        allAuthors = db.get_all_author_names_lower()
+        for query in ["andrew", "li", "an", "carlo batini", "x", "mike cornell and friends"]:
+            self.assertEqual(db.get_partial_match(query),
+                             db._scan_partial_match(query, allAuthors))
+        matchedNum, matched = db.get_partial_match("andrew", limit=2)
+        self.assertEqual(matchedNum, 9)
+        self.assertEqual(matched, ['andrew dinn', 'andrew hayes'])
+
     def test_sort_result(self):
         db = database.Database()
         searchedAuthorName = ['Brian Sam Alice', 'Sam Alice', 'Samuel Alice', 'Alice Sam Brian',
@@ -348,6 +511,53 @@ class TestDatabase(unittest.TestCase):
         self.assertEqual(res, ['Alice Sam', 'Brian Sam', 'Alice Sammer', 'Brian Sammer', 'Alice Samming', 'Brian Samming', 'Sam Alice',
                                'Sam Brian', 'Samuel Alice', 'Samuel Brian', 'Brian Sam Alice', 'Alice Sam Brian', 'Alice Esam', 'Brian Esam'])
 
+    def test_autocomplete(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir,
+                                          "dblp_curated_sample.xml")))
+        self.assertEqual(db.autocomplete("corn"), ["Mike Cornell", "Cornelia Hedeler"])
+        names = db.autocomplete("andrew", limit=None)
+        self.assertEqual([n.lower() for n in names],
+                         db.sort_result("andrew", db.get_partial_match("andrew")[1]))
+        self.assertEqual(db.autocomplete("andrew", limit=3), names[:3])
+        self.assertEqual(db.autocomplete("zzzz"), [])
+
+    def test_indexes_built_once_by_concurrent_queries(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "dblp_curated_sample.xml")))
+        expected = db.autocomplete("andrew", limit=None)
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "dblp_curated_sample.xml")))
+        results = []
+        interval = sys.getswitchinterval()
+        # switch threads often, so they meet inside the first index build
+        sys.setswitchinterval(1e-6)
+        try:
+            threads = [threading.Thread(target=lambda: results.append(db.autocomplete("andrew", limit=None)))
+                       for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+        self.assertEqual(results, [expected] * 8)
+        self.assertEqual(len(db.author_ngrams), len(db.authors))
+        self.assertEqual(db.author_tokens.size, len(db.authors))
+
+    def test_build_indexes(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "dblp_curated_sample.xml")))
+        expected = (db.autocomplete("andrew", limit=None), db.get_publications_by_year(),
+                    db.get_coauthor_data(0, 3000, 4))
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "dblp_curated_sample.xml")))
+        db.build_indexes()
+        self.assertEqual(len(db.author_ngrams), len(db.authors))
+        self.assertEqual(db.author_tokens.size, len(db.authors))
+        self.assertEqual((db.autocomplete("andrew", limit=None), db.get_publications_by_year(),
+                          db.get_coauthor_data(0, 3000, 4)), expected)
+
     def test_get_cs_staff(self):
         db = database.Database()
         self.assertTrue(db.read(path.join(self.data_dir, "dblp_curated_sample.xml")))
@@ -356,6 +566,10 @@ class TestDatabase(unittest.TestCase):
                                 "Duncan Hull", "Caroline Jay", "John A. Keane", "Goran Nenadic", "Bijan Parsia", "Norman W. Paton",
                                 "Steve Pettifer", "Rizos Sakellariou", "Sandra Sampaio", "Uli Sattler", "Robert Stevens", "Chris Taylor",
                                 "Markel Vigo", "Ning Zhang"])
+        # the roster is read once; callers get their own copy
+        data.append("Someone Else")
+        self.assertNotIn("Someone Else", db.get_cs_staff())
+
     def test_get_author_stats_by_click(self):
         db = database.Database()
         self.assertTrue(db.read(path.join(self.data_dir, "dblp_curated_sample.xml")))
@@ -383,7 +597,7 @@ class TestDatabase(unittest.TestCase):
         header, data = db.get_all_authors_stat_by_year(9999)
         self.assertEqual(data, ([["AUTHOR1", 1, 1, 0, 0, 0], ["AUTHOR2", 1, 1, 0, 0, 0]]))
         header, data = db.get_all_authors_stat_by_year(2012)
-        self.assertEqual(data, ([["AUTHOR1", 0, 0, 0, 0, 0], ["AUTHOR2", 0, 0, 0, 0, 0]]))
+        self.assertEqual(data, [])
         self.assertTrue(db.read(path.join(self.data_dir, "sprint-2-acceptance-3.xml")))
         header, data = db.get_all_authors_stat_by_year(2012)
         self.assertEqual(data, ([['AUTHOR', 3, 3, 0, 0, 0], ['AUTHOR1', 1, 1, 0, 0, 0]]))
@@ -392,11 +606,23 @@ class TestDatabase(unittest.TestCase):
         self.assertEqual(data, ([['AUTHOR1', 3, 3, 0, 0, 0], ['AUTHOR3', 1, 1, 0, 0, 0], ['AUTHOR4', 2, 2, 0, 0, 0], ['AUTHOR2', 1, 0, 0, 0, 1]]))
         self.assertTrue(db.read(path.join(self.data_dir, "dblp_2000_2005_114_papers.xml")))
         header, data = db.get_all_authors_stat_by_year(2005)
-        self.assertEqual(data[0], (['Fabio Casati', 0, 0, 0, 0, 0]))
+        self.assertEqual(len(data), 71)
+        self.assertEqual(data[0], (['Stefano Ceri', 12, 7, 5, 0, 0]))
+        self.assertNotIn('Fabio Casati', [row[0] for row in data])
         self.assertTrue(db.read(path.join(self.data_dir, "dblp_curated_sample.xml")))
         header, data = db.get_all_authors_stat_by_year(1999)
-        self.assertEqual(data[5], (['AnHai Doan', 0, 0, 0, 0, 0]))                
-                
+        self.assertEqual(data[5], (['Paolo Atzeni', 1, 0, 0, 0, 1]))
+        self.assertNotIn('AnHai Doan', [row[0] for row in data])
+
+    def test_get_all_authors_stat_by_year_paged(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "dblp_curated_sample.xml")))
+        header, data = db.get_all_authors_stat_by_year(1999)
+        header, page = db.get_all_authors_stat_by_year(1999, offset=2, limit=2)
+        self.assertEqual(page, data[2:4])
+        header, page = db.get_all_authors_stat_by_year(1999, offset=len(data) - 1, limit=10)
+        self.assertEqual(page, data[-1:])
+
     def test_get_publications_for_year(self):
         db = database.Database()
         self.assertTrue(db.read(path.join(self.data_dir, "simple.xml")))
@@ -439,5 +665,23 @@ class TestDatabase(unittest.TestCase):
                 'AnHai Doan, Natalya Fridman Noy, Alon Y. Halevy', 2004, '-', 'SIGMOD Record', '33', '11-13', '4', '-', 'http://www.informatik.uni-trier.de/~ley/db/journals/sigmod/sigmod33.html#DoanNH04', '-', '-']]
 
         ))
+
+    def test_get_all_publications_paged_and_sorted(self):
+        db = database.Database()
+        self.assertTrue(
+            db.read(path.join(self.data_dir, "dblp_publications_by_year_curated.xml")))
+        header, data = db.get_all_publications()
+        header, page = db.get_all_publications(offset=2, limit=3)
+        self.assertEqual(page, data[2:5])
+        header, page = db.get_all_publications(sort=header.index('Year'))
+        self.assertEqual(page, sorted(data, key=lambda row: row[3]))
+        header, page = db.get_all_publications(sort=header.index('Authors'), descending=True)
+        self.assertEqual(page, sorted(data, key=lambda row: row[2], reverse=True))
+        header, page = db.get_all_publications(0, 4, header.index('Pages'))
+        self.assertEqual(page, sorted(data, key=lambda row: row[7])[:4])
+        self.assertEqual(list(db.iter_publication_links(batch=3)), data)
+        self.assertEqual(list(db.iter_publication_links(1, 5, 0, True, batch=2)),
+                         sorted(data, key=lambda row: row[0], reverse=True)[1:6])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,68 @@
+from os import path
+import unittest
+
+import numpy as np
+
+from comp62521.database import database, graph
+from comp62521.database.graph import CoauthorGraph
+
+
+class TestCoauthorGraph(unittest.TestCase):
+
+    def setUp(self):
+        directory, _ = path.split(__file__)
+        self.data_dir = path.join(directory, "..", "data")
+
+    def test_weights_are_shared_publications(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "sprint-2-acceptance-2.xml")))
+        g = db.get_coauthor_graph()
+        self.assertEqual(g.degree.tolist(), [2, 2, 2, 0])
+        self.assertEqual(g.neighbours(0).tolist(), [1, 2])
+        self.assertEqual(g.shared(0).tolist(), [1, 2])
+        a, b = g.edges()
+        self.assertEqual(sorted(zip(a.tolist(), b.tolist())), [(0, 1), (0, 2), (1, 2)])
+
+    def test_graph_for_year_range_and_type(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "dblp_publications_by_year_curated.xml")))
+        g = db.get_coauthor_graph(2004, 2004, 1)
+        halevy = db.author_idx["Alon Y. Halevy"]
+        self.assertEqual([db.authors[a].name for a in g.neighbours(halevy)],
+                         ["AnHai Doan", "Natalya Fridman Noy"])
+        self.assertEqual(g.shared(halevy).tolist(), [3, 3])
+        self.assertEqual(db.get_coauthor_graph(1900, 1901).degree.sum(), 0)
+
+    def test_build_in_blocks(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "dblp_curated_sample.xml")))
+        whole = db.get_coauthor_graph()
+        saved = graph.PAIR_BLOCK
+        graph.PAIR_BLOCK = 7
+        try:
+            blocked = CoauthorGraph.build(db.publications, len(db.authors))
+        finally:
+            graph.PAIR_BLOCK = saved
+        self.assertEqual(whole.indptr.tolist(), blocked.indptr.tolist())
+        self.assertEqual(whole.indices.tolist(), blocked.indices.tolist())
+        self.assertEqual(whole.weights.tolist(), blocked.weights.tolist())
+
+    def test_merged(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "dblp_curated_sample.xml")))
+        whole = db.get_coauthor_graph()
+        mask = np.zeros(len(db.publications), dtype=bool)
+        mask[::3] = True
+        # the graph of the first publications has fewer authors
+        store = db.publications
+        first = CoauthorGraph.build(store, int(store.author_ids[:store.author_offsets[20]].max()) + 1,
+                                    mask & (np.arange(len(mask)) < 20))
+        merged = first.merged(CoauthorGraph.build(store, len(db.authors), ~mask)).merged(
+            CoauthorGraph.build(store, len(db.authors), mask & (np.arange(len(mask)) >= 20)))
+        self.assertEqual(merged.indptr.tolist(), whole.indptr.tolist())
+        self.assertEqual(merged.indices.tolist(), whole.indices.tolist())
+        self.assertEqual(merged.weights.tolist(), whole.weights.tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
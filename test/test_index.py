@@ -0,0 +1,124 @@
+from os import path
+import unittest
+
+from comp62521.database import database
+from comp62521.database.index import (NameIndex, NameMap, NgramIndex, PostingIndex, StringHashTable,
+                                      TokenPrefixIndex, normalize_name)
+from comp62521.database.store import StringList, StringTable
+
+
+class TestPostingIndex(unittest.TestCase):
+
+    def setUp(self):
+        directory, _ = path.split(__file__)
+        self.data_dir = path.join(directory, "..", "data")
+
+    def test_add(self):
+        index = PostingIndex()
+        index.add(0, [0, 1])
+        index.add(1, [1, 1])
+        index.add(2, [2, 0])
+        self.assertEqual(index.publications_of(0).tolist(), [0, 2])
+        self.assertEqual(index.publications_of(1).tolist(), [0, 1])
+        self.assertEqual(index.count(2), 1)
+        self.assertEqual(index.size, 3)
+
+    def test_sync_matches_incremental_build(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "dblp_curated_sample.xml")))
+        index = PostingIndex()
+        index.sync(db.publications)
+        self.assertEqual(len(index), len(db.authors))
+        for a in range(len(db.authors)):
+            self.assertEqual(index.publications_of(a).tolist(),
+                             db.author_pubs.publications_of(a).tolist())
+
+
+class TestNameIndex(unittest.TestCase):
+
+    def test_normalize_name(self):
+        self.assertEqual(normalize_name("Carlo  BATINI"), "carlo batini")
+        self.assertEqual(normalize_name("Jens Straße"), normalize_name("JENS STRASSE"))
+        self.assertEqual(normalize_name("Jose\u0301"), normalize_name("Jos\u00e9"))
+
+    def test_lookup_keeps_first_author(self):
+        index = NameIndex()
+        index.add("Ann Smith", 0)
+        index.add("Bo Li", 1)
+        index.add("ANN SMITH", 2)
+        self.assertEqual(index.lookup("ann smith"), 0)
+        self.assertEqual(index.lookup("BO LI"), 1)
+        self.assertIsNone(index.lookup("nobody"))
+        self.assertEqual(index.names_lower, ["ann smith", "bo li", "ann smith"])
+
+    def test_lookup_from_arrays(self):
+        built = NameIndex()
+        for a, name in enumerate(["Ann Smith", "Bo Li", "ANN SMITH"]):
+            built.add(name, a)
+        index = NameIndex.from_arrays(*built.arrays())
+        index.add("Cy Wu", 3)
+        index.add("bo  li", 4)
+        self.assertEqual(index.lookup("ann smith"), 0)
+        self.assertEqual(index.lookup("bo li"), 1)
+        self.assertEqual(index.lookup("CY WU"), 3)
+        self.assertIsNone(index.lookup("nobody"))
+        self.assertEqual(len(index), 5)
+
+
+class TestNameMap(unittest.TestCase):
+
+    def test_string_hash_table(self):
+        strings = ["name %d" % i for i in range(1000)] + ["name 5", ""]
+        table = StringHashTable.build(StringTable.pack(strings))
+        self.assertEqual(len(table.slots), 2048)
+        for k, string in enumerate(strings[:1000]):
+            self.assertEqual(table.find(string), k)
+        self.assertEqual(table.find(""), 1001)
+        self.assertIsNone(table.find("name 1000"))
+        self.assertIsNone(StringHashTable(StringTable.pack([])).find("x"))
+
+    def test_base_and_added_names(self):
+        names = StringList(StringTable.pack(["Bo Li", "Ann Smith"]))
+        index = NameMap(names, StringHashTable.build(names).slots, 2)
+        names.append("Cy Wu")
+        index["Cy Wu"] = 2
+        self.assertEqual(index["Ann Smith"], 1)
+        self.assertEqual(index.get("Bo Li"), 0)
+        self.assertEqual(index["Cy Wu"], 2)
+        self.assertNotIn("Nobody", index)
+        self.assertEqual(dict(index), {"Bo Li": 0, "Ann Smith": 1, "Cy Wu": 2})
+        rebuilt = NameMap(names, index.slots(), 3)
+        self.assertEqual(dict(rebuilt), dict(index))
+
+
+class TestNameSearch(unittest.TestCase):
+
+    NAMES = ["ann smith", "bo li", "jo ann li", "li", "müller jo", "anna", "zoë ann bo"]
+
+    def test_ngrams_match_scan_after_sync(self):
+        names = self.NAMES[:4]
+        index = NgramIndex()
+        index.sync(names)
+        names = names + self.NAMES[4:]
+        index.sync(names)
+        whole = NgramIndex()
+        whole.sync(names)
+        for name in ["_grams", "_offsets", "_ids", "_hashes", "_hash_ids"]:
+            self.assertEqual(getattr(index, name).tolist(), getattr(whole, name).tolist(), name)
+        for query in ["a", "ann", "li", "ü", "o ann", "jo ann li x", "nobody"]:
+            self.assertEqual(index.containing(query).tolist(),
+                             [i for i, name in enumerate(names) if query in name])
+            self.assertEqual(index.substring_matches(query),
+                             [i for i, name in enumerate(names) if query in name or name in query])
+
+    def test_tokens_sorted_after_sync(self):
+        names = self.NAMES[:4]
+        index = TokenPrefixIndex()
+        index.sync(names)
+        names = names + self.NAMES[4:]
+        index.sync(names)
+        self.assertEqual(index.surname_order().tolist(),
+                         sorted(range(len(names)), key=lambda i: (names[i].split()[-1], names[i].split()[0], i)))
+        self.assertEqual(index.complete("ann"), [5, 0, 6, 2])
+        self.assertEqual(index.complete("ann", limit=2), [5, 0])
+        self.assertEqual(index.complete("ü", matches=lambda: [4]), [4])
@@ -0,0 +1,111 @@
+import gc
+import os
+import signal
+import time
+import unittest
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from os import path
+
+from flask import Flask
+
+import comp62521
+from comp62521 import metrics
+from comp62521.database import database
+from comp62521.prefork import PreforkServer
+
+
+class CrashingServer(PreforkServer):
+    """A server whose workers exit as soon as they are forked."""
+
+    def _work(self):
+        pass
+
+
+class TestPreforkServer(unittest.TestCase):
+
+    def setUp(self):
+        self.handlers = {signum: signal.getsignal(signum)
+                         for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGUSR1)}
+        self.app = Flask(__name__)
+        self.app.config['DATABASE'] = None
+
+    def tearDown(self):
+        for signum, handler in self.handlers.items():
+            signal.signal(signum, handler)
+        gc.unfreeze()
+
+    def test_gives_up_on_workers_dying_at_start(self):
+        server = CrashingServer(self.app, "127.0.0.1", 0, 2, respawn_delay=0.05, max_crashes=4)
+        start = time.monotonic()
+        with self.assertRaises(RuntimeError):
+            server.serve_forever()
+        # the three respawns waited 0.05, 0.1 and 0.2 s
+        self.assertGreaterEqual(time.monotonic() - start, 0.35)
+        self.assertEqual(len(server.crashes), 4)
+        self.assertEqual(server.pids, {})
+        self.assertEqual(server.socket.fileno(), -1)
+
+
+    def test_serves_from_workers_until_stopped(self):
+        directory, _ = path.split(__file__)
+        db = database.Database()
+        self.assertTrue(db.read(path.join(directory, "..", "data", "dblp_curated_sample.xml")))
+        comp62521.app.config['DATASET'] = "dblp_curated_sample.xml"
+        comp62521.app.config['DATABASE'] = db
+        metrics.enable(comp62521.app)
+        try:
+            server = PreforkServer(comp62521.app, "127.0.0.1", 0, 2)
+            pid = os.fork()
+            if not pid:
+                try:
+                    server.serve_forever()
+                finally:
+                    os._exit(0)
+        finally:
+            metrics.disable(comp62521.app)
+        server.socket.close()
+        try:
+            url = f"http://127.0.0.1:{server.port}"
+
+            def get(route):
+                with urllib.request.urlopen(url + route, timeout=30) as r:
+                    self.assertEqual(r.status, 200)
+                    return r.read().decode("utf-8")
+
+            self.assertIn("<html", get("/"))
+            workers = self._children(pid)
+            self.assertEqual(len(workers), 2)
+            # workers ignore the memory report signal meant for the server
+            for worker in workers:
+                os.kill(worker, signal.SIGUSR1)
+            with ThreadPoolExecutor(4) as pool:
+                list(pool.map(get, ["/coauthors?pub_type=4"] * 8))
+            self.assertEqual(self._children(pid), workers)
+            # whichever worker answers, it counts the requests of both
+            for _ in range(4):
+                self.assertIn('comp62521_http_request_duration_seconds_count{route="/coauthors"} 8\n',
+                              get("/metrics"))
+        finally:
+            os.kill(pid, signal.SIGTERM)
+            deadline = time.monotonic() + 30
+            while not os.waitpid(pid, os.WNOHANG)[0]:
+                self.assertLess(time.monotonic(), deadline, "server did not stop")
+                time.sleep(0.05)
+        for worker in workers:
+            with self.assertRaises(ProcessLookupError):
+                os.kill(worker, 0)
+
+    def _children(self, pid):
+        """The pids of the processes pid forked, which must all be up."""
+        deadline = time.monotonic() + 30
+        while True:
+            with open(f"/proc/{pid}/task/{pid}/children") as f:
+                children = sorted(int(child) for child in f.read().split())
+            if len(children) == 2 or time.monotonic() > deadline:
+                return children
+            time.sleep(0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
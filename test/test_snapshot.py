@@ -0,0 +1,97 @@
+from os import path
+import os
+import shutil
+import tempfile
+import unittest
+
+from comp62521.database import database, snapshot
+from comp62521.database.store import StringColumn
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        directory, _ = path.split(__file__)
+        self.data_dir = path.join(directory, "..", "data")
+        self.tmp = tempfile.mkdtemp()
+        self.source = path.join(self.tmp, "sample.xml")
+        shutil.copy(path.join(self.data_dir, "dblp_curated_sample.xml"), self.source)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_round_trip(self):
+        parsed = database.Database()
+        self.assertTrue(parsed.read_cached(self.source))
+        self.assertTrue(path.exists(snapshot.snapshot_path(self.source)))
+        loaded = database.Database()
+        self.assertTrue(loaded.read_cached(self.source))
+        self.assertIsInstance(loaded.publications.columns["title"], StringColumn)
+        self.assertEqual([a.name for a in loaded.authors], [a.name for a in parsed.authors])
+        self.assertEqual(loaded.author_idx, parsed.author_idx)
+        self.assertEqual(loaded.publications.link_valid.tolist(), parsed.publications.link_valid.tolist())
+        for p, q in zip(loaded.publications, parsed.publications):
+            self.assertEqual(vars(p), vars(q))
+        self.assertEqual(loaded.get_publication_summary(), parsed.get_publication_summary())
+        self.assertEqual(loaded.get_author_stat("Carlo Batini"), parsed.get_author_stat("Carlo Batini"))
+        self.assertEqual(loaded.autocomplete("bat"), parsed.autocomplete("bat"))
+
+    def test_indexes_load_from_arrays(self):
+        parsed = database.Database()
+        self.assertTrue(parsed.read_cached(self.source))
+        loaded = database.Database()
+        self.assertTrue(loaded.read_cached(self.source))
+        self.assertEqual(dict(loaded.author_idx), dict(parsed.author_idx))
+        self.assertEqual(loaded._author_pubs.size, len(loaded.publications))
+        self.assertEqual(loaded.author_names.names_lower, parsed.author_names.names_lower)
+        for a, author in enumerate(parsed.authors):
+            self.assertEqual(loaded.author_idx[author.name], a)
+            self.assertEqual(loaded.find_author(author.name.upper()), parsed.find_author(author.name.upper()))
+            self.assertEqual(loaded.author_pubs.publications_of(a).tolist(),
+                             parsed.author_pubs.publications_of(a).tolist())
+
+    def test_reload_after_parse(self):
+        parsed = database.Database()
+        self.assertTrue(parsed.read(self.source))
+        db = database.Database()
+        self.assertTrue(db.read_cached(self.source, reload=True))
+        self.assertEqual(db.snapshot_path, snapshot.snapshot_path(self.source))
+        self.assertIsInstance(db.publications.columns["title"], StringColumn)
+        self.assertEqual(len(db.authors.names._appended), 0)
+        self.assertEqual([a.name for a in db.authors], [a.name for a in parsed.authors])
+        self.assertEqual(db.autocomplete("bat"), parsed.autocomplete("bat"))
+
+    def test_rebuilds_when_source_changes(self):
+        db = database.Database()
+        self.assertTrue(db.read_cached(self.source))
+        shutil.copy(path.join(self.data_dir, "sprint-2-acceptance-2.xml"), self.source)
+        self.assertFalse(snapshot.is_current(
+            snapshot.read_header(snapshot.snapshot_path(self.source)), self.source))
+        self.assertTrue(db.read_cached(self.source))
+        self.assertEqual(len(db.authors), 4)
+
+    def test_touched_source_is_still_current(self):
+        db = database.Database()
+        self.assertTrue(db.read_cached(self.source))
+        st = os.stat(self.source)
+        os.utime(self.source, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        header = snapshot.read_header(snapshot.snapshot_path(self.source))
+        self.assertTrue(snapshot.is_current(header, self.source))
+
+    def test_add_publication_after_load(self):
+        database.Database().read_cached(self.source)
+        db = database.Database()
+        self.assertTrue(db.read_cached(self.source))
+        n = len(db.publications)
+        db.add_publication(1, "New", None, 2020, ["Carlo Batini", "New Author"],
+                           None, None, None, None, None, None, None, None, None)
+        self.assertEqual(len(db.publications), n + 1)
+        self.assertEqual(db.publications[n].title, "New")
+        self.assertEqual(db.publications[n - 1].title, db.publications[n - 1:n][0].title)
+        self.assertEqual(db.find_author("new author"), len(db.authors) - 1)
+        batini = db.author_idx["Carlo Batini"]
+        self.assertEqual(db.author_pubs.publications_of(batini)[-1], n)
+
+
+if __name__ == '__main__':
+    unittest.main()
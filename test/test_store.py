@@ -0,0 +1,80 @@
+from os import path
+import unittest
+
+import validators
+
+from comp62521.database import database
+from comp62521.database.store import Publication, PublicationStore, link_is_valid
+
+
+class TestPublicationStore(unittest.TestCase):
+
+    def setUp(self):
+        directory, _ = path.split(__file__)
+        self.data_dir = path.join(directory, "..", "data")
+
+    def test_append_and_columns(self):
+        store = PublicationStore(capacity=1)
+        store.append(0, "T1", None, 2001, [0, 1], None, None, None, None, None, None, None, None, None)
+        store.append(1, "T2", None, 2002, [1], None, "J", None, None, None, None, None, None, None)
+        store.append(3, "T3", None, 2001, [2, 0, 1], None, None, None, None, None, None, None, None, None)
+        self.assertEqual(len(store), 3)
+        self.assertEqual(store.year.tolist(), [2001, 2002, 2001])
+        self.assertEqual(store.pub_type.tolist(), [0, 1, 3])
+        self.assertEqual(store.author_offsets.tolist(), [0, 2, 3, 6])
+        self.assertEqual(store.author_ids.tolist(), [0, 1, 1, 2, 0, 1])
+        self.assertEqual(store.first_author.tolist(), [0, 1, 2])
+        self.assertEqual(store.last_author.tolist(), [1, 1, 1])
+        self.assertEqual(store.publications_of(0).tolist(), [0, 2])
+
+    def test_materialize_publication(self):
+        store = PublicationStore()
+        store.append(1, "T", "http://x", 2005, [3, 4], None, "J", "1", "1-2", None, None, None, None, None)
+        p = store[0]
+        self.assertIsInstance(p, Publication)
+        self.assertEqual(p.pub_type, 1)
+        self.assertEqual(p.year, 2005)
+        self.assertEqual(p.authors, [3, 4])
+        self.assertEqual(p.journ, "J")
+        self.assertEqual(store[-1].title, "T")
+        with self.assertRaises(IndexError):
+            store[1]
+
+    def test_link_valid(self):
+        store = PublicationStore(capacity=1)
+        store.append(0, "T1", "http://example.com/a", 2001, [0], None, None, None, None, None, None, None, None, None)
+        store.append(0, "T2", "not a link", 2001, [0], None, None, None, None, None, None, None, None, None)
+        store.extend([2002, 2003], [1, 1], [1, 1], [1, 2], dict(
+            {name: [None, None] for name in PublicationStore.FIELDS}, link=[None, "https://example.org"]))
+        self.assertEqual(store.link_valid.tolist(), [True, False, False, True])
+
+    def test_link_is_valid_agrees_with_validators(self):
+        links = ["https://doi.org/10.1145/3292500.3330701", "http://dx.doi.org/10.1007/978-3-540", "None",
+                 "https://www.example.com", "https://a..com/", "https://-a.com/", "https://a.c/", "ftp://a.org/x",
+                 "https://a.com/x y", "https://a.com/?q=1", "https://a.com:8080/", "db/conf/x.html",
+                 "https://" + "a" * 64 + ".com/", "https://1.2.3.4/", "https://a.com/é", "http://a.com/#x"]
+        for link in links:
+            self.assertEqual(link_is_valid(link), bool(validators.url(link)), link)
+        self.assertFalse(link_is_valid(None))
+
+    def test_select(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "dblp_publications_by_year_curated.xml")))
+        store = db.publications
+        self.assertEqual(int(store.select(2004, 2004).sum()), 4)
+        self.assertEqual(int(store.select(2004, 2004, 1).sum()), 3)
+        self.assertEqual(int(store.select().sum()), len(store))
+
+    def test_coauthor_pairs(self):
+        store = PublicationStore()
+        store.append(0, "T1", None, 2001, [0, 1, 2], None, None, None, None, None, None, None, None, None)
+        store.append(0, "T2", None, 2002, [3], None, None, None, None, None, None, None, None, None)
+        left, right = store.coauthor_pairs()
+        self.assertEqual(sorted(zip(left.tolist(), right.tolist())),
+                         [(0, 1), (0, 2), (1, 0), (1, 2), (2, 0), (2, 1)])
+        left, right = store.coauthor_pairs(store.select(2002, 2002))
+        self.assertEqual(len(left), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()